@@ -0,0 +1,253 @@
+#Surrogate-assisted Bayesian optimizer
+#Same design space, cost and constraints as ParticleSwarmOpt_LunaCat, but every new design is picked by
+#maximizing constrained expected improvement over Gaussian-process models of the results so far
+
+import sys
+import math
+import random
+import numpy as np
+
+import DOEmethods as doe
+import psoCore
+import resultCache
+import batchEvaluator
+from surrogateModel import GaussianProcess
+from ParticleSwarmOpt_LunaCat import NUM_VARS, POP_SIZE, MAX_ITERS, fullScaleDesign, objectiveFromResults, isFeasible, costFromResults, yieldStress
+
+
+#Pick final result output file to append
+optListFileName = "BO_OPT_LOG.csv"
+runListFileName = "BO_RUNNING_LOG.csv"
+resultCacheFileName = resultCache.CACHE_FILE_NAME
+
+#Configuration
+NUM_INIT = 12 #LHS designs before the first model fit
+MAX_EVALS = 48 #total solver calls, initial designs included
+BATCH_SIZE = 4 #designs proposed per round; they are solved side by side
+NUM_WORKERS = batchEvaluator.defaultNumWorkers()
+PARALLEL_EVALUATOR = batchEvaluator.abaqusEvaluator
+
+#Acquisition search
+NUM_CANDIDATES = 2000 #uniform random candidates per proposal
+NUM_LOCAL_CANDIDATES = 500 #perturbations around the best designs found so far
+LOCAL_STEP = 0.05 #std of those perturbations (normalized units)
+
+normCdf = np.vectorize(lambda z: 0.5*(1.0+math.erf(z/math.sqrt(2.0))))
+
+def normPdf(z):
+    return np.exp(-0.5*z**2)/math.sqrt(2.0*math.pi)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Models and acquisition
+# Three GPs on the normalized design: log(objective), eigenVal1 and log(maxMises).
+# Constrained EI = EI of the objective over the best feasible design x P(no buckling) x P(below yield)
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def modelTargets(designList, resultList):
+    resultArray = np.array(resultList, dtype=float)
+    return {"objective":np.log(np.array([objectiveFromResults(results) for results in resultList])),
+        "eigenVal1":resultArray[:,2], "logMises":np.log(np.maximum(resultArray[:,3], 1.0))}
+
+def fitModels(xArray, targets, models=None):
+    #fresh hyperparameters, or (models given) the same ones conditioned on the new data
+    if models is None:
+        return dict([(name, GaussianProcess().fit(xArray, y)) for name,y in targets.items()])
+
+    for name,y in targets.items():
+        models[name].fit(xArray, y, optimize=False)
+    return models
+
+def yieldOfCandidates(xArray):
+    materialList = [fullScaleDesign(x)[7] for x in xArray]
+    return np.array([yieldStress(material_type) for material_type in materialList], dtype=float)
+
+def acquisition(models, xArray, bestLogObjective):
+    mean, std = models["objective"].predict(xArray)
+    if bestLogObjective is None:
+        expImprove = np.ones(len(xArray)) #nothing feasible yet: just look for feasibility
+    else:
+        z = (bestLogObjective-mean)/std
+        expImprove = std*(z*normCdf(z) + normPdf(z))
+
+    eigenMean, eigenStd = models["eigenVal1"].predict(xArray)
+    misesMean, misesStd = models["logMises"].predict(xArray)
+    probFeasible = normCdf(eigenMean/eigenStd) * normCdf((np.log(yieldOfCandidates(xArray))-misesMean)/misesStd)
+
+    return expImprove*probFeasible
+
+def candidateSet(rng, xArray, costArray):
+    uniformX = rng.random_sample((NUM_CANDIDATES, NUM_VARS))
+    bestRows = np.argsort(costArray)[:5]
+    centers = xArray[rng.choice(bestRows, NUM_LOCAL_CANDIDATES)]
+    localX = np.clip(centers + LOCAL_STEP*rng.standard_normal(centers.shape), 0.0, 1.0)
+
+    return np.vstack([uniformX, localX])
+
+def proposeBatch(xArray, designList, resultList, batchSize, rng):
+    """
+    Kriging-believer batch: pick the acquisition maximizer, pretend its outcome equals the model mean,
+    condition the models on that and pick again, so the batch spreads out instead of stacking on one point.
+    """
+    costArray = np.array([costFromResults(designVec, results) for designVec,results in zip(designList, resultList)])
+    targets = modelTargets(designList, resultList)
+    models = fitModels(xArray, targets)
+
+    feasibleObjectives = [targets["objective"][i] for i in range(len(designList)) if isFeasible(designList[i], resultList[i])]
+    bestLogObjective = min(feasibleObjectives) if feasibleObjectives else None
+
+    candidates = candidateSet(rng, xArray, costArray)
+    batchX = []
+    fantasyX = xArray.copy()
+    for batchIndex in range(batchSize):
+        acqValues = acquisition(models, candidates, bestLogObjective)
+        bestIndex = int(np.argmax(acqValues))
+        newX = candidates[bestIndex]
+        batchX.append(newX.copy())
+        candidates = np.delete(candidates, bestIndex, axis=0)
+
+        fantasyX = np.vstack([fantasyX, newX])
+        for name in targets:
+            targets[name] = np.append(targets[name], models[name].predict(newX[None,:])[0])
+        models = fitModels(fantasyX, targets, models)
+
+    return batchX
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Driver
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def runBayesOpt(evaluateBatch, maxEvals=MAX_EVALS, numInit=NUM_INIT, batchSize=BATCH_SIZE, seed=None, logFunc=None):
+    """
+    Minimize costFromResults with constrained EI.
+    -evaluateBatch(designList) returns [(results, isGood), ...] for full-scale designs
+    -logFunc(designVec, results, costVal), if given, is called for every evaluation
+    Returns (designList, resultList, costList) of every successful evaluation, in evaluation order.
+    """
+    rng = np.random.RandomState(seed)
+    random.seed(seed)
+
+    xList, designList, resultList, costList = [], [], [], []
+    nextX = doe.LHS(NUM_VARS, numInit, seed=rng)
+    numEvals = 0
+    while numEvals < maxEvals:
+        nextX = nextX[:maxEvals-numEvals]
+        nextDesigns = [fullScaleDesign(x) for x in nextX]
+        for x,designVec,(results,isGood) in zip(nextX, nextDesigns, evaluateBatch(nextDesigns)):
+            costVal = costFromResults(designVec, results) if isGood else 1e20
+            if logFunc is not None:
+                logFunc(designVec, results, costVal)
+            if isGood: #failed runs carry no information for the models
+                xList.append(list(x))
+                designList.append(designVec)
+                resultList.append(list(results))
+                costList.append(costVal)
+        numEvals += len(nextX)
+
+        if numEvals < maxEvals and len(designList) >= 2:
+            nextX = proposeBatch(np.array(xList), designList, resultList, batchSize, rng)
+        else:
+            nextX = [list(x) for x in rng.random_sample((batchSize, NUM_VARS))]
+
+    return designList, resultList, costList
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Benchmark against the PSO on the analytic stand-in of evalModel
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def standInBatch(designList):
+    return [(batchEvaluator.standInEvaluator(designVec, 0), True) for designVec in designList]
+
+def psoBestTrace(seed):
+    #ParticleSwarmOpt_LunaCat's generation loop (POP_SIZE, MAX_ITERS, tuned coefficients) on the stand-in;
+    #returns best cost after every solver call, with repeated designs served from a cache as in the real run
+    random.seed(seed)
+    swarm = psoCore.Swarm(doe.LHS(NUM_VARS, POP_SIZE, seed=seed), seed=seed)
+    solvedCosts = {}
+    trace = []
+
+    def evaluate(positions):
+        costs = []
+        for x in positions:
+            designVec = fullScaleDesign(x)
+            key = resultCache.designKey(designVec)
+            if key not in solvedCosts:
+                solvedCosts[key] = costFromResults(designVec, batchEvaluator.standInEvaluator(designVec, 0))
+                trace.append(min(solvedCosts[key], trace[-1]) if trace else solvedCosts[key])
+            costs.append(solvedCosts[key])
+        return costs
+
+    swarm.seedBests(evaluate(swarm.positions))
+    for iterCnt in range(MAX_ITERS+1):
+        swarm.updatePersonalBests(evaluate(swarm.positions))
+        swarm.step()
+        swarm.updateGlobalBest()
+
+    return trace
+
+def benchmarkOptimizers(seeds=(1, 2, 3, 4, 5)):
+    print("seed,psoEvals,psoBest,boEvalsToPsoBest,boBest")
+    for seed in seeds:
+        psoTrace = psoBestTrace(seed)
+        designList, resultList, costList = runBayesOpt(standInBatch, maxEvals=len(psoTrace), seed=seed)
+        boTrace = np.minimum.accumulate(costList)
+
+        reached = np.nonzero(boTrace <= psoTrace[-1])[0]
+        boEvalsToPsoBest = str(reached[0]+1) if len(reached) > 0 else "not reached"
+        print(",".join([str(seed), str(len(psoTrace)), "%.4f"%psoTrace[-1], boEvalsToPsoBest, "%.4f"%boTrace[-1]]))
+
+
+if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmarkOptimizers()
+        sys.exit(0)
+
+    cache = resultCache.ResultCache(resultCacheFileName, modelVersion=getattr(PARALLEL_EVALUATOR, "modelVersion", resultCache.MODEL_VERSION))
+    jobCounter = [1]
+
+    def evaluateBatch(designList):
+        #cache hits come straight back; the misses of a batch run side by side
+        outputList = [None]*len(designList)
+        pendingIndices = []
+        for index,designVec in enumerate(designList):
+            cachedResults = cache.get(designVec)
+            if cachedResults is None:
+                pendingIndices.append(index)
+            else:
+                outputList[index] = (cachedResults, True)
+
+        jobNumbers = [jobCounter[0]+i for i in range(len(pendingIndices))]
+        jobCounter[0] += len(pendingIndices)
+        batchOutput = batchEvaluator.runBatch([designList[index] for index in pendingIndices], evaluator=PARALLEL_EVALUATOR,
+            numWorkers=NUM_WORKERS, jobNumbers=jobNumbers)
+        for index,(results,isGood) in zip(pendingIndices, batchOutput):
+            if isGood:
+                cache.put(designList[index], results)
+            outputList[index] = (results, isGood)
+
+        return outputList
+
+    with open(runListFileName, "w") as outFile:
+        outFile.write("RUN LOG\narm_base_width,arm_base_height,arm_wall_thickness,arm_length,arm_taper_ratio,wall_length,axle_length,material_type,top_opt_thickness,L1,clevis_edge_thickness,veloMagMax,veloAngle,eigenVal1,maxMises,mass,costVal\n")
+    with open(optListFileName, "w") as outFile:
+        outFile.write("OPTIMIZATION LOG-BEST AFTER EACH EVALUATION\narm_base_width,arm_base_height,arm_wall_thickness,arm_length,arm_taper_ratio,wall_length,axle_length,material_type,top_opt_thickness,L1,clevis_edge_thickness,costVal\n")
+
+    bestSoFar = [None, 1e20]
+    def logRun(designVec, results, costVal):
+        fullScaleOutputList = designVec + list(results) + [costVal]
+        print("DV vector full-scale: "+str(fullScaleOutputList))
+        with open(runListFileName, "a") as outFile:
+            outFile.write(",".join([str(x) for x in fullScaleOutputList]) +"\n")
+
+        if costVal < bestSoFar[1]:
+            bestSoFar[0], bestSoFar[1] = designVec, costVal
+        with open(optListFileName, "a") as outFile:
+            outFile.write(",".join([str(x) for x in (bestSoFar[0] or designVec) + [bestSoFar[1]]]) +"\n")
+
+    runBayesOpt(evaluateBatch, logFunc=logRun)
+
+    print("Minimum cost: "+str(bestSoFar[1]))
+    print("DV vector full-scale: "+str(bestSoFar[0]))
+    print(cache.statsString())
+    cache.close()
+
+    print("Done.")
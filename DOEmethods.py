@@ -10,59 +10,461 @@ Created by:
 Adam Kellen '16
 """
 
-import random
+import time
 import numpy
 import itertools
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-def LHS(nV,nS):
-    # Initialization:
-    k=0
-    # Creation of a list dictionary
-    x = {}
-    x[k] = []
+def LHS(nV,nS,seed=None,criterion=None,numIters=None):
+    """
+    Latin hypercube of nS samples in nV variables, as an (nS, nV) array on [0,1).
+    Each column is a random permutation of the nS strata with one uniform point per stratum.
+    -seed: int or numpy RandomState; the same seed gives the same design
+    -criterion: None (purely random), "maximin" or "correlation"; the design is then improved by
+     swapping two entries of one column (which keeps it a Latin hypercube), see optimizeLHS
+    """
+    rng = seed if isinstance(seed, numpy.random.RandomState) else numpy.random.RandomState(seed)
     
-    # Loop elements (part1)
-    for i in range(nV):
-    	x1 = []
+    strata = numpy.argsort(rng.random_sample((nS, nV)), axis=0)
+    x = (strata + rng.random_sample((nS, nV)))/nS
     
-    	for j in range(nS):
-    		a = ((float(int(j)))/nS)
-    		b = ((float(int(j))+1)/nS)
-    		listesample = random.uniform(a,b)
-    		x1.append(listesample)
+    if criterion is not None:
+        x = optimizeLHS(x, criterion, rng, numIters)
     
-    	# Select a random number nP times between each Sample and for each Var
-    	for k in range(nS):
-    		listechoice = random.choice(x1)
-    		x.setdefault(k, []).append(listechoice)
-    		x1.remove(listechoice)
+    return x
+
+#Morris-Mitchell exponent of the maximin criterion phi_p = (sum d_ij^-p)^(1/p); large p approaches
+#"maximize the smallest distance" while still rewarding every pair that moves apart
+PHI_P = 10
+DEFAULT_NUM_ITERS = 2000
+NUM_CROWDED = 10 #maximin swaps start from one of this many most crowded samples
+
+def optimizeLHS(x,criterion="maximin",rng=None,numIters=None):
+    """
+    Column-swap improvement of a Latin hypercube (in place; also returned).
+    Each trial swaps the values of two rows in one random column and keeps the swap if it lowers
+    -"maximin": phi_p; the first row is drawn from the NUM_CROWDED rows closest to a neighbour, and only the two
+     rows' distances change, so a trial costs O(nS*nV) and needs no distance matrix
+    -"correlation": the sum of squared column correlations; a trial costs O(nV)
+    """
+    rng = numpy.random.RandomState() if rng is None else rng
+    numIters = DEFAULT_NUM_ITERS if numIters is None else numIters
+    nS, nV = x.shape
+    if nS < 3:
+        return x
+    
+    def randomPair(i=None):
+        i = rng.randint(nS) if i is None else i
+        j = rng.randint(nS-1)
+        return i, j+1 if j >= i else j
+    
+    if criterion == "maximin":
+        nearestSq = nearestDistanceSq(x)
+        for trial in range(numIters):
+            crowded = numpy.argpartition(nearestSq, NUM_CROWDED)[:NUM_CROWDED] if nS > NUM_CROWDED else numpy.arange(nS)
+            i, j = randomPair(crowded[rng.randint(len(crowded))])
+            col = rng.randint(nV)
+            before = _rowDistanceSq(x, [i,j])
+            nearestSq[[i,j]] = before.min(axis=1) #refresh: other swaps may have moved their neighbours away
+            #only the swapped column's term changes
+            oldI, oldJ = (x[i,col]-x[:,col])**2, (x[j,col]-x[:,col])**2
+            after = before + numpy.array([oldJ-oldI, oldI-oldJ])
+            if _phiSum(after) < _phiSum(before):
+                x[i,col], x[j,col] = x[j,col], x[i,col]
+                nearestSq = numpy.minimum(nearestSq, after.min(axis=0))
+                nearestSq[[i,j]] = after.min(axis=1)
+                
+    elif criterion == "correlation":
+        centered = x - x.mean(axis=0)
+        scale = numpy.sqrt((centered**2).sum(axis=0)) #permutations leave column means and norms unchanged
+        dots = centered.T.dot(centered)
+        for trial in range(numIters):
+            col = rng.randint(nV)
+            i, j = randomPair()
+            #new dot(col, k) = old + (c_jcol - c_icol)*(c_ik - c_jk) for k != col
+            delta = (centered[j,col]-centered[i,col])*(centered[i]-centered[j])
+            delta[col] = 0.0
+            newRow = dots[col] + delta
+            if ((newRow/scale)**2).sum() < ((dots[col]/scale)**2).sum():
+                centered[i,col], centered[j,col] = centered[j,col], centered[i,col]
+                x[i,col], x[j,col] = x[j,col], x[i,col]
+                dots[col] = newRow
+                dots[:,col] = newRow
+                
+    else:
+        raise ValueError("Unknown LHS criterion "+str(criterion)+"; expected 'maximin' or 'correlation'")
+    
+    return x
+
+def _rowDistanceSq(x,rows):
+    #squared distances from each of rows to every sample (inf to itself and between the rows,
+    #which a column swap of those rows leaves unchanged)
+    distSq = ((x[rows,None,:] - x[None,:,:])**2).sum(axis=2)
+    distSq[:,rows] = numpy.inf
+    return distSq
+
+def _phiSum(distSq):
+    return (numpy.maximum(distSq, 1e-300)**(-PHI_P/2.0)).sum()
+
+def nearestDistanceSq(x,chunkSize=1000):
+    #squared distance from every sample to its nearest neighbour, in row chunks so large designs need
+    #no full distance matrix
+    sqNorms = (x**2).sum(axis=1)
+    nearestSq = numpy.empty(len(x))
+    for start in range(0, len(x), chunkSize):
+        block = x[start:start+chunkSize]
+        distSq = sqNorms[start:start+chunkSize,None] + sqNorms[None,:] - 2*block.dot(x.T)
+        distSq[numpy.arange(len(block)), numpy.arange(start, start+len(block))] = numpy.inf
+        nearestSq[start:start+chunkSize] = numpy.maximum(distSq.min(axis=1), 0.0)
+    return nearestSq
+
+def minDistance(x):
+    #smallest distance between two samples
+    return numpy.sqrt(nearestDistanceSq(x).min())
+
+def maxCorrelation(x):
+    #largest |correlation| between two columns
+    corr = numpy.corrcoef(x, rowvar=False)
+    return numpy.abs(corr - numpy.eye(len(corr))).max()
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Quasi-random (low-discrepancy) sequences
+# Point k of a sequence is a function of k alone, so start=k skips ahead: a later batch drawn with the
+# same seed and start = number already drawn extends the earlier one without repeating its coverage
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+SOBOL_BITS = 32
+#Joe-Kuo (new-joe-kuo-6.21201) primitive polynomials and initial direction numbers for dimensions 2..21:
+#(degree s, coefficients a, m_1..m_s); dimension 1 is the van der Corput sequence in base 2
+SOBOL_TABLE = [
+    (1, 0, [1]), (2, 1, [1,3]), (3, 1, [1,3,1]), (3, 2, [1,1,1]), (4, 1, [1,1,3,3]), (4, 4, [1,3,5,13]),
+    (5, 2, [1,1,5,5,17]), (5, 4, [1,1,5,5,5]), (5, 7, [1,1,7,11,19]), (5, 11, [1,1,5,1,1]), (5, 13, [1,1,1,3,11]),
+    (5, 14, [1,3,5,5,31]), (6, 1, [1,3,3,9,7,49]), (6, 13, [1,1,1,15,21,21]), (6, 16, [1,3,1,13,27,49]),
+    (6, 19, [1,1,1,15,7,5]), (6, 22, [1,3,1,15,13,25]), (6, 25, [1,1,5,5,19,61]), (7, 1, [1,3,7,11,23,15,103]),
+    (7, 4, [1,3,7,13,13,15,69]),
+]
+HALTON_PRIMES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59, 61, 67, 71, 73, 79, 83, 89, 97]
+
+def _randomState(seed):
+    return seed if isinstance(seed, numpy.random.RandomState) else numpy.random.RandomState(seed)
+
+def sobolDirections(nV):
+    #(nV, SOBOL_BITS) direction numbers v_k (as integers scaled by 2^SOBOL_BITS)
+    if nV > len(SOBOL_TABLE)+1:
+        raise ValueError("Sobol directions are tabulated for "+str(len(SOBOL_TABLE)+1)+" variables, not "+str(nV))
+    V = numpy.zeros((nV, SOBOL_BITS), dtype=numpy.int64)
+    V[0] = 1 << numpy.arange(SOBOL_BITS-1, -1, -1)
+    for d in range(1, nV):
+        degree, coeffs, mInit = SOBOL_TABLE[d-1]
+        v = [m << (SOBOL_BITS-1-k) for k,m in enumerate(mInit)]
+        for k in range(degree, SOBOL_BITS):
+            newV = v[k-degree] ^ (v[k-degree] >> degree)
+            for i in range(1, degree):
+                if (coeffs >> (degree-1-i)) & 1:
+                    newV ^= v[k-i]
+            v.append(newV)
+        V[d] = v[:SOBOL_BITS]
+    return V
+
+def _linearScramble(V,rng):
+    #left-multiply each dimension's direction numbers by a random unit lower-triangular bit matrix
+    #(bit rows ordered from the most significant bit); the result is still a digital (t,s)-sequence
+    scrambled = numpy.zeros_like(V)
+    for d in range(len(V)):
+        rows = [(int(numpy.dot(rng.randint(0, 2, r), 1 << numpy.arange(SOBOL_BITS-1, SOBOL_BITS-1-r, -1))) if r else 0)
+            | (1 << (SOBOL_BITS-1-r)) for r in range(SOBOL_BITS)]
+        for r,rowMask in enumerate(rows):
+            bits = numpy.array([bin(int(v) & rowMask).count("1") & 1 for v in V[d]], dtype=numpy.int64)
+            scrambled[d] |= bits << (SOBOL_BITS-1-r)
+    return scrambled
+
+def Sobol(nV,nS,seed=None,start=0,scramble=True):
+    """
+    Points start..start+nS-1 of the Sobol sequence in nV variables, as an (nS, nV) array on [0,1).
+    -scramble: random linear matrix scramble plus digital shift from seed (the same seed gives the same
+     sequence, so start can continue it); unscrambled point 0 is the origin
+    Balance properties hold for runs of 2^m points starting at a multiple of 2^m.
+    """
+    V = sobolDirections(nV)
+    shift = numpy.zeros(nV, dtype=numpy.int64)
+    if scramble:
+        rng = _randomState(seed)
+        V = _linearScramble(V, rng)
+        shift = rng.randint(0, 2**16, (2, nV)).astype(numpy.int64)
+        shift = (shift[0] << 16) | shift[1]
+    
+    index = numpy.arange(start, start+nS, dtype=numpy.int64)
+    gray = index ^ (index >> 1)
+    x = numpy.tile(shift, (nS, 1))
+    for bit in range(SOBOL_BITS):
+        hasBit = ((gray >> bit) & 1).astype(bool)
+        x[hasBit] ^= V[:, bit]
+    
+    return x/float(2**SOBOL_BITS)
+
+def Halton(nV,nS,seed=None,start=0,scramble=True):
+    """
+    Points start..start+nS-1 of the Halton sequence (radical inverse of the point index in the first nV primes),
+    as an (nS, nV) array on [0,1).
+    -scramble: each digit position of each base gets a random digit permutation from seed, which breaks up the
+     correlated planes unscrambled Halton shows in the higher bases
+    """
+    if nV > len(HALTON_PRIMES):
+        raise ValueError("Halton is set up for "+str(len(HALTON_PRIMES))+" variables, not "+str(nV))
+    rng = _randomState(seed) if scramble else None
+    
+    index = numpy.arange(start, start+nS, dtype=numpy.int64)
+    x = numpy.zeros((nS, nV))
+    for d,base in enumerate(HALTON_PRIMES[:nV]):
+        numDigits = int(53/numpy.log2(base)) #digits a double can resolve; fixed so start does not change the points
+        remaining = index.copy()
+        scale = 1.0/base
+        for digitPos in range(numDigits):
+            digit = remaining % base
+            if rng is not None:
+                digit = rng.permutation(base)[digit]
+            elif not remaining.any():
+                break
+            x[:,d] += digit*scale
+            remaining //= base
+            scale /= base
+    
+    return x
 
-    return list(x.values())
+SAMPLERS = ["lhs", "sobol", "halton"]
+
+def SpaceFilling(method,nV,nS,seed=None,start=0):
+    #(nS, nV) points from one of SAMPLERS: maximin LHS, or scrambled Sobol/Halton continued from point start
+    #(an LHS batch cannot extend an earlier one, so start does not apply to it)
+    if method == "lhs":
+        return LHS(nV, nS, seed=seed, criterion="maximin")
+    elif method == "sobol":
+        return Sobol(nV, nS, seed=seed, start=start)
+    elif method == "halton":
+        return Halton(nV, nS, seed=seed, start=start)
+    raise ValueError("Unknown sampler "+str(method)+"; expected one of "+", ".join(SAMPLERS))
 
 def FullFactorial(nV,nL):
+    #every combination of nL evenly spaced levels in nV variables, as a list of tuples
+    #(nL**nV rows; use FullFactorialChunks for grids too large to hold in memory)
              
     # Arrays for Itertools
     # temp 1 - possible answers    
     temp = [0.0]*nL
     for i in range(nL):
-        temp[i] = i/(nL-1)
+        temp[i] = float(i)/(nL-1)
 
     # Itertools
     x = list(itertools.product(temp,repeat=nV))
     
     return x
 
-def Taguchi(nV,FileName):
-   
-    DataFile = open(FileName)
-    Data = numpy.loadtxt(DataFile)
+DEFAULT_CHUNK_SIZE = 100000 #rows per full factorial block (about 9 MB at 11 variables)
+
+def FullFactorialChunks(nV,nL,chunkSize=DEFAULT_CHUNK_SIZE,boundsList=None,start=0,stop=None):
+    """
+    FullFactorial as a generator of (<= chunkSize, nV) arrays, in the same row order, so only one block is
+    ever in memory. Row k is the base-nL digits of k (the last variable varies fastest).
+    -boundsList: [[min, max], ...] per variable; blocks are mapped to full scale with scaleToBounds
+    -start/stop: row range, to resume a stream or split the grid between machines
+    """
+    levels = numpy.linspace(0.0, 1.0, nL) if nL > 1 else numpy.zeros(1)
+    placeValues = nL**numpy.arange(nV-1, -1, -1, dtype=numpy.int64)
+    stop = nL**nV if stop is None else min(stop, nL**nV)
+    for blockStart in range(start, stop, chunkSize):
+        rows = numpy.arange(blockStart, min(blockStart+chunkSize, stop), dtype=numpy.int64)
+        x = levels[(rows[:,None]//placeValues) % nL]
+        yield x if boundsList is None else scaleToBounds(x, boundsList)
+
+def scaleToBounds(x,boundsList):
+    #normalized [0,1] samples -> full scale, column i spanning boundsList[i] (the doeInputGen mapping)
+    bounds = numpy.array(boundsList, dtype=float)[:numpy.shape(x)[-1]]
+    return bounds[:,0] + numpy.asarray(x)*(bounds[:,1]-bounds[:,0])
+
+def writeChunks(chunkIter,fileName,header=None):
+    #append every block to a CSV file as it is generated; returns the number of rows written
+    numRows = 0
+    with open(fileName, "w") as outFile:
+        if header is not None:
+            outFile.write(header+"\n")
+        for x in chunkIter:
+            numpy.savetxt(outFile, x, delimiter=",", fmt="%.10g")
+            numRows += len(x)
+    return numRows
+
+def readChunks(fileName,chunkSize=DEFAULT_CHUNK_SIZE,header=True):
+    #the rows of a writeChunks CSV back as (<= chunkSize, nV) arrays, one block in memory at a time
+    with open(fileName, "r") as inFile:
+        if header:
+            inFile.readline()
+        while True:
+            lines = list(itertools.islice(inFile, chunkSize))
+            if not lines:
+                break
+            yield numpy.loadtxt(lines, delimiter=",", ndmin=2)
+
+def Taguchi(nV,FileName=None,levels=2):
+    """
+    nV columns of an orthogonal array, normalized to [0,1] per column.
+    -FileName: whitespace table of levels 1..s (one run per line), as before
+    -otherwise the smallest built-in array (orthogonalArray) with enough columns at levels
+     (an int, or one level count per variable) is used, with no file I/O
+    Asking for more columns than the array has raises ValueError.
+    """
+    if FileName is None:
+        Data = selectArray([levels]*nV if isinstance(levels, int) else levels)
+    else:
+        DataFile = open(FileName)
+        Data = numpy.loadtxt(DataFile, ndmin=2)
+        DataFile.close()
+        if Data.shape[1] < nV:
+            raise ValueError(FileName+" has "+str(Data.shape[1])+" columns; "+str(nV)+" variables need one each")
     
-    MaxVal = numpy.amax(Data)
+    MaxVal = numpy.amax(Data, axis=0)
     
     Fullx = (Data-1)/(MaxVal-1)
     
     x = Fullx[::, 0:nV]
     
     return x
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Orthogonal arrays
+# Built from finite-field (Rao-Hamming) constructions, the cyclic Plackett-Burman design and
+# difference schemes; levels are 1..s as in the Taguchi tables
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+#GF(4) = {0, 1, a, a+1} with a^2 = a+1: addition is XOR
+GF4_MUL = numpy.array([[0,0,0,0], [0,1,2,3], [0,2,3,1], [0,3,1,2]])
+
+#first row of the cyclic 12-run Plackett-Burman design (1 = high)
+PB12_ROW = [1,1,0,1,1,1,0,0,0,1,0]
+
+#difference schemes D(6,6,3) and D(12,12,3): the difference of any two columns (mod 3) takes every value equally often
+D6_3 = ["000000", "002121", "011022", "020112", "021201", "012210"]
+D12_3 = ["000000000000", "020110210212", "022212101010", "012200011221", "001012120221", "010221100122",
+    "002001221112", "020122021101", "002121112200", "011022012012", "011210222100", "021101202021"]
+
+def _raoHamming(q,k):
+    #q^k runs, one column per projective point of GF(q)^k ((q^k-1)/(q-1) columns, strength 2)
+    runs = numpy.array(list(itertools.product(range(q), repeat=k)))
+    points = [p for p in runs if numpy.any(p) and p[numpy.nonzero(p)[0][0]] == 1]
+    cols = []
+    for p in points:
+        if q == 4:
+            col = numpy.zeros(len(runs), dtype=int)
+            for t in range(k):
+                col ^= GF4_MUL[runs[:,t], p[t]]
+        else:
+            col = runs.dot(p) % q
+        cols.append(col)
+    return numpy.array(cols).T + 1
+
+def _plackettBurman12():
+    rows = [numpy.roll(PB12_ROW, shift) for shift in range(11)] + [numpy.zeros(11, dtype=int)]
+    return numpy.array(rows) + 1
+
+def _differenceSchemeArray(scheme,twoLevel,extraThreeLevel):
+    """
+    Runs (g, i) for g in GF(3) and the rows i of a D(n,n,3) scheme: columns twoLevel[i], extraThreeLevel[i],
+    then g + D[i,j] for every column j (the zero column gives g itself). Every pair of columns is
+    balanced, since g runs through GF(3) for each i.
+    """
+    D = numpy.array([[int(c) for c in row] for row in scheme])
+    n = len(D)
+    cols = [numpy.tile(numpy.array(c)[:n], 3) for c in twoLevel + extraThreeLevel]
+    shift = numpy.repeat(numpy.arange(3), n)
+    cols += [(numpy.tile(D[:,j], 3) + shift) % 3 for j in range(n)]
+    return numpy.array(cols).T + 1
+
+def _L18():
+    #2^1 3^7: the two halves of the six scheme rows, i mod 3, and the scheme columns
+    return _differenceSchemeArray(D6_3, [[0,0,0,1,1,1]], [[0,1,2,0,1,2]])
+
+def _L36():
+    #2^11 3^12: the Plackett-Burman columns over the twelve scheme rows, then the scheme columns
+    return _differenceSchemeArray(D12_3, [list(col) for col in (_plackettBurman12()-1).T], [])
+
+#name -> (constructor, levels of its columns), smallest first
+ARRAY_LIBRARY = [
+    ("L4", lambda: _raoHamming(2, 2), [2]*3),
+    ("L8", lambda: _raoHamming(2, 3), [2]*7),
+    ("L9", lambda: _raoHamming(3, 2), [3]*4),
+    ("L12", _plackettBurman12, [2]*11),
+    ("L16", lambda: _raoHamming(2, 4), [2]*15),
+    ("L16b", lambda: _raoHamming(4, 2), [4]*5),
+    ("L18", _L18, [2]+[3]*7),
+    ("L25", lambda: _raoHamming(5, 2), [5]*6),
+    ("L27", lambda: _raoHamming(3, 3), [3]*13),
+    ("L32", lambda: _raoHamming(2, 5), [2]*31),
+    ("L36", _L36, [2]*11+[3]*12),
+    ("L49", lambda: _raoHamming(7, 2), [7]*8),
+    ("L64", lambda: _raoHamming(2, 6), [2]*63),
+    ("L64b", lambda: _raoHamming(4, 3), [4]*21),
+    ("L81", lambda: _raoHamming(3, 4), [3]*40),
+]
+
+_arrayCache = {}
+
+def orthogonalArray(name):
+    #the named array (levels 1..s), built once per session
+    if name not in _arrayCache:
+        constructors = dict([(entry[0], entry[1]) for entry in ARRAY_LIBRARY])
+        if name not in constructors:
+            raise ValueError("Unknown orthogonal array "+str(name)+"; expected one of "+", ".join([entry[0] for entry in ARRAY_LIBRARY]))
+        _arrayCache[name] = constructors[name]()
+    return _arrayCache[name].copy()
+
+def selectArrayName(levels):
+    #smallest array with a column at the right level for every variable (levels: one level count per variable)
+    for name, constructor, colLevels in ARRAY_LIBRARY:
+        if all([colLevels.count(s) >= list(levels).count(s) for s in set(levels)]):
+            return name
+    raise ValueError("No built-in orthogonal array has columns for levels "+str(list(levels)))
+
+def selectArray(levels):
+    #columns of the selected array in variable order (the first unused column of each level)
+    name = selectArrayName(levels)
+    colLevels = [entry[2] for entry in ARRAY_LIBRARY if entry[0] == name][0]
+    Data = orthogonalArray(name)
+    used = set()
+    colIndices = []
+    for s in levels:
+        col = [c for c,level in enumerate(colLevels) if level == s and c not in used][0]
+        used.add(col)
+        colIndices.append(col)
+    return Data[:, colIndices]
+
+def isOrthogonal(Data,strength=2):
+    #every set of `strength` columns shows each level combination equally often
+    Data = numpy.asarray(Data)
+    for cols in itertools.combinations(range(Data.shape[1]), strength):
+        sub = Data[:, cols]
+        combos, counts = numpy.unique(sub, axis=0, return_counts=True)
+        numCombos = numpy.prod([len(numpy.unique(sub[:,c])) for c in range(strength)])
+        if len(combos) != numCombos or counts.min() != counts.max():
+            return False
+    return True
+
+def arrayStrength(Data,maxStrength=3):
+    #largest strength (up to maxStrength) the array has; 0 if a column is unbalanced
+    strength = 0
+    while strength < maxStrength and isOrthogonal(Data, strength+1):
+        strength += 1
+    return strength
+
+if __name__ == "__main__":
+    #python DOEmethods.py: LHS, Sobol and Halton generation time and space filling at surrogate-training sizes
+    print("nS,nV,criterion,numIters,seconds,minDistance,maxCorrelation")
+    for nS in [100, 1000, 10000, 30000]:
+        for criterion, numIters in [(None, 0), ("maximin", 2000), ("correlation", 20000)]:
+            startTime = time.time()
+            x = LHS(11, nS, seed=1, criterion=criterion, numIters=numIters)
+            runtime = time.time()-startTime
+            print(",".join([str(nS), "11", str(criterion), str(numIters), "%.3f"%runtime, "%.4f"%minDistance(x), "%.4f"%maxCorrelation(x)]))
+        for sampler in [Sobol, Halton]:
+            startTime = time.time()
+            x = sampler(11, nS, seed=1)
+            runtime = time.time()-startTime
+            print(",".join([str(nS), "11", sampler.__name__, "0", "%.3f"%runtime, "%.4f"%minDistance(x), "%.4f"%maxCorrelation(x)]))
@@ -31,12 +31,237 @@ import xyPlot
 import connectorBehavior
 import displayGroupOdbToolset as dgo
 import os
+import sys
+import time
 from math import atan2, atan, sin, cos, tan, sqrt
 import Post_P_Script_Velo
 import Post_P_Script
+import jobRunner
+import resultCache
+import modelFidelity
+import inpWriter
+from designGeometry import MATERIAL_PROPERTIES
+
+
+#Sampling interval of the payload velocity / contact force history used to find the release instant.
+#History output is a handful of scalars, so it can be fine while the field output stays coarse.
+RELEASE_HISTORY_INTERVAL = 0.0005 #s
+
+#Restart chain: a pre job solves only the Loading step (wire pre-tension) and writes restart data,
+#then Job-<n> restarts from the end of Loading for BuckleCheck/Launch/FollowThru.
+#The pre job is named after the design, so a repeated design reuses the preload; jobRunner.RestartChain
+#retries a failed restart job once from it and deletes its restart files when the chain succeeds.
+RESTART_MODE = False
+
+#Headless batch mode: every viewport, camera and screenshot call of the build goes through `display`.
+#With HEADLESS on they are skipped (and counted), and Model_Images/Job-<n>.png is only written when asked
+#for (buildInput saveImage, or imageDesign e.g. for a new global best). runDesign turns it on for batch kernels.
+HEADLESS = False
+
+#Template mode: materials, Section-2, the contact property, steps, output settings, amplitude and gravity do not
+#depend on the design, so they are built once per session (per fidelity) in a template model and every design starts
+#from a copy of it instead of from Mdb(); only the geometry-dependent parts, instances and features are rebuilt.
+#Each build's time goes to BUILD_TIMINGS_FILE_NAME; abaqus cae noGUI=LunaCatAbqMainCode.py -- --build-benchmark compares both.
+TEMPLATE_MODE = False
+TEMPLATE_MODEL_PREFIX = 'Template-'
+BUILD_TIMINGS_FILE_NAME = 'BUILD_TIMINGS.csv'
+
+#Direct input: evalModel/evalModelQueue write the reduced-order deck of inpWriter (arm, axle, payload and wire;
+#walls and crossmember idealized as supports) instead of building the CAE model. Results are cached apart from
+#the full model's (batchEvaluator.directEvaluator.modelVersion).
+DIRECT_INPUT = False
+
+
+class DisplayGuard(object):
+    """
+    Single gate for the display calls of the model build.
+    -allow(numCalls, force) says whether a group of display calls should run; skipped calls are counted
+    -show(obj) is the guarded form of the viewport setValues(displayedObject=obj)
+    """
+
+    def __init__(self):
+        self.numSkipped = 0
+
+    def allow(self, numCalls=1, force=False):
+        if force or not HEADLESS:
+            return True
+        self.numSkipped += numCalls
+        return False
+
+    def show(self, obj):
+        if self.allow():
+            session.viewports['Viewport: 1'].setValues(displayedObject=obj)
+
+display = DisplayGuard()
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Design-invariant model features
+# Built inline by buildInput, or once per session into a template model (TEMPLATE_MODE)
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def defineMaterials(ModelName, materialTypes):
+    for materialType in materialTypes:
+        material_name, density, youngs, poisson = MATERIAL_PROPERTIES[materialType]
+        mdb.models[ModelName].Material(name=material_name)
+        mdb.models[ModelName].materials[material_name].Density(table=((density, ), ))
+        mdb.models[ModelName].materials[material_name].Elastic(table=((youngs, 
+            poisson), ))
+
+def defineSteps(ModelName, stepSettings):
+    # Defining Loading step
+    # mdb.models[ModelName].ImplicitDynamicsStep(name='Loading', previous='Initial', 
+        # maxNumInc=30, application=QUASI_STATIC, initialInc=0.1, nohaf=OFF, 
+        # amplitude=RAMP, alpha=DEFAULT, initialConditions=OFF, nlgeom=ON)
+    # mdb.models[ModelName].steps['Loading'].setValues(timePeriod=1.0, maxNumInc=500, 
+        # initialInc=0.1, minInc=5e-05)
+    mdb.models[ModelName].StaticStep(name='Loading', previous='Initial', 
+        maxNumInc=30, initialInc=stepSettings['Loading']['initialInc'], nlgeom=ON)
+    mdb.models[ModelName].steps['Loading'].setValues(timePeriod=1.0, maxNumInc=stepSettings['Loading']['maxNumInc'], minInc=5e-05)
+    
+    # Defining Launch step
+    mdb.models[ModelName].ImplicitDynamicsStep(name='Launch', previous='Loading', 
+        timePeriod=0.01, application=TRANSIENT_FIDELITY, initialInc=stepSettings['Launch']['initialInc'], 
+        minInc=2e-07, nohaf=OFF, initialConditions=ON)
+    mdb.models[ModelName].steps['Launch'].setValues(maxNumInc=stepSettings['Launch']['maxNumInc'])
+    
+    # Defining Buckling step
+    mdb.models[ModelName].BuckleStep(name='BuckleCheck', previous='Loading', numEigen=1, 
+        eigensolver=LANCZOS, minEigen=None, blockSize=DEFAULT, maxBlocks=DEFAULT)
+    
+    # Defining FollowThru step
+    mdb.models[ModelName].ImplicitDynamicsStep(name='FollowThru', previous='Launch', 
+        timePeriod=0.15, application=TRANSIENT_FIDELITY, initialInc=stepSettings['FollowThru']['initialInc'], 
+        minInc=2e-05, nohaf=OFF, initialConditions=ON)
+    mdb.models[ModelName].steps['FollowThru'].setValues(maxNumInc=stepSettings['FollowThru']['maxNumInc']) ####JOB BROKE WITH ONLY 100 INCS LAST TIME   
+       
+    #update save increments for ODB output
+    mdb.models[ModelName].fieldOutputRequests['F-Output-1'].setValuesInStep(
+        stepName='Loading', timeInterval=stepSettings['Loading']['timeInterval'])
+    mdb.models[ModelName].fieldOutputRequests['F-Output-1'].setValuesInStep(
+        stepName='Launch', timeInterval=stepSettings['Launch']['timeInterval'])
+    mdb.models[ModelName].fieldOutputRequests['F-Output-1'].setValuesInStep(
+        stepName='FollowThru', timeInterval=stepSettings['FollowThru']['timeInterval'])
+
+    #  approximate timesteps save to ODB
+    mdb.models[ModelName].fieldOutputRequests['F-Output-1'].setValues(
+        timeMarks=OFF)
+
+    mdb.models[ModelName].SmoothStepAmplitude(name='Amp-1', timeSpan=STEP, data=((
+        0.0, 0.0), (1.0, 1.0)))
 
+def defineContactProperty(ModelName):
+    mdb.models[ModelName].ContactProperty('PayloadRoughContactProp')
+    mdb.models[ModelName].interactionProperties['PayloadRoughContactProp'].TangentialBehavior(
+        formulation=ROUGH)
+    mdb.models[ModelName].interactionProperties['PayloadRoughContactProp'].NormalBehavior(
+        pressureOverclosure=LINEAR, contactStiffness=10000000000.0, 
+        constraintEnforcementMethod=DEFAULT)
 
-def evalModel(BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_LENGTH, AXLE_LENGTH, MATERIAL_TYPE, ToptThickness, L1_percent,CLEVIS_EDGE_THICK,jobNumber):
+def defineGravity(ModelName):
+    mdb.models[ModelName].Gravity(name='Load-1', createStepName='Loading', 
+        comp2=-1.62, distributionType=UNIFORM, field='')
+
+def startFromTemplate(ModelName, fidelity=None):
+    """
+    Replace the previous design's models with a copy of the session template for this fidelity,
+    building the template first if this is the first design of the session at that fidelity.
+    """
+    TemplateName = TEMPLATE_MODEL_PREFIX+modelFidelity.settings(fidelity)['level']
+    if TemplateName not in mdb.models.keys():
+        print('Building the template model '+TemplateName)
+        mdb.Model(name=TemplateName, modelType=STANDARD_EXPLICIT)
+        defineMaterials(TemplateName, sorted(MATERIAL_PROPERTIES.keys()))
+        mdb.models[TemplateName].HomogeneousSolidSection(name='Section-2', 
+            material='Graphite Epoxy AS/3501', thickness=None)
+        defineSteps(TemplateName, modelFidelity.settings(fidelity)['steps'])
+        defineContactProperty(TemplateName)
+        defineGravity(TemplateName)
+    
+    for name in [ModelName, ModelName+'-Pre', ModelName+'-Restart']:
+        if name in mdb.models.keys():
+            del mdb.models[name]
+    mdb.Model(name=ModelName, objectToCopy=mdb.models[TemplateName])
+
+def recordBuildTime(JobName, fidelity, buildSeconds):
+    isNew = not os.path.exists(BUILD_TIMINGS_FILE_NAME)
+    with open(BUILD_TIMINGS_FILE_NAME, 'a') as outFile:
+        if isNew:
+            outFile.write('jobName,templateMode,fidelity,buildSeconds\n')
+        outFile.write('%s,%d,%s,%.2f\n'%(JobName, int(TEMPLATE_MODE), modelFidelity.settings(fidelity)['level'], buildSeconds))
+
+def buildTimeReport(fileName=BUILD_TIMINGS_FILE_NAME):
+    #Mean model build time per design with and without the template, from the timings file
+    timesByMode = {0:[], 1:[]}
+    with open(fileName, 'r') as inFile:
+        for line in inFile.readlines()[1:]:
+            fields = line.strip().split(',')
+            if len(fields) == 4:
+                timesByMode[int(fields[1])].append(float(fields[3]))
+    
+    for mode in [0, 1]:
+        times = timesByMode[mode]
+        if times:
+            print('%s: %d builds, mean %.1f s, first %.1f s, later mean %.1f s'%(['full rebuild', 'template'][mode], len(times),
+                sum(times)/len(times), times[0], sum(times[1:])/max(len(times)-1, 1)))
+
+def benchmarkBuild(designVec, numBuilds=3, fidelity=None):
+    #Build the same design numBuilds times with and without the template (no input decks written)
+    global TEMPLATE_MODE
+    for templateMode in [False, True]:
+        TEMPLATE_MODE = templateMode
+        for buildIndex in range(numBuilds):
+            args = list(designVec) + [9000+buildIndex]
+            buildInput(*args, fidelity=fidelity, writeJob=False)
+    buildTimeReport()
+
+
+def saveModelImage(JobName, a, force=False):
+    #Assembly screenshot to Model_Images/<JobName>.png; returns the path, or None when skipped
+    if not display.allow(numCalls=10, force=force):
+        return None
+    
+    session.viewports['Viewport: 1'].setValues(displayedObject=a)
+    session.viewports['Viewport: 1'].assemblyDisplay.setValues(interactions=OFF, 
+        constraints=OFF, connectors=OFF, engineeringFeatures=OFF)
+    session.viewports['Viewport: 1'].assemblyDisplay.geometryOptions.setValues(
+        datumPoints=OFF, datumAxes=OFF, datumCoordSystems=OFF)
+    session.viewports['Viewport: 1'].view.setProjection(projection=PARALLEL)
+    session.viewports['Viewport: 1'].assemblyDisplay.setValues(
+        renderBeamProfiles=ON)
+    session.viewports['Viewport: 1'].viewportAnnotationOptions.setValues(triad=OFF, 
+        legend=OFF, title=OFF, state=OFF, annotations=OFF, compass=OFF)
+    session.viewports['Viewport: 1'].view.setValues(nearPlane=2.51365, 
+        farPlane=11.3484, cameraPosition=(-1.43814, 3.11208, 8.23335), 
+        cameraUpVector=(0.305995, 0.87474, -0.375762))
+    session.viewports['Viewport: 1'].view.setValues(width=13.0446, height=5.00605, 
+        cameraPosition=(-1.55781, 3.02518, 8.15646), cameraTarget=(2.70012, 
+        1.88139, 2.82202))
+    session.printOptions.setValues(vpDecorations=OFF)
+    
+    #Build image filepath
+    currentPath = os.getcwd()
+    outPath = os.path.join(currentPath,"Model_Images",JobName)
+    print(outPath)
+    if not os.path.isdir(os.path.dirname(outPath)):
+        os.makedirs(os.path.dirname(outPath))
+    
+    session.printToFile(
+        fileName=outPath, 
+        format=PNG, canvasObjects=(session.viewports['Viewport: 1'], ))
+    
+    return outPath+'.png'
+
+
+def buildInput(BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_LENGTH, AXLE_LENGTH, MATERIAL_TYPE, ToptThickness, L1_percent,CLEVIS_EDGE_THICK,jobNumber,fidelity=None,saveImage=False,writeJob=True):
+    """
+    Build phase: generates the full CAE model for one design and writes Job-<jobNumber>.inp
+    -fidelity picks the seed sizes and step increments from modelFidelity (None = the medium baseline)
+    -saveImage writes Model_Images/Job-<jobNumber>.png even in HEADLESS mode
+    -writeJob=False stops after the model (and its image) is built; nothing is written and buildData is None
+    Returns the job name and buildData: the assembly mass (read here while the model is still in the mdb)
+    and, with RESTART_MODE, the name of the pre job that Job-<jobNumber> restarts from
+    """
     print(BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_LENGTH, AXLE_LENGTH, MATERIAL_TYPE, ToptThickness, L1_percent, CLEVIS_EDGE_THICK)
     ######################################
     # Variable and Fixed Design Parameters
@@ -44,6 +269,10 @@ def evalModel(BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_
 
     ModelName='Model-1'
     JobName = 'Job-'+str(jobNumber)
+    fidelitySettings = modelFidelity.settings(fidelity)
+    numSkippedBefore = display.numSkipped
+    seedSizes = fidelitySettings['seedSizes']
+    stepSettings = fidelitySettings['steps']
     #Arm
     #BASE_WIDTH = 0.15 #m ###DESIGN VARIABLE
     #BASE_HEIGHT = 0.07 #m ###DESIGN VARIABLE
@@ -97,21 +326,7 @@ def evalModel(BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_
     
     
     #Material properties
-    if MATERIAL_TYPE == 1.0:
-        material_name = 'Aluminum-2024'
-        density = 2780.0 #kg/m^3
-        youngs = 73100000000.0 #Pa
-        poisson = 0.33 
-    elif MATERIAL_TYPE == 2.0:
-        material_name = 'Aluminum-6061'
-        density = 2700.0 #kg/m^3
-        youngs = 68900000000.0 #Pa
-        poisson = 0.33 
-    elif MATERIAL_TYPE == 3.0:
-        material_name = 'Ti-6Al-4V'
-        density = 4429.0 #kg/m^3
-        youngs = 116000000000.0 #Pa
-        poisson = 0.31
+    material_name = MATERIAL_PROPERTIES[MATERIAL_TYPE][0]
 
 
     # New variables from top opt
@@ -164,8 +379,9 @@ def evalModel(BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_
     ####################################
 
     session.journalOptions.setValues(replayGeometry=COORDINATE,recoverGeometry=COORDINATE)
-    session.viewports['Viewport: 1'].assemblyDisplay.geometryOptions.setValues(
-        datumPlanes=OFF)
+    if display.allow():
+        session.viewports['Viewport: 1'].assemblyDisplay.geometryOptions.setValues(
+            datumPlanes=OFF)
 
     # ### Write data file column headings
     # DataFile = open('PostData.txt','w')
@@ -182,7 +398,11 @@ def evalModel(BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_
 
     ### Scripting the entire model allows its entire
     ### contents to be packaged into this single file.
-    Mdb() 
+    buildStart = time.time()
+    if TEMPLATE_MODE:
+        startFromTemplate(ModelName, fidelity)
+    else:
+        Mdb() 
 
 
     ##################################  
@@ -289,18 +509,18 @@ def evalModel(BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_
     print("Finished Top Opt Cut")
     ## Cleaning up model
     p1 = mdb.models[ModelName].parts['XbeamCutOut']
-    session.viewports['Viewport: 1'].setValues(displayedObject=p1)
+    display.show(p1)
     del mdb.models[ModelName].parts['XbeamCutOut']
     p = mdb.models[ModelName].parts['Side_wall_1']
-    session.viewports['Viewport: 1'].setValues(displayedObject=p)
+    display.show(p)
     p1 = mdb.models[ModelName].parts['SquareCutOut']
-    session.viewports['Viewport: 1'].setValues(displayedObject=p1)
+    display.show(p1)
     del mdb.models[ModelName].parts['SquareCutOut']
     p = mdb.models[ModelName].parts['Side_wall_1']
-    session.viewports['Viewport: 1'].setValues(displayedObject=p)
+    display.show(p)
     del mdb.models[ModelName].parts['Side_wall_1']
     p = mdb.models[ModelName].parts['TopOptCut']
-    session.viewports['Viewport: 1'].setValues(displayedObject=p)
+    display.show(p)
     mdb.models[ModelName].parts.changeKey(fromName='TopOptCut', 
         toName='Side_wall_1')
 
@@ -596,10 +816,8 @@ def evalModel(BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_
 
     #Creating Material
     print('Creating the Materials')
-    mdb.models[ModelName].Material(name=material_name)
-    mdb.models[ModelName].materials[material_name].Density(table=((density, ), ))
-    mdb.models[ModelName].materials[material_name].Elastic(table=((youngs, 
-        poisson), ))
+    if not TEMPLATE_MODE:
+        defineMaterials(ModelName, [MATERIAL_TYPE])
 
     # #Creating Graphite
     # mdb.models[ModelName].Material(name='Graphite Epoxy AS/3501')
@@ -628,8 +846,9 @@ def evalModel(BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_
         material=material_name, thickness=None)
         
     #Creating Section 2
-    mdb.models[ModelName].HomogeneousSolidSection(name='Section-2', 
-        material='Graphite Epoxy AS/3501', thickness=None)
+    if not TEMPLATE_MODE:
+        mdb.models[ModelName].HomogeneousSolidSection(name='Section-2', 
+            material='Graphite Epoxy AS/3501', thickness=None)
 
     #Creating Section 3
     mdb.models[ModelName].HomogeneousSolidSection(name='Section-3', 
@@ -1023,7 +1242,7 @@ def evalModel(BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_
 
     #### SIDE WALL 2 will now be created ####
     p1 = mdb.models[ModelName].parts['Side_wall_1']
-    session.viewports['Viewport: 1'].setValues(displayedObject=p1)
+    display.show(p1)
     p = mdb.models[ModelName].Part(name='Side_wall_2', 
         objectToCopy=mdb.models[ModelName].parts['Side_wall_1'])
     p = mdb.models[ModelName].parts['Side_wall_2']
@@ -1173,7 +1392,7 @@ def evalModel(BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_
 
     #### SIDE WALL 2 will now be created ####
     p1 = mdb.models[ModelName].parts['Side_wall_1']
-    session.viewports['Viewport: 1'].setValues(displayedObject=p1)
+    display.show(p1)
     p = mdb.models[ModelName].Part(name='Side_wall_2', 
         objectToCopy=mdb.models[ModelName].parts['Side_wall_1'])
     p = mdb.models[ModelName].parts['Side_wall_2']
@@ -1391,7 +1610,7 @@ def evalModel(BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_
     p.BaseWire(sketch=s)
     s.unsetPrimaryObject()
     p = mdb.models[ModelName].parts['WIRE_BOI']
-    session.viewports['Viewport: 1'].setValues(displayedObject=p)
+    display.show(p)
     del mdb.models[ModelName].sketches['__profile__']
 
     #create wire material with negative thermal expansion
@@ -1427,7 +1646,7 @@ def evalModel(BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_
     a.regenerate()
 
     #Mesh the wire with a very coarse mesh
-    p.seedPart(size=1.0, deviationFactor=0.1, minSizeFactor=0.75)
+    p.seedPart(size=seedSizes['WIRE_BOI'], deviationFactor=0.1, minSizeFactor=0.75)
     elemType1 = mesh.ElemType(elemCode=B31, elemLibrary=STANDARD)
     pickedRegions =(allEdges, )
     p.setElementType(regions=pickedRegions, elemTypes=(elemType1, ))
@@ -1458,46 +1677,9 @@ def evalModel(BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_
         region=region, distributionType=UNIFORM, 
         crossSectionDistribution=CONSTANT_THROUGH_THICKNESS, magnitudes=(0.0, ))
 
-    # Defining Loading step
-    # mdb.models[ModelName].ImplicitDynamicsStep(name='Loading', previous='Initial', 
-        # maxNumInc=30, application=QUASI_STATIC, initialInc=0.1, nohaf=OFF, 
-        # amplitude=RAMP, alpha=DEFAULT, initialConditions=OFF, nlgeom=ON)
-    # mdb.models[ModelName].steps['Loading'].setValues(timePeriod=1.0, maxNumInc=500, 
-        # initialInc=0.1, minInc=5e-05)
-    mdb.models[ModelName].StaticStep(name='Loading', previous='Initial', 
-        maxNumInc=30, initialInc=0.1, nlgeom=ON)
-    mdb.models[ModelName].steps['Loading'].setValues(timePeriod=1.0, maxNumInc=500, minInc=5e-05)
-        
-    # Defining Launch step
-    mdb.models[ModelName].ImplicitDynamicsStep(name='Launch', previous='Loading', 
-        timePeriod=0.01, application=TRANSIENT_FIDELITY, initialInc=0.01, 
-        minInc=2e-07, nohaf=OFF, initialConditions=ON)
-    mdb.models[ModelName].steps['Launch'].setValues(maxNumInc=500)
-    
-    # Defining Buckling step
-    mdb.models[ModelName].BuckleStep(name='BuckleCheck', previous='Loading', numEigen=1, 
-        eigensolver=LANCZOS, minEigen=None, blockSize=DEFAULT, maxBlocks=DEFAULT)
-    
-    # Defining FollowThru step
-    mdb.models[ModelName].ImplicitDynamicsStep(name='FollowThru', previous='Launch', 
-        timePeriod=0.15, application=TRANSIENT_FIDELITY, initialInc=0.015, 
-        minInc=2e-05, nohaf=OFF, initialConditions=ON)
-    mdb.models[ModelName].steps['FollowThru'].setValues(maxNumInc=300) ####JOB BROKE WITH ONLY 100 INCS LAST TIME   
-       
-    #update save increments for ODB output
-    mdb.models[ModelName].fieldOutputRequests['F-Output-1'].setValuesInStep(
-        stepName='Loading', timeInterval=0.1)
-    mdb.models[ModelName].fieldOutputRequests['F-Output-1'].setValuesInStep(
-        stepName='Launch', timeInterval=0.005)
-    mdb.models[ModelName].fieldOutputRequests['F-Output-1'].setValuesInStep(
-        stepName='FollowThru', timeInterval=0.025)
-
-    #  approximate timesteps save to ODB
-    mdb.models[ModelName].fieldOutputRequests['F-Output-1'].setValues(
-        timeMarks=OFF)
+    if not TEMPLATE_MODE:
+        defineSteps(ModelName, stepSettings)
 
-    mdb.models[ModelName].SmoothStepAmplitude(name='Amp-1', timeSpan=STEP, data=((
-        0.0, 0.0), (1.0, 1.0)))
     mdb.models[ModelName].predefinedFields['WireTemp'].setValuesInStep(
         stepName='Loading', magnitudes=(1.0, ), amplitude='Amp-1')
 
@@ -1564,12 +1746,8 @@ def evalModel(BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_
 
     #ADD CONTACT
     #define contact property
-    mdb.models[ModelName].ContactProperty('PayloadRoughContactProp')
-    mdb.models[ModelName].interactionProperties['PayloadRoughContactProp'].TangentialBehavior(
-        formulation=ROUGH)
-    mdb.models[ModelName].interactionProperties['PayloadRoughContactProp'].NormalBehavior(
-        pressureOverclosure=LINEAR, contactStiffness=10000000000.0, 
-        constraintEnforcementMethod=DEFAULT)
+    if not TEMPLATE_MODE:
+        defineContactProperty(ModelName)
     
     #Create non-sliding contact b/n payload and arm
     region1=a.instances['ARM-1'].surfaces['SPOON_TOP_SURF']
@@ -1581,13 +1759,21 @@ def evalModel(BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_
         adjustMethod=SET, initialClearance=OMIT, datumAxis=None, 
         clearanceRegion=None, tied=OFF, adjustSet=regionDef)
 
+    #High-rate history of the payload pull point and the payload/arm contact force;
+    #Post_P_Script interpolates the contact-loss instant from these instead of scanning field frames
+    region = a.instances['Payload-1'].sets['PAY_PULL_POINT']
+    mdb.models[ModelName].HistoryOutputRequest(name='H-Output-Release', createStepName='Launch', 
+        variables=('V1', 'V2'), region=region, timeInterval=RELEASE_HISTORY_INTERVAL)
+    mdb.models[ModelName].HistoryOutputRequest(name='H-Output-Contact', createStepName='Launch', 
+        variables=('CFNM', ), interactions=('ROUGH_CONTACT', ), timeInterval=RELEASE_HISTORY_INTERVAL)
+
     ##################################  
     #Create Loads
     ##################################  
     print('Defining Loads')
     #creating gravity
-    mdb.models[ModelName].Gravity(name='Load-1', createStepName='Loading', 
-        comp2=-1.62, distributionType=UNIFORM, field='')
+    if not TEMPLATE_MODE:
+        defineGravity(ModelName)
         
     #BuckleCheck Dummy Load
     region = a.instances['Payload-1'].sets['PAY_PULL_POINT']
@@ -1628,7 +1814,7 @@ def evalModel(BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_
     print('Meshing the Arm')
     ##Meshing Arm
     p = mdb.models[ModelName].parts['ARM']
-    p.seedPart(size=0.1, deviationFactor=0.1, minSizeFactor=0.1)
+    p.seedPart(size=seedSizes['ARM'], deviationFactor=0.1, minSizeFactor=0.1)
     p.generateMesh()
 
     print('Meshing the Crossmember')
@@ -1648,37 +1834,37 @@ def evalModel(BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_
     p.setElementType(regions=pickedRegions, elemTypes=(elemType1,elemType3))
     # p.setElementType(regions=pickedRegions, elemTypes=(elemType1, elemType2, 
         # elemType3))
-    p.seedPart(size=0.05, deviationFactor=0.1, minSizeFactor=0.1)
+    p.seedPart(size=seedSizes['CROSSMEMBER'], deviationFactor=0.1, minSizeFactor=0.1)
     p.generateMesh()
 
     print('Meshing the Axle')
     ##Meshing Connector beam
     p = mdb.models[ModelName].parts['Connector_beam']
-    p.seedPart(size=0.05, deviationFactor=0.1, minSizeFactor=0.1)
+    p.seedPart(size=seedSizes['Connector_beam'], deviationFactor=0.1, minSizeFactor=0.1)
     p.generateMesh()
 
     print('Meshing the Pyaload')
     ##Meshing Payload
     p = mdb.models[ModelName].parts['Payload']
-    p.seedPart(size=0.05, deviationFactor=0.1, minSizeFactor=0.1)
+    p.seedPart(size=seedSizes['Payload'], deviationFactor=0.1, minSizeFactor=0.1)
     p.generateMesh()
 
     print('Meshing the Sidewall 1')
     ##Meshing Side wall 1
     p = mdb.models[ModelName].parts['Side_wall_1']
-    p.seedPart(size=0.1, deviationFactor=0.1, minSizeFactor=0.1)
+    p.seedPart(size=seedSizes['Side_wall_1'], deviationFactor=0.1, minSizeFactor=0.1)
     p.generateMesh()
 
     print('Meshing the Sidewall 2')
     ##Meshing Side wall 2
     p = mdb.models[ModelName].parts['Side_wall_2']
-    p.seedPart(size=0.1, deviationFactor=0.1, minSizeFactor=0.1)
+    p.seedPart(size=seedSizes['Side_wall_2'], deviationFactor=0.1, minSizeFactor=0.1)
     p.generateMesh()
 
     print('Meshing the Wire')
     ##Meshing wire
     p = mdb.models[ModelName].parts['WIRE_BOI']
-    session.viewports['Viewport: 1'].setValues(displayedObject=p)
+    display.show(p)
     p.generateMesh()
     
     ####################################
@@ -1698,39 +1884,57 @@ def evalModel(BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_
     #######################
     # Take Picture of Model
     #######################
-    session.viewports['Viewport: 1'].setValues(displayedObject=a)
-    session.viewports['Viewport: 1'].assemblyDisplay.setValues(interactions=OFF, 
-        constraints=OFF, connectors=OFF, engineeringFeatures=OFF)
-    session.viewports['Viewport: 1'].assemblyDisplay.geometryOptions.setValues(
-        datumPoints=OFF, datumAxes=OFF, datumCoordSystems=OFF)
-    session.viewports['Viewport: 1'].view.setProjection(projection=PARALLEL)
-    session.viewports['Viewport: 1'].assemblyDisplay.setValues(
-        renderBeamProfiles=ON)
-    session.viewports['Viewport: 1'].viewportAnnotationOptions.setValues(triad=OFF, 
-        legend=OFF, title=OFF, state=OFF, annotations=OFF, compass=OFF)
-    session.viewports['Viewport: 1'].view.setValues(nearPlane=2.51365, 
-        farPlane=11.3484, cameraPosition=(-1.43814, 3.11208, 8.23335), 
-        cameraUpVector=(0.305995, 0.87474, -0.375762))
-    session.viewports['Viewport: 1'].view.setValues(width=13.0446, height=5.00605, 
-        cameraPosition=(-1.55781, 3.02518, 8.15646), cameraTarget=(2.70012, 
-        1.88139, 2.82202))
-    session.printOptions.setValues(vpDecorations=OFF)
+    saveModelImage(JobName, a, force=saveImage)
+    print 'Display calls skipped (headless): %d this design, %d this session'%(display.numSkipped-numSkippedBefore, display.numSkipped)
     
-    #Build image filepath
-    currentPath = os.getcwd()
-    outPath = os.path.join(currentPath,"Model_Images",JobName)
-    print(outPath)
+    buildSeconds = time.time()-buildStart
+    recordBuildTime(JobName, fidelity, buildSeconds)
+    print 'Model build: %.1f s (template mode %s)'%(buildSeconds, TEMPLATE_MODE)
     
-    session.printToFile(
-        fileName=outPath, 
-        format=PNG, canvasObjects=(session.viewports['Viewport: 1'], ))
+    if not writeJob:
+        return JobName, None
 
     ####################################
-    ## Creation/Execution of the Job ###
+    ## Creation of the Job/Input File ###
     ####################################
-    print 'Creating/Running Job'
+    print 'Writing input file'
+    
+    if RESTART_MODE:
+        designVec = [BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_LENGTH, AXLE_LENGTH, MATERIAL_TYPE, ToptThickness, L1_percent, CLEVIS_EDGE_THICK]
+        PreJobName = 'Pre-'+resultCache.designKey(designVec, modelFidelity.modelVersion(fidelity))[:12]
+        
+        #restart data once, at the end of the preload
+        mdb.models[ModelName].steps['Loading'].Restart(frequency=0, numberIntervals=1, 
+            overlay=ON, timeMarks=OFF)
+        
+        #pre job: Loading only
+        PreModelName = ModelName+'-Pre'
+        mdb.Model(name=PreModelName, objectToCopy=mdb.models[ModelName])
+        for stepName in ['FollowThru', 'Launch', 'BuckleCheck']:
+            mdb.models[PreModelName].steps[stepName].suppress()
+        writeJobInput(PreJobName, PreModelName, ANALYSIS)
+        
+        #restart job: everything after Loading
+        RestartModelName = ModelName+'-Restart'
+        mdb.Model(name=RestartModelName, objectToCopy=mdb.models[ModelName])
+        mdb.models[RestartModelName].setValues(restartJob=PreJobName, restartStep='Loading', 
+            restartIncrement=STEP_END)
+        writeJobInput(JobName, RestartModelName, RESTART)
+    else:
+        PreJobName = None
+        writeJobInput(JobName, ModelName, ANALYSIS)
+
+    # Mass
+    prop = mdb.models[ModelName].rootAssembly.getMassProperties()
+    mass = prop['mass']
     
-    mdb.Job(name=JobName, model=ModelName, description='', type=ANALYSIS, 
+    return JobName, {'mass':mass, 'preJobName':PreJobName}
+
+
+def writeJobInput(JobName, ModelName, jobType):
+    if JobName in mdb.jobs.keys(): #a retried design (or pre job) in the same session
+        del mdb.jobs[JobName]
+    mdb.Job(name=JobName, model=ModelName, description='', type=jobType, 
         atTime=None, waitMinutes=0, waitHours=0, queue=None, memory=90, 
         memoryUnits=PERCENTAGE, getMemoryFromAnalysis=True, 
         explicitPrecision=SINGLE, nodalOutputPrecision=SINGLE, echoPrint=OFF, 
@@ -1739,30 +1943,70 @@ def evalModel(BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_
         numDomains=4, numGPUs=0)
 
     job=mdb.jobs[JobName]
+    job.writeInput(consistencyChecking=OFF)
 
-    #delete lock file, which for some reason tends to hang around, if it exists
-    if os.access('%s.lck'%JobName,os.F_OK):
-        os.remove('%s.lck'%JobName)
-           
-    job.submit()
-    job.waitForCompletion()
-    print 'Completed job'
 
+def imageDesign(designVec, jobNumber, fidelity=None):
+    #Rebuild a design only to photograph it (no input deck); used for images on request, e.g. new global bests
+    args = list(designVec) + [jobNumber]
+    buildInput(*args, fidelity=fidelity, saveImage=True, writeJob=False)
+    return os.path.join(os.getcwd(), "Model_Images", 'Job-'+str(jobNumber)+'.png')
 
+
+def harvestResults(JobName, buildData):
+    """
+    Harvest phase: reads the finished job's ODB through the post-processor
+    -buildData is what buildInput returned: the mass and, for a restart chain, the pre job name
+    """
     ##################################      
     #Output Variables
     ################################## 
 
-    # Mass
-    prop = mdb.models[ModelName].rootAssembly.getMassProperties()
-    mass = prop['mass']
-
     # Max Mises stress in structure
-    veloMagMax,veloAngle,eigenVal1,maxMises = Post_P_Script.getResults(JobName) 
+    veloMagMax,veloAngle,eigenVal1,maxMises = Post_P_Script.getResults(JobName, preJobName=buildData['preJobName']) 
     
-    return veloMagMax,veloAngle,eigenVal1,maxMises,mass 
+    return veloMagMax,veloAngle,eigenVal1,maxMises,buildData['mass'] 
     # return 0.0,0.0,1.0,0.0,mass 
 
+
+def buildDesign(designVec, jobNumber, fidelity=None):
+    #Build phase of evalModel/evalModelQueue: the CAE model, or with DIRECT_INPUT the deck written straight from Python
+    if DIRECT_INPUT:
+        print 'Writing direct input file'
+        return inpWriter.writeDeck(designVec, jobNumber, fidelity=fidelity)
+
+    args = list(designVec) + [jobNumber]
+    return buildInput(*args, fidelity=fidelity)
+
+
+def evalModel(BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_LENGTH, AXLE_LENGTH, MATERIAL_TYPE, ToptThickness, L1_percent,CLEVIS_EDGE_THICK,jobNumber,fidelity=None):
+    #Build, solve and post-process one design, blocking until the job completes
+    designVec = [BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_LENGTH, AXLE_LENGTH, MATERIAL_TYPE, ToptThickness, L1_percent, CLEVIS_EDGE_THICK]
+    JobName, buildData = buildDesign(designVec, jobNumber, fidelity=fidelity)
+
+    print 'Running Job'
+    process = jobRunner.submitJob(JobName, buildData)
+    jobRunner.waitForJob(process, JobName)
+    print 'Completed job'
+
+    return harvestResults(JobName, buildData)
+
+
+def evalModelQueue(designList, jobNumbers=None, maxRunning=2, callback=None, fidelity=None, scheduler=None):
+    """
+    Pipelined evaluation of a queue of designs: the CAE build of design k+1
+    runs while design k is still solving. Results come back in designList order.
+    -scheduler (jobScheduler.JobScheduler) sizes CPUs and concurrency per job instead of maxRunning
+    """
+    def buildFunc(designVec, jobNumber):
+        return buildDesign(designVec, jobNumber, fidelity=fidelity)
+
+    return jobRunner.pipelineDesigns(designList, buildFunc, harvestResults, jobNumbers=jobNumbers, maxRunning=maxRunning, callback=callback, scheduler=scheduler)
+
+
 if __name__ == "__main__":
     #BASE_WIDTH, BASE_HEIGHT, THICKNESS, ARM_LENGTH, TAPER_RATIO, WALL_LENGTH, AXLE_LENGTH, MATERIAL_TYPE, ToptThickness, L1_percent, CLEVIS_EDGE_THICK
-    print(evalModel(0.4, 0.3, 0.0225, 5.0, 1.0, 4.0, 4.0, 3, 0.2, 20.0, 0.1, 1))
\ No newline at end of file
+    if "--build-benchmark" in sys.argv:
+        benchmarkBuild([0.4, 0.3, 0.0225, 5.0, 1.0, 4.0, 4.0, 3, 0.2, 20.0, 0.1])
+    else:
+        print(evalModel(0.4, 0.3, 0.0225, 5.0, 1.0, 4.0, 4.0, 3, 0.2, 20.0, 0.1, 1))
\ No newline at end of file
@@ -1,9 +1,14 @@
 #Particle Swarm Optimizer
 #R. Mason Ward
 
+import sys
 import random
 import DOEmethods as doe
-from LunaCatAbqMainCode import evalModel
+import psoCore
+import resultCache
+import batchEvaluator
+import modelFidelity
+import designGeometry
 
 
 # random.seed(50)
@@ -11,11 +16,58 @@ from LunaCatAbqMainCode import evalModel
 optListFileName = "OPT_LOG.csv"
 runListFileName = "RUNNING_LOG.csv"
 currentBestFileName = "CURRENT_BEST.txt"
+checkpointFileName = "PSO_CHECKPOINT.pkl"
+resultCacheFileName = resultCache.CACHE_FILE_NAME
 
 #Configuration
 POP_SIZE = 6
 MAX_ITERS = 10
 
+#Evaluation mode
+# "serial" - one particle at a time inside this CAE kernel
+# "sync"   - every particle of a generation is dispatched to the worker pool at once
+# "async"  - each particle moves on as soon as its own evaluation returns
+EVAL_MODE = "serial"
+NUM_WORKERS = batchEvaluator.defaultNumWorkers()
+SERIAL_EVALUATOR = batchEvaluator.inProcessEvaluator
+PARALLEL_EVALUATOR = batchEvaluator.abaqusEvaluator
+#to optimize on the fitted surrogate instead (python surrogateModel.py first), point the evaluators at
+#surrogateModel.surrogateEvaluator; its results are cached under a separate model version
+#(batchEvaluator.directEvaluator likewise screens on the reduced-order decks of inpWriter, without CAE builds)
+
+#Surrogate pre-screening of moves: each particle draws PRESCREEN_CANDIDATES random steps and takes the one
+#surrogateModel.prescreen ranks best, so only the most promising position per particle goes to the solver
+SURROGATE_PRESCREEN = False
+PRESCREEN_CANDIDATES = 200
+
+#Images of new global bests (Model_Images/Job-<n>.png); batch kernels are headless and photograph nothing else.
+#A serial run inside CAE photographs every job already, unless LunaCatAbqMainCode.HEADLESS is set
+#(then use batchEvaluator.inProcessImage here)
+GBEST_IMAGES = True
+SERIAL_IMAGER = None
+PARALLEL_IMAGER = batchEvaluator.abaqusImage
+
+#Multi-fidelity screening ("sync" mode only): every generation is first solved on SCREEN_FIDELITY meshes and
+#only the NUM_PROMOTE lowest screening costs are re-solved at FINE_FIDELITY (see modelFidelity.screenAndPromote)
+MULTI_FIDELITY = False
+SCREEN_FIDELITY = "coarse"
+FINE_FIDELITY = modelFidelity.DEFAULT_FIDELITY
+NUM_PROMOTE = 2
+
+#Designs buildInput cannot build (designGeometry.geometryViolations) are never dispatched: they score 1e20, as a failed run.
+#Analytic mass screening (serial and sync modes, after the seed generation): every particle is weighed with
+#designGeometry.analyticMass before it is sent to Abaqus
+#-heavier than MAX_MASS (kg, None = no limit): cost 1e15 without a run
+#-mass term alone (less MASS_BOUND_MARGIN for the calculator's error) not below the particle's personal best:
+# the run cannot improve it, so it is skipped and scored with that lower bound
+MAX_MASS = None
+MASS_BOUND_MARGIN = 0.01
+
+#Checkpoint/resume
+#run with "-- --resume" (or set RESUME = True) to continue from checkpointFileName and append to the logs
+RESUME = "--resume" in sys.argv
+CHECKPOINT_EVERY = 1 #completed evaluations between checkpoints (generation ends are always saved)
+
 NUM_VARS = 11
 
 arm_base_width_min = 0.1 #m #
@@ -80,195 +132,433 @@ ALPHA = 0.25#0.3
 P_BEST_COEFF = 0.85
 G_BEST_COEFF = 0.025#0.2
 
+#Initial swarm: one of DOEmethods.SAMPLERS ("lhs" = maximin Latin hypercube, "sobol"/"halton" = scrambled
+#low-discrepancy points); INIT_SEED = None draws a new swarm every run
+INIT_SAMPLER = "lhs"
+INIT_SEED = None
+
 numEvals = 1
 
 #To be used for convergence plotting later
 iterNums = []
 massNums = []
 
-#[t_skin,t_stiff,n_stiff,h_stiff,w_stiff,gFuncBest]
-with open(currentBestFileName, "w") as outFile:
-    outFile.write("Global Best Update Log\n")
+#designs already solved (this run or earlier ones) are looked up instead of re-run
+#(screenCache holds the SCREEN_FIDELITY results of a multi-fidelity run)
+cache = None
+screenCache = None
 
-with open(optListFileName, "w") as outFile:
-    outFile.write("OPTIMIZATION LOG-BEST PER GENERATION\narm_base_width,arm_base_height,arm_wall_thickness,arm_length,arm_taper_ratio,wall_length,axle_length,material_type,top_opt_thickness,L1,clevis_edge_thickness,costVal\n")
-    
-with open(runListFileName, "w") as outFile:
-    outFile.write("RUN LOG\narm_base_width,arm_base_height,arm_wall_thickness,arm_length,arm_taper_ratio,wall_length,axle_length,material_type,top_opt_thickness,L1,clevis_edge_thickness,veloMagMax,veloAngle,eigenVal1,maxMises,mass,costVal\n")    
+#psoCore.Swarm holding positions, velocities and personal/global bests as arrays
+swarm = None
+
+#loop position, saved in every checkpoint
+# iterCnt/phase          - generation counter and where in it we are ("start", "seed" or "gen")
+# genCosts/genJobNumbers - per-particle results of the population evaluation in progress (None = not run yet)
+# evalCounts/numCompleted - async mode bookkeeping
+runState = None
+evalsSinceCheckpoint = 0
+
+def initLogs():
+    #[t_skin,t_stiff,n_stiff,h_stiff,w_stiff,gFuncBest]
+    with open(currentBestFileName, "w") as outFile:
+        outFile.write("Global Best Update Log\n")
+
+    with open(optListFileName, "w") as outFile:
+        outFile.write("OPTIMIZATION LOG-BEST PER GENERATION\narm_base_width,arm_base_height,arm_wall_thickness,arm_length,arm_taper_ratio,wall_length,axle_length,material_type,top_opt_thickness,L1,clevis_edge_thickness,costVal\n")
+        
+    with open(runListFileName, "w") as outFile:
+        outFile.write("RUN LOG\narm_base_width,arm_base_height,arm_wall_thickness,arm_length,arm_taper_ratio,wall_length,axle_length,material_type,top_opt_thickness,L1,clevis_edge_thickness,veloMagMax,veloAngle,eigenVal1,maxMises,mass,costVal\n")    
 
 def mapNormedVecToFullScale(varVec):
     listToAdd = []
     for i,boundTuple in enumerate(boundsList):
-        percentVal = varVec[i]
+        percentVal = float(varVec[i])
         mappedVal = (boundTuple[1]-boundTuple[0])*percentVal + boundTuple[0]
         listToAdd.append(mappedVal)
     
     return listToAdd
 
-#objective function
-def costFunc(varVec):
+def fullScaleDesign(varVec):
+    #compute an unnormalized DV vector to be supplied to the cost function evaluation
+    designVec = mapNormedVecToFullScale(varVec)
+    designVec[7] = int(round(designVec[7])) #discretize material type
+    
+    return designVec
+
+def yieldStress(material_type):
+    return mat1_yield if material_type == 1 else mat2_yield if material_type == 2 else mat3_yield
+
+def objectiveFromResults(results):
+    #unpenalized cost: velocity and angle targets plus normalized mass
+    veloMagMax,veloAngle,eigenVal1,maxMises,mass = results
+    return 2*(veloMagMax-V_GOAL)**2/V_GOAL**2 + (veloAngle-ANGLE_GOAL)**2 + mass/MASS_REF
+
+def isFeasible(designVec, results):
+    veloMagMax,veloAngle,eigenVal1,maxMises,mass = results
+    
+    doesBuckle = eigenVal1 <= 0 #buckling constraint from problem
+    doesExceedMises = maxMises >= yieldStress(designVec[7])
+    
+    #violates constraints?
+    return not (doesBuckle or doesExceedMises)
+
+def costFromResults(designVec, results):
     #this function should extract specific objective values and return a single cost value to be minimized
+    costVal = objectiveFromResults(results)
     
-    #compute an unnormalized DV vector to be supplied to the cost function evaluation
-    arm_base_width,arm_base_height,arm_wall_thickness,arm_length,arm_taper_ratio,wall_length,axle_length,material_type,top_opt_thickness,L1,clevis_edge_thickness = mapNormedVecToFullScale(varVec)
-    material_type = int(round(material_type)) #discretize material type
+    #apply penalty constraint
+    costVal = costVal if isFeasible(designVec, results) else 1e15
+    
+    return costVal
+
+def geometryScreenCost(designVec):
+    #failed-run cost, without a run, for a design buildInput cannot build (None if it can)
+    violations = designGeometry.geometryViolations(designVec)
+    if violations:
+        print("Skipped ("+"; ".join(violations)+"): "+str(designVec))
+        return 1e20
+    
+    return None
+
+def massScreenCost(designVec, pBestCost=None):
+    #cost of a design that need not be solved, or None if it has to be run
+    #(the velocity and angle terms are never negative, so mass/MASS_REF bounds the cost from below)
+    mass = designGeometry.analyticMass(designVec)
+    if MAX_MASS is not None and mass > MAX_MASS:
+        print("Skipped (analytic mass "+("%.1f"%mass)+" kg > MAX_MASS): "+str(designVec))
+        return 1e15
     
+    costBound = (1.0-MASS_BOUND_MARGIN)*mass/MASS_REF
+    if pBestCost is not None and costBound >= pBestCost:
+        print("Skipped (mass term "+("%.4f"%costBound)+" >= personal best "+("%.4f"%pBestCost)+"): "+str(designVec))
+        return costBound
+    
+    return None
+
+def logRun(designVec, results, costVal):
+    fullScaleOutputList = designVec + list(results) + [costVal]
+    print("DV vector full-scale: "+str(fullScaleOutputList))
+    
+    with open(runListFileName, "a") as outFile:
+        outFile.write(",".join([str(x) for x in fullScaleOutputList]) +"\n")
+
+def logGlobalBest(xVec, funcVal, jobNumber):
+    #Rewrite file if new glob best
+    fullScaleOutputList = fullScaleDesign(xVec) + [funcVal]
+    print("DV vector full-scale: "+str(fullScaleOutputList))
+
+    with open(currentBestFileName, "a") as outFile:
+        outFile.write(",".join([str(x) for x in fullScaleOutputList]) +",Job-"+str(jobNumber)+"\n")
+    
+    imager = PARALLEL_IMAGER if EVAL_MODE in ["sync", "async"] else SERIAL_IMAGER
+    if GBEST_IMAGES and imager is not None:
+        try:
+            imager(fullScaleDesign(xVec), jobNumber)
+        except Exception as e:
+            print("EXCEPTION: no image of Job-"+str(jobNumber)+": "+str(e))
+
+def logGeneration(iterCnt, xVec, funcVal):
+    #Add best after each generation
+    iterNums.append(iterCnt)
+    massNums.append(funcVal)
+    
+    fullScaleOutputList = fullScaleDesign(xVec) + [funcVal]
+    print("DV vector full-scale: "+str(fullScaleOutputList))
+
+    with open(optListFileName, "a") as outFile:
+        outFile.write(",".join([str(x) for x in fullScaleOutputList]) +"\n")
+
+#objective function
+def costFunc(varVec):
     global numEvals
     
+    designVec = fullScaleDesign(varVec)
+    
     #Now compute cost func and buckling criteria
     try:
-        veloMagMax,veloAngle,eigenVal1,maxMises,mass = evalModel(arm_base_width,arm_base_height,arm_wall_thickness,arm_length,arm_taper_ratio,wall_length,axle_length,material_type,top_opt_thickness,L1,clevis_edge_thickness,numEvals) #Run Abq Functional Evaluation
-        
-        doesBuckle = eigenVal1 <= 0 #buckling constraint from problem
-        doesExceedMises = maxMises >= (mat1_yield if material_type == 1 else mat2_yield if material_type == 2 else mat3_yield)
-        
-        #violates constraints?
-        doesViolateConstraints = doesBuckle or doesExceedMises
-        
-        #convert angles back to radian to nondimensionalize
-        veloAngleRad = veloAngle*np.pi/180
-        angleGoalRad = ANGLE_GOAL*np.pi/180
-        
-        #compute cost value
-        costVal = 2*(veloMagMax-V_GOAL)**2/V_GOAL**2 + (veloAngle-ANGLE_GOAL)**2 + mass/MASS_REF
-        
-        #apply penalty constraint
-        costVal = 1e15 if doesViolateConstraints else costVal
+        results = cache.get(designVec)
+        if results is None:
+            results = SERIAL_EVALUATOR(designVec, numEvals) #Run Abq Functional Evaluation
+            cache.put(designVec, results)
+        costVal = costFromResults(designVec, results)
     except Exception as e:
-            print("EXCEPTION: "+str(e))
-            veloMagMax=-1e20
-            veloAngle=0.0
-            eigenVal1=-1e20
-            maxMises=1e20
-            mass=1e20
-            costVal = 1e20
+        print("EXCEPTION: "+str(e))
+        results = batchEvaluator.FAILED_RESULT
+        costVal = 1e20
         
     numEvals += 1
     
+    logRun(designVec, results, costVal)
+        
+    return costVal
+
+def runCached(designList, evaluator, designCache, jobNumbers, callback=None):
+    #cache hits come straight back; every miss in the list goes to the worker pool at once
+    #callback(index, results, isGood) is called as each design is gathered
+    outputList = [None]*len(designList)
+    
+    def gather(index, results, isGood):
+        if isGood:
+            designCache.put(designList[index], results)
+        outputList[index] = (results, isGood)
+        if callback is not None:
+            callback(index, results, isGood)
     
-    #Add best after each generation
+    pendingIndices = []
+    for index,designVec in enumerate(designList):
+        cachedResults = designCache.get(designVec)
+        if cachedResults is None:
+            pendingIndices.append(index)
+        else:
+            gather(index, cachedResults, True)
     
-    fullScaleOutputList = [arm_base_width,arm_base_height,arm_wall_thickness,arm_length,arm_taper_ratio,wall_length,axle_length,material_type,top_opt_thickness,L1,clevis_edge_thickness,veloMagMax,veloAngle,eigenVal1,maxMises,mass,costVal]
-    print("DV vector full-scale: "+str(fullScaleOutputList))
+    batchEvaluator.runBatch([designList[index] for index in pendingIndices], evaluator=evaluator, numWorkers=NUM_WORKERS,
+        jobNumbers=[jobNumbers[index] for index in pendingIndices], callback=lambda i,results,isGood: gather(pendingIndices[i], results, isGood))
+    return outputList
+
+def costFuncBatch(varVecList, recordCost):
+    #generation-synchronous objective: every cache miss in the list goes to the worker pool at once
+    #recordCost(index, costVal, jobNumber) is called as each design is gathered
+    global numEvals
     
-    with open(runListFileName, "a") as outFile:
-        outFile.write(",".join([str(x) for x in fullScaleOutputList]) +"\n")
-        
-        
-    return costVal
+    designList = [fullScaleDesign(varVec) for varVec in varVecList]
+    jobNumbers = [numEvals+index for index in range(len(designList))]
+    numEvals += len(designList)
+    
+    def record(index, results, isGood, costVal=None):
+        designVec = designList[index]
+        if costVal is None:
+            costVal = costFromResults(designVec, results) if isGood else 1e20
+        logRun(designVec, results, costVal)
+        recordCost(index, costVal, jobNumbers[index])
     
+    if not MULTI_FIDELITY:
+        runCached(designList, PARALLEL_EVALUATOR, cache, jobNumbers, callback=record)
+        return
+    
+    #screening and promoted runs of design k share scratch directory Job-k
+    def evaluateAtFidelity(indices, level):
+        designCache = cache if level == FINE_FIDELITY else screenCache
+        return runCached([designList[index] for index in indices], batchEvaluator.FidelityEvaluator(PARALLEL_EVALUATOR, level),
+            designCache, [jobNumbers[index] for index in indices])
+    
+    fidelityOutput = modelFidelity.screenAndPromote(designList, costFromResults, evaluateAtFidelity, NUM_PROMOTE,
+        screenLevel=SCREEN_FIDELITY, fineLevel=FINE_FIDELITY)
+    for index,(results,isGood,costVal,promoted) in enumerate(fidelityOutput):
+        record(index, results, isGood, costVal)
+
+def evaluatePopulation(popList):
+    #cost and job number of every particle, either one by one or as a single parallel batch
+    #particles already scored before a restart (runState genCosts) are not run again
+    if not runState["genCosts"]:
+        runState["genCosts"] = [None]*len(popList)
+        runState["genJobNumbers"] = [None]*len(popList)
+    costList = runState["genCosts"]
+    jobNumbers = runState["genJobNumbers"]
+    
+    #skipped designs are not logged to runListFileName: nothing was solved
+    for index,costVal in enumerate(costList):
+        if costVal is None:
+            costList[index] = geometryScreenCost(fullScaleDesign(popList[index]))
+        if costList[index] is None and runState["phase"] == "gen":
+            costList[index] = massScreenCost(fullScaleDesign(popList[index]), swarm.pBestCost[index])
+    todoIndices = [index for index,costVal in enumerate(costList) if costVal is None]
+    
+    def recordCost(todoIndex, costVal, jobNumber):
+        costList[todoIndices[todoIndex]] = costVal
+        jobNumbers[todoIndices[todoIndex]] = jobNumber
+        writeCheckpoint()
+    
+    if EVAL_MODE == "sync":
+        costFuncBatch([popList[index] for index in todoIndices], recordCost)
+    else:
+        for todoIndex,index in enumerate(todoIndices):
+            jobNumber = numEvals
+            recordCost(todoIndex, costFunc(popList[index][:]), jobNumber)
+    
+    runState["genCosts"] = []
+    runState["genJobNumbers"] = []
+    return costList, jobNumbers
 
-#Data structure initialization
-populationList = []
-
-gFuncBest = 1e15
-gXBest = [None for i in range(NUM_VARS)]
-
-indivFuncBest = [1e15 for indiv in range(POP_SIZE)]
-indivXBest = [[None for i in range(NUM_VARS)] for indiv in range(POP_SIZE)] 
-indivVelos = [[0 for i in range(NUM_VARS)] for indiv in range(POP_SIZE)]
-
-#seed initial variable vector    
-#LHS implemented here.
-populationList = doe.LHS(NUM_VARS,POP_SIZE)
-    
-#now begin iterative loop
-iterCnt = 0
-while iterCnt <= MAX_ITERS:
-    iterCnt += 1
-    print("####################\nBeginning Iteration "+str(iterCnt)+"/"+str(MAX_ITERS)+"\n####################\n")
-    
-    if iterCnt == 1: #seed initial G Best
-        for indivIndex in range(POP_SIZE):
-            #extract pertinent individual values
-            indivXVector = populationList[indivIndex][:]
-            
-            indivFuncVal = costFunc(indivXVector)
-
-            indivFuncBest[indivIndex] = indivFuncVal
-            indivXBest[indivIndex] = indivXVector
-                
-            #now check global best too
-            if indivFuncVal < gFuncBest:
-                gFuncBest = indivFuncVal
-                gXBest = indivXVector[:]
-                
-                #Rewrite file if new glob best
-                arm_base_width,arm_base_height,arm_wall_thickness,arm_length,arm_taper_ratio,wall_length,axle_length,material_type,top_opt_thickness,L1,clevis_edge_thickness = mapNormedVecToFullScale(gXBest)
-                material_type = int(round(material_type))
-                fullScaleOutputList = [arm_base_width,arm_base_height,arm_wall_thickness,arm_length,arm_taper_ratio,wall_length,axle_length,material_type,top_opt_thickness,L1,clevis_edge_thickness,gFuncBest]
-                print("DV vector full-scale: "+str(fullScaleOutputList))
-
-                with open(currentBestFileName, "a") as outFile:
-                    outFile.write(",".join([str(x) for x in fullScaleOutputList]) +",Job-"+str(numEvals-1)+"\n")
-                
-        # print("ITER 1: "+str(gFuncBest)+"; "+str(gXBest))
-    
-    nextGFuncBest = gFuncBest
-    nextGXBest = gXBest[:]
-        
+def writeCheckpoint(force=False):
+    #Save the full optimizer state every CHECKPOINT_EVERY evaluations (or now, if forced)
+    global evalsSinceCheckpoint
+    
+    evalsSinceCheckpoint += 1
+    if not force and evalsSinceCheckpoint < CHECKPOINT_EVERY:
+        return
+    evalsSinceCheckpoint = 0
+    
+    state = {"swarm":swarm.getState(), "randomState":random.getstate(), "numEvals":numEvals, "iterNums":iterNums, 
+        "massNums":massNums, "runState":runState, "evalMode":EVAL_MODE, "popSize":POP_SIZE, "maxIters":MAX_ITERS}
+    psoCore.saveCheckpoint(checkpointFileName, state)
+
+def restoreCheckpoint(state):
+    global swarm, numEvals, iterNums, massNums, runState
+    
+    if state["evalMode"] != EVAL_MODE or state["popSize"] != POP_SIZE:
+        raise ValueError("Checkpoint was written by a "+state["evalMode"]+" run with POP_SIZE "+str(state["popSize"])+
+            "; set EVAL_MODE and POP_SIZE to match before resuming.")
+    
+    swarm = makeSwarm(state["swarm"]["positions"])
+    swarm.setState(state["swarm"])
+    random.setstate(state["randomState"])
+    numEvals = state["numEvals"]
+    iterNums = state["iterNums"]
+    massNums = state["massNums"]
+    runState = state["runState"]
+
+def makeSwarm(initPositions):
+    return psoCore.Swarm(initPositions, vMax=V_MAX, alpha=ALPHA, pBestCoeff=P_BEST_COEFF, gBestCoeff=G_BEST_COEFF)
+
+def stepSwarm(rows=None):
+    #swarm.step, or with SURROGATE_PRESCREEN the best of PRESCREEN_CANDIDATES steps per particle
+    if not SURROGATE_PRESCREEN:
+        swarm.step(rows)
+        return
+    
+    import surrogateModel
+    try:
+        model = surrogateModel.defaultModel()
+    except ValueError as e: #too little solver data to fit yet
+        print("EXCEPTION: no surrogate pre-screening: "+str(e))
+        swarm.step(rows)
+        return
+    
+    rows = range(swarm.popSize) if rows is None else rows
+    positions, velocities = swarm.candidateSteps(PRESCREEN_CANDIDATES, rows)
+    for rowIndex,row in enumerate(rows):
+        designList = [fullScaleDesign(x) for x in positions[:,rowIndex]]
+        keepIndices, scores = surrogateModel.prescreen(designList, costFromResults, 1, model=model)
+        swarm.positions[row] = positions[keepIndices[0], rowIndex]
+        swarm.velocities[row] = velocities[keepIndices[0], rowIndex]
+
+def submitParticle(asyncBatch, indivIndex):
+    global numEvals
+    
+    #a design buildInput cannot build completes at once with no job number: nothing is run or logged
+    designVec = fullScaleDesign(swarm.positions[indivIndex])
+    if geometryScreenCost(designVec) is not None:
+        asyncBatch.complete(indivIndex, None, batchEvaluator.FAILED_RESULT, False)
+        return
+    
+    cachedResults = cache.get(designVec)
+    if cachedResults is None:
+        asyncBatch.submit(indivIndex, designVec, numEvals)
+    else:
+        asyncBatch.complete(indivIndex, numEvals, cachedResults, True)
+    numEvals += 1
+
+def runAsyncSwarm():
+    #Asynchronous PSO: a particle is moved (against the current global best) and resubmitted the moment
+    #its own evaluation returns, so no worker sits idle waiting on the slowest job of a generation
+    asyncBatch = batchEvaluator.AsyncBatch(PARALLEL_EVALUATOR, NUM_WORKERS)
+    evalCounts = runState["evalCounts"]
+    
+    #every unfinished particle has exactly one evaluation outstanding (after a restart, the one that was in flight)
     for indivIndex in range(POP_SIZE):
-        #extract pertinent individual values
-        indivXVector = populationList[indivIndex][:]
-        
-        indivFuncVal = costFunc(indivXVector)
+        if evalCounts[indivIndex] < MAX_ITERS+1:
+            submitParticle(asyncBatch, indivIndex)
+    
+    while asyncBatch.numPending > 0:
+        indivIndex, jobNumber, results, isGood = asyncBatch.next()
+        designVec = fullScaleDesign(swarm.positions[indivIndex])
         
-        #compare to personal best
-        if indivFuncVal < indivFuncBest[indivIndex]:
-            indivFuncBest[indivIndex] = indivFuncVal
-            indivXBest[indivIndex] = indivXVector
-            
-            #now check global best too
-            if indivFuncVal < nextGFuncBest:
-                nextGFuncBest = indivFuncVal
-                nextGXBest = indivXVector[:]
-                # print(indivFuncVal,costFunc(indivXVector))
-                
-                #Rewrite file if new glob best
-                arm_base_width,arm_base_height,arm_wall_thickness,arm_length,arm_taper_ratio,wall_length,axle_length,material_type,top_opt_thickness,L1,clevis_edge_thickness = mapNormedVecToFullScale(gXBest)
-                material_type = int(round(material_type))
-                fullScaleOutputList = [arm_base_width,arm_base_height,arm_wall_thickness,arm_length,arm_taper_ratio,wall_length,axle_length,material_type,top_opt_thickness,L1,clevis_edge_thickness,gFuncBest]
-                print("DV vector full-scale: "+str(fullScaleOutputList))
-
-                with open(currentBestFileName, "a") as outFile:
-                    outFile.write(",".join([str(x) for x in fullScaleOutputList]) +",Job-"+str(numEvals-1)+"\n")
+        if jobNumber is None: #geometry-screened, so the failed-run cost of geometryScreenCost
+            indivFuncVal = 1e20
+        else:
+            if isGood:
+                cache.put(designVec, results)
+            indivFuncVal = costFromResults(designVec, results) if isGood else 1e20
+            logRun(designVec, results, indivFuncVal)
+        evalCounts[indivIndex] += 1
+        runState["numCompleted"] += 1
+        numCompleted = runState["numCompleted"]
         
-        #compute velocity to new point
-        for dimIndex in range(NUM_VARS):
-            lowBound = 0
-            upBound = 1 #boundsList[dimIndex]
+        #compare to personal best (a particle's first evaluation always seeds it), then global best
+        if evalCounts[indivIndex] == 1:
+            bestRow = swarm.seedBests([indivFuncVal], [indivIndex])
+        elif len(swarm.updatePersonalBests([indivFuncVal], [indivIndex])) > 0:
+            bestRow = swarm.updateGlobalBest([indivIndex])
+        else:
+            bestRow = None
+        if bestRow is not None:
+            logGlobalBest(swarm.gBestX, swarm.gBestCost, jobNumber)
         
-            newComponentVelo = ALPHA*indivVelos[indivIndex][dimIndex] + P_BEST_COEFF*random.random()*(indivXBest[indivIndex][dimIndex]-indivXVector[dimIndex]) + G_BEST_COEFF**random.random()*(gXBest[dimIndex]-indivXVector[dimIndex])
-            newComponentVelo = min(newComponentVelo,V_MAX) # restrict velocity component to maximum if it exceeds
-            
-            newXComponent = indivXVector[dimIndex] + newComponentVelo
-            newXComponent = min(max(newXComponent,lowBound),upBound) #restrict to bound
-            
-            #update array values
-            populationList[indivIndex][dimIndex] = newXComponent
-            indivVelos[indivIndex][dimIndex] = newComponentVelo
+        #one generation's worth of evaluations done
+        if numCompleted % POP_SIZE == 0:
+            logGeneration(numCompleted//POP_SIZE, swarm.gBestX, swarm.gBestCost)
         
-    gFuncBest = nextGFuncBest
-    gXBest = nextGXBest[:]
-    
-    iterNums.append(iterCnt)
-    massNums.append(gFuncBest)
+        if evalCounts[indivIndex] < MAX_ITERS+1:
+            stepSwarm([indivIndex])
+            submitParticle(asyncBatch, indivIndex)
+        writeCheckpoint(force=(numCompleted % POP_SIZE == 0))
     
-    #Add best after each generation
-    arm_base_width,arm_base_height,arm_wall_thickness,arm_length,arm_taper_ratio,wall_length,axle_length,material_type,top_opt_thickness,L1,clevis_edge_thickness = mapNormedVecToFullScale(gXBest)
-    material_type = int(round(material_type))
-    fullScaleOutputList = [arm_base_width,arm_base_height,arm_wall_thickness,arm_length,arm_taper_ratio,wall_length,axle_length,material_type,top_opt_thickness,L1,clevis_edge_thickness,gFuncBest]
-    print("DV vector full-scale: "+str(fullScaleOutputList))
+    asyncBatch.close()
 
-    with open(optListFileName, "a") as outFile:
-        outFile.write(",".join([str(x) for x in fullScaleOutputList]) +"\n")
 
-#now extract global best after specified number of iterations
-# print(costFunc(gXBest),gFuncBest)
-print("Minimum cost: "+str(gFuncBest))
-print("DV vector: "+str(gXBest))
+if __name__ == "__main__":
+    evaluatorInUse = PARALLEL_EVALUATOR if EVAL_MODE in ["sync", "async"] else SERIAL_EVALUATOR
+    if MULTI_FIDELITY:
+        if EVAL_MODE != "sync":
+            raise ValueError("MULTI_FIDELITY screens whole generations; set EVAL_MODE = \"sync\".")
+        evaluatorInUse = batchEvaluator.FidelityEvaluator(PARALLEL_EVALUATOR, FINE_FIDELITY)
+        screenCache = resultCache.ResultCache(resultCacheFileName, modelVersion=batchEvaluator.FidelityEvaluator(PARALLEL_EVALUATOR, SCREEN_FIDELITY).modelVersion)
+    cache = resultCache.ResultCache(resultCacheFileName, modelVersion=getattr(evaluatorInUse, "modelVersion", resultCache.MODEL_VERSION))
+    
+    checkpoint = psoCore.loadCheckpoint(checkpointFileName) if RESUME else None
+    if checkpoint is None:
+        initLogs()
+
+        #seed initial variable vector    
+        #LHS implemented here.
+        swarm = makeSwarm(doe.SpaceFilling(INIT_SAMPLER,NUM_VARS,POP_SIZE,seed=INIT_SEED))
+        runState = {"iterCnt":0, "phase":"start", "genCosts":[], "genJobNumbers":[], 
+            "evalCounts":[0 for indiv in range(POP_SIZE)], "numCompleted":0}
+    else:
+        restoreCheckpoint(checkpoint)
+        print("Resuming from "+checkpointFileName+" at evaluation "+str(numEvals))
+    
+    if EVAL_MODE == "async":
+        runAsyncSwarm()
+        
+    #now begin iterative loop
+    while EVAL_MODE != "async" and runState["iterCnt"] <= MAX_ITERS:
+        if runState["phase"] == "start":
+            runState["iterCnt"] += 1
+            runState["phase"] = "seed" if runState["iterCnt"] == 1 else "gen"
+        iterCnt = runState["iterCnt"]
+        print("####################\nBeginning Iteration "+str(iterCnt)+"/"+str(MAX_ITERS)+"\n####################\n")
+        
+        if runState["phase"] == "seed": #seed initial G Best
+            seedCosts, seedJobNumbers = evaluatePopulation(swarm.positions.tolist())
+            bestRow = swarm.seedBests(seedCosts)
+            if bestRow is not None:
+                logGlobalBest(swarm.gBestX, swarm.gBestCost, seedJobNumbers[bestRow])
+            runState["phase"] = "gen"
+            writeCheckpoint(force=True)
+        
+        #positions only move after the whole generation is scored, so the evaluations can run together
+        genCosts, genJobNumbers = evaluatePopulation(swarm.positions.tolist())
+        swarm.updatePersonalBests(genCosts)
+        
+        #particles move against the global best from the previous generation
+        stepSwarm()
+        bestRow = swarm.updateGlobalBest()
+        if bestRow is not None:
+            logGlobalBest(swarm.gBestX, swarm.gBestCost, genJobNumbers[bestRow])
+        
+        logGeneration(iterCnt, swarm.gBestX, swarm.gBestCost)
+        runState["phase"] = "start"
+        writeCheckpoint(force=True)
 
-print("DV vector full-scale: "+str(mapNormedVecToFullScale(gXBest)))
+    #now extract global best after specified number of iterations
+    print("Minimum cost: "+str(swarm.gBestCost))
+    print("DV vector: "+str(swarm.gBestX.tolist()))
 
-print("Done.")
+    print("DV vector full-scale: "+str(mapNormedVecToFullScale(swarm.gBestX)))
+    print(cache.statsString())
+    if screenCache is not None:
+        print("Screening "+screenCache.statsString())
 
+    print("Done.")
@@ -6,15 +6,29 @@ from abaqus import *
 from abaqusConstants import *
 import visualization
 from viewerModules import *
+import os
 import math
+import odbTools
+
+#Frames scanned for max Mises: None = every frame of every step,
+#or e.g. {'Launch':None, 'FollowThru':None} to skip the static/buckling steps
+MISES_FRAME_SUBSET = None
+
+#Columnar export: payload V/CPRESS history, per-frame max Mises and the eigenvalues go to
+#<job>_columns/ as float32 .npy files (see odbTools.loadColumns); the odb can then be deleted to save disk
+EXPORT_COLUMNS = True
+DELETE_ODB_AFTER_EXPORT = False
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-def getResults(ModelName):
+def getResults(ModelName, preJobName=None):
 
     """
     This ODB reading script does the following:
     -Scans to see when the there is no more contact between the payload and arm
     -Pulls the velocity of the payload at this point
+    -Reads the first buckling eigenvalue and the max Mises stress in the same pass
+    -For a restart job (preJobName given) the Loading step lives in the pre job's ODB,
+     so that ODB is scanned for max Mises as well
     """
     
     # Open the output database.
@@ -22,8 +36,6 @@ def getResults(ModelName):
     odbName = ModelName+'.odb'
     print odbName
     odb = visualization.openOdb(odbName)
-    # lastFrame = odb.steps['Step-1'].frames[-1]
-    launchFrames = odb.steps['FollowThru'].frames
     print 'odb open'
  
 
@@ -31,52 +43,8 @@ def getResults(ModelName):
     # pTip = odb.rootAssembly.instances['Payload-1'].nodeSets['SPOON_PULL_POINT']
     payPoint = odb.rootAssembly.instances['PAYLOAD-1'].nodeSets['PAY_PULL_POINT']
     
-    veloMagMax = 0
-    veloAngle = 0
-    
     print("Found payPoint")
     
-        #looking for when there is no contact and taking velocity at that point
-    for frame in launchFrames:
-        framecontact = frame.fieldOutputs['CPRESS'].getSubset(region=payPoint).values[0].data
-        #want V1, V2
-        if framecontact < 0.0001:
-            frameVelo = frame.fieldOutputs['V'].getSubset(region=payPoint).values[0].data
-
-            veloX = frameVelo[0]
-            veloY = frameVelo[1]
-            
-            frameVeloMag = math.sqrt(veloX**2 + veloY**2)
-            if frameVeloMag > veloMagMax:
-                veloMagMax = frameVeloMag
-                veloAngle = math.atan2(-veloX,veloY)*180/math.pi
-                
-            break
-        
-    
-    print("Found the maximum velocity and angle")   
-
-    #####################################
-    #Extract Eigen Value
-    ####################################
-    
-    eigenVal1 = 0.0
-    lastFrameEig = odb.steps['BuckleCheck'].frames[-1]
-    print lastFrameEig.description
-    ##The following string is from the description of the frame; contains the eigenvalue
-    descString=lastFrameEig.description
-    print lastFrameEig.mode
-    ##Now we split the string at the = sign
-    pattern2 = re.compile('\s*=\s*')
-    print pattern2.split(descString)
-    print pattern2.split(descString)[1]
-    ##Convert the second string (index=1) to floating point number
-    eigenVal1=float(pattern2.split(descString)[1])
-
-    #####################################
-    #Extract Max Mises Value
-    ####################################
-    
     print 'Scanning the PART for maximum VM STRESS'
     elsetName='ALL_PART'
     elset = elemset = None
@@ -96,30 +64,29 @@ def getResults(ModelName):
                   % (elsetName, odbName)
            odb.close()
            exit(0)
-           
-    #init values
-    maxMises = -0.1
-    maxVMElem = 0
-    maxStep = "_None_"
-    maxFrame = -1
-    Stress = 'S'
-    isStressPresent = 0
-    for step in odb.steps.values():
-       print 'Processing Step:', step.name
-       for frame in step.frames:
-           allFields = frame.fieldOutputs
-           if (allFields.has_key(Stress)):
-               isStressPresent = 1
-               stressSet = allFields[Stress]
-               if elemset:
-                   stressSet = stressSet.getSubset(
-                       region=elemset)      
-               for stressValue in stressSet.values:                
-                   if (stressValue.mises > maxMises):
-                       maxMises = stressValue.mises
-                       maxVMElem = stressValue.elementLabel
-                       maxStep = step.name
-                       maxFrame = frame.incrementNumber
+    
+    #####################################
+    #One pass over the ODB for every quantity:
+    #-velocity and angle when there is no more contact between the payload and arm
+    #-first buckling eigenvalue from the BuckleCheck description
+    #-max Mises stress (numpy reduction over the S bulk data)
+    ####################################
+    
+    handlers = [odbTools.ReleaseVelocityHandler(payPoint), odbTools.EigenvalueHandler(),
+        odbTools.MaxMisesHandler(elemset, frameSubset=MISES_FRAME_SUBSET)]
+    if EXPORT_COLUMNS:
+        handlers.append(odbTools.PayloadHistoryHandler(payPoint))
+    extracted = odbTools.extractResults(odb, handlers)
+    
+    veloMagMax, veloAngle = extracted["release"]
+    releaseTime = handlers[0].releaseTime
+    print("Found the maximum velocity and angle")   
+    print 'Release at t = %s from %s'%(releaseTime, handlers[0].method)
+    
+    eigenVal1 = extracted["eigenVal1"]
+    print 'Eigenvalue 1: %f'%eigenVal1
+    
+    maxMises, maxVMElem, maxStep, maxFrame, isStressPresent = extracted["maxMises"]
     if(isStressPresent):
        print 'Maximum von Mises stress %s is %f in element %d'%(
            region, maxMises, maxVMElem)
@@ -132,7 +99,31 @@ def getResults(ModelName):
     
     odb.close()
     
+    if preJobName:
+        preMises, preElem, preStep, preFrame, preStressPresent = getPreloadMises(preJobName, elsetName)
+        if preStressPresent and preMises > maxMises:
+            maxMises, maxVMElem, maxStep, maxFrame = preMises, preElem, preStep, preFrame
+            print 'Maximum von Mises stress %f is in the preload job %s, step: %s'%(maxMises, preJobName, maxStep)
+    
+    if EXPORT_COLUMNS:
+        scalars = {"veloMagMax":veloMagMax, "veloAngle":veloAngle, "eigenVal1":eigenVal1, "maxMises":maxMises,
+            "maxVMElem":maxVMElem, "maxStep":maxStep, "maxFrame":maxFrame, "releaseTime":releaseTime}
+        odbTools.writeColumns(ModelName+odbTools.COLUMN_DIR_SUFFIX, odbTools.columnsFromHandlers(handlers), scalars)
+        print 'Exported columns to %s'%(ModelName+odbTools.COLUMN_DIR_SUFFIX)
+        
+        if DELETE_ODB_AFTER_EXPORT:
+            os.remove(odbName)
+    
     return veloMagMax,veloAngle,eigenVal1,maxMises
+
+def getPreloadMises(preJobName, elsetName='ALL_PART'):
+    #Max Mises over the Loading step written by the pre job of a restart chain
+    preOdb = visualization.openOdb(preJobName+'.odb', readOnly=True)
+    elemset = preOdb.rootAssembly.elementSets[elsetName]
+    extracted = odbTools.extractResults(preOdb, [odbTools.MaxMisesHandler(elemset, frameSubset=MISES_FRAME_SUBSET)])
+    preOdb.close()
+    
+    return extracted["maxMises"]
     
 if __name__ == "__main__":
     print(getResults("Job-1"))
\ No newline at end of file
@@ -0,0 +1,363 @@
+#Batch evaluator for LunaCat design points
+#Runs a list of full-scale design vectors on a worker pool, each job in its own scratch directory
+
+import os
+import json
+import time
+import subprocess
+import multiprocessing
+import numpy as np
+
+import resultCache
+import modelFidelity
+
+try:
+    import queue
+except ImportError: #Abaqus Python 2
+    import Queue as queue
+
+
+#Sentinel outputs used whenever a functional evaluation fails
+#veloMagMax,veloAngle,eigenVal1,maxMises,mass
+FAILED_RESULT = (-1e20, 0.0, -1e20, 1e20, 1e20)
+
+SCRATCH_ROOT = "Scratch"
+POLL_SECONDS = 0.1 #AsyncBatch.next wait between checks on the running jobs
+EVAL_TIMEOUT = 6*3600.0 #s; an AsyncBatch job not back by then (e.g. its worker process died) counts as failed
+ABAQUS_CMD = "abaqus"
+CPUS_PER_JOB = 4 #matches numCpus in evalModel's mdb.Job
+
+DESIGN_FILE_NAME = "design.json"
+RESULT_FILE_NAME = "result.json"
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def defaultNumWorkers(cpusPerJob=CPUS_PER_JOB, maxLicensedJobs=None):
+    #size the pool to the cores on this machine and (optionally) the license tokens available
+    numWorkers = multiprocessing.cpu_count()//cpusPerJob
+    if maxLicensedJobs is not None:
+        numWorkers = min(numWorkers, maxLicensedJobs)
+
+    return max(numWorkers, 1)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Evaluators
+# Every evaluator takes (designVec, jobNumber), runs in the current working directory
+# and returns veloMagMax,veloAngle,eigenVal1,maxMises,mass (or raises on failure).
+# The model-based ones also take fidelity (a modelFidelity level; None = default mesh)
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def inProcessEvaluator(designVec, jobNumber, fidelity=None):
+    #Call evalModel directly; only valid inside an 'abaqus cae noGUI' kernel
+    from LunaCatAbqMainCode import evalModel
+
+    args = list(designVec) + [jobNumber]
+    return evalModel(*args, fidelity=fidelity)
+
+def abaqusEvaluator(designVec, jobNumber, fidelity=None):
+    #Launch a fresh 'abaqus cae noGUI' kernel for this design so several can run side by side
+    return tuple(runKernel({"design":list(designVec), "jobNumber":jobNumber, "fidelity":fidelity})["results"])
+
+def directEvaluator(designVec, jobNumber, fidelity=None):
+    #As abaqusEvaluator, but the kernel writes the reduced-order deck of inpWriter instead of building the CAE model
+    #(the kernel is still needed for the ODB post-processing)
+    return tuple(runKernel({"design":list(designVec), "jobNumber":jobNumber, "fidelity":fidelity, "direct":True})["results"])
+
+directEvaluator.modelVersion = resultCache.MODEL_VERSION+"-direct"
+
+def runKernel(request):
+    #Run runDesign.py on one JSON request in a headless CAE kernel and return its JSON reply
+    jobNumber = request["jobNumber"]
+    request = dict(request, repoDir=REPO_DIR, resultFile=RESULT_FILE_NAME)
+    with open(DESIGN_FILE_NAME, "w") as outFile:
+        json.dump(request, outFile)
+
+    if os.path.exists(RESULT_FILE_NAME):
+        os.remove(RESULT_FILE_NAME)
+
+    cmd = [ABAQUS_CMD, "cae", "noGUI="+os.path.join(REPO_DIR, "runDesign.py"), "--", DESIGN_FILE_NAME]
+    logName = "Job-"+str(jobNumber)+("_image" if request.get("imageOnly") else "")+"_cae.log"
+    with open(logName, "w") as logFile:
+        subprocess.call(cmd, stdout=logFile, stderr=subprocess.STDOUT, shell=(os.name == "nt"))
+
+    if not os.path.exists(RESULT_FILE_NAME):
+        raise RuntimeError("Job-"+str(jobNumber)+" did not produce "+RESULT_FILE_NAME)
+
+    with open(RESULT_FILE_NAME, "r") as inFile:
+        return json.load(inFile)
+
+def standInEvaluator(designVec, jobNumber, fidelity=None):
+    #Cheap analytic stand-in for evalModel. The trends are only loosely physical; it exists so the
+    #batch machinery and optimizers can be exercised on a machine without Abaqus.
+    #Coarser meshes under-resolve the peak stress and over-stiffen the buckling mode (exact at the default level).
+    arm_base_width,arm_base_height,arm_wall_thickness,arm_length,arm_taper_ratio,wall_length,axle_length,material_type,top_opt_thickness,L1,clevis_edge_thickness = designVec
+
+    density = 2780.0 if material_type == 1 else 2700.0 if material_type == 2 else 4429.0
+
+    tipHeight = arm_taper_ratio*arm_base_height
+    meanHeight = 0.5*(arm_base_height+tipHeight)
+    armArea = 2*arm_wall_thickness*(arm_base_width+meanHeight)
+    armMass = density*armArea*arm_length
+    wallMass = 2*density*0.1*0.6*wall_length*(1.0-0.02*L1-0.5*top_opt_thickness)
+    axleMass = density*(arm_base_height+0.05)**2*axle_length
+    mass = armMass + wallMass + axleMass + 20.0
+
+    veloMagMax = 9.0*arm_length*(1.0+0.4*arm_taper_ratio)/(1.0+armMass/400.0)
+    veloAngle = 44.0 + 3.0*(wall_length-3.0) + 2.0*(arm_taper_ratio-0.75) - 0.05*(L1-12.5)
+
+    maxMises = 3.0e8*(arm_length/3.5)**2*(0.2/arm_base_height)*(0.01/arm_wall_thickness)**0.5*(0.25/arm_base_width)**0.5*(1.0+clevis_edge_thickness)
+    eigenVal1 = 1.0e6*((arm_wall_thickness/0.008)*(arm_base_height/0.2)**2*(3.5/arm_length)**2 - 0.3)
+
+    meshScale = modelFidelity.settings(fidelity)["seedSizes"]["ARM"]/modelFidelity.SEED_SIZES["ARM"]
+    maxMises *= 1.0 - 0.04*(meshScale**2-1.0)
+    eigenVal1 += 0.02*(meshScale**2-1.0)*abs(eigenVal1)
+
+    return veloMagMax,veloAngle,eigenVal1,maxMises,mass
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Images on request
+# Batch kernels run headless and write no Model_Images; these rebuild one design just to photograph it
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def inProcessImage(designVec, jobNumber, fidelity=None):
+    from LunaCatAbqMainCode import imageDesign
+
+    return imageDesign(designVec, jobNumber, fidelity=fidelity)
+
+def abaqusImage(designVec, jobNumber, fidelity=None):
+    return runKernel({"design":list(designVec), "jobNumber":jobNumber, "fidelity":fidelity, "imageOnly":True})["image"]
+
+
+class FidelityEvaluator(object):
+    """
+    An evaluator pinned to one fidelity level, usable anywhere a plain evaluator is
+    (a class rather than a closure so the worker pool can pickle it).
+    Its modelVersion keeps the result cache of each level apart.
+    """
+
+    def __init__(self, evaluator, level):
+        self.evaluator = evaluator
+        self.level = level
+        self.modelVersion = modelFidelity.modelVersion(level, getattr(evaluator, "modelVersion", resultCache.MODEL_VERSION))
+
+    def __call__(self, designVec, jobNumber):
+        return self.evaluator(designVec, jobNumber, fidelity=self.level)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Batch execution
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def evaluateInScratch(task):
+    #Pool worker: run one design inside its own scratch directory and trap any failure
+    evaluator, designVec, jobNumber, scratchRoot = task
+
+    prevDir = os.getcwd()
+    if scratchRoot is not None:
+        jobDir = os.path.join(scratchRoot, "Job-"+str(jobNumber))
+        if not os.path.isdir(os.path.join(jobDir, "Model_Images")):
+            os.makedirs(os.path.join(jobDir, "Model_Images"))
+        os.chdir(jobDir)
+
+    try:
+        results = tuple(evaluator(designVec, jobNumber))
+        isGood = True
+    except Exception as e:
+        print("EXCEPTION: "+str(e))
+        results = FAILED_RESULT
+        isGood = False
+    finally:
+        os.chdir(prevDir)
+
+    return results, isGood
+
+def runBatch(designList, evaluator=abaqusEvaluator, numWorkers=1, scratchRoot=SCRATCH_ROOT, jobNumbers=None, callback=None):
+    """
+    Evaluate every design vector in designList and return [(results, isGood), ...] in the same order.
+    -jobNumbers defaults to 1..len(designList); job k runs in scratchRoot/Job-k
+    -scratchRoot=None runs every job in the current directory (serial use only)
+    -callback(index, results, isGood) is called in list order as each job is gathered
+    """
+    if jobNumbers is None:
+        jobNumbers = range(1, len(designList)+1)
+    if scratchRoot is not None:
+        scratchRoot = os.path.abspath(scratchRoot)
+    elif numWorkers > 1:
+        raise ValueError("Parallel batches need a scratch directory per job.")
+
+    taskList = [(evaluator, list(designVec), jobNumber, scratchRoot) for designVec,jobNumber in zip(designList, jobNumbers)]
+
+    outputList = []
+    if numWorkers <= 1:
+        resultIter = (evaluateInScratch(task) for task in taskList)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes=numWorkers)
+        resultIter = pool.imap(evaluateInScratch, taskList, chunksize=1)
+
+    try:
+        for index,(results,isGood) in enumerate(resultIter):
+            if callback is not None:
+                callback(index, results, isGood)
+            outputList.append((results, isGood))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return outputList
+
+def designRows(designIter):
+    #one design vector (list) at a time from an iterable of designs and/or 2-D design blocks
+    for block in designIter:
+        for designVec in np.atleast_2d(np.asarray(block, dtype=float)):
+            yield designVec.tolist()
+
+def runStream(designIter, evaluator=abaqusEvaluator, numWorkers=1, scratchRoot=SCRATCH_ROOT, callback=None, firstJobNumber=1, maxPending=None):
+    """
+    Evaluate designs as they are drawn from an iterable of design vectors or of 2-D design blocks
+    (e.g. DOEmethods.FullFactorialChunks, or DOEmethods.readChunks on a doeInputGen full factorial CSV),
+    with at most maxPending (default 2*numWorkers) designs drawn but unfinished, so a design space too
+    large to hold in memory can still be run through the pool.
+    -blocks are split into rows; index and job numbers count designs, not blocks
+    -job k runs in scratchRoot/Job-k, k counting up from firstJobNumber in draw order
+    -callback(index, designVec, results, isGood) is called in completion order; nothing else is kept
+    Returns the number of designs evaluated.
+    """
+    designIter = designRows(designIter)
+    numDrawn = 0
+    if numWorkers <= 1:
+        for designVec in designIter:
+            results, isGood = evaluateInScratch((evaluator, designVec, firstJobNumber+numDrawn, scratchRoot))
+            if callback is not None:
+                callback(numDrawn, designVec, results, isGood)
+            numDrawn += 1
+        return numDrawn
+
+    maxPending = 2*numWorkers if maxPending is None else maxPending
+    asyncBatch = AsyncBatch(evaluator, numWorkers, scratchRoot)
+    drawnDesigns = {} #index -> design, for the ones in flight
+    try:
+        while True:
+            while asyncBatch.numPending < maxPending:
+                designVec = next(designIter, None)
+                if designVec is None:
+                    break
+                drawnDesigns[numDrawn] = designVec
+                asyncBatch.submit(numDrawn, designVec, firstJobNumber+numDrawn)
+                numDrawn += 1
+            if asyncBatch.numPending == 0:
+                break
+            index, jobNumber, results, isGood = asyncBatch.next()
+            designVec = drawnDesigns.pop(index)
+            if callback is not None:
+                callback(index, designVec, results, isGood)
+    finally:
+        asyncBatch.close()
+
+    return numDrawn
+
+
+class AsyncBatch(object):
+    """
+    Submit designs one at a time to a worker pool and collect them in completion order,
+    so a caller can react to each result (and submit more work) without waiting on the rest.
+    -a job the pool itself fails (e.g. an unpicklable evaluator) or that is not back within timeout
+     seconds comes back as FAILED_RESULT, so next() never waits on a lost job
+    """
+
+    def __init__(self, evaluator=abaqusEvaluator, numWorkers=1, scratchRoot=SCRATCH_ROOT, timeout=EVAL_TIMEOUT):
+        if scratchRoot is None:
+            raise ValueError("Parallel batches need a scratch directory per job.")
+
+        self.evaluator = evaluator
+        self.scratchRoot = os.path.abspath(scratchRoot)
+        self.timeout = timeout
+        self.pool = multiprocessing.Pool(processes=numWorkers)
+        self.doneQueue = queue.Queue()
+        self.running = [] #(tag, jobNumber, AsyncResult, deadline) in submission order
+        self.numPending = 0
+        self.numTimedOut = 0
+
+    def submit(self, tag, designVec, jobNumber):
+        task = (self.evaluator, list(designVec), jobNumber, self.scratchRoot)
+        self.numPending += 1
+
+        deadline = None if self.timeout is None else time.time()+self.timeout
+        self.running.append((tag, jobNumber, self.pool.apply_async(evaluateInScratch, (task,)), deadline))
+
+    def collect(self):
+        #Move every finished, failed or timed-out job from running to the done queue
+        stillRunning = []
+        for tag, jobNumber, asyncResult, deadline in self.running:
+            if asyncResult.ready():
+                try:
+                    results, isGood = asyncResult.get(0)
+                except Exception as e: #raised by the pool, not the evaluator (evaluateInScratch traps those)
+                    print("EXCEPTION: Job-"+str(jobNumber)+": "+str(e))
+                    results, isGood = FAILED_RESULT, False
+            elif deadline is not None and time.time() > deadline:
+                print("EXCEPTION: Job-"+str(jobNumber)+" not back after "+str(self.timeout)+" s")
+                results, isGood = FAILED_RESULT, False
+                self.numTimedOut += 1
+            else:
+                stillRunning.append((tag, jobNumber, asyncResult, deadline))
+                continue
+            self.doneQueue.put((tag, jobNumber, tuple(results), isGood))
+        self.running = stillRunning
+
+    def complete(self, tag, jobNumber, results, isGood):
+        #Hand back a result that needed no evaluation (e.g. a cache hit) through the same queue
+        self.numPending += 1
+        self.doneQueue.put((tag, jobNumber, tuple(results), isGood))
+
+    def next(self):
+        #Block until any submitted design finishes; returns (tag, jobNumber, results, isGood)
+        while self.doneQueue.empty() and self.running:
+            self.collect()
+            if self.doneQueue.empty() and self.running:
+                self.running[0][2].wait(POLL_SECONDS)
+        output = self.doneQueue.get()
+        self.numPending -= 1
+        return output
+
+    def close(self):
+        #a timed-out job may still hold its worker, so only a pool without one is waited on
+        if self.numTimedOut or self.running:
+            self.pool.terminate()
+        else:
+            self.pool.close()
+        self.pool.join()
+
+
+def selfTest(numWorkers=3, numDesigns=8, failIndex=3):
+    #runBatch and runStream on a worker pool with the stand-in evaluator; one design has zero wall thickness and raises
+    import shutil
+    import tempfile
+
+    designList = [[0.25, 0.2, 0.01, 2.0+0.25*k, 0.75, 3.0, 3.0, 1, 0.1, 12.5, 0.05] for k in range(numDesigns)]
+    designList[failIndex][2] = 0.0
+    expectedList = [FAILED_RESULT if k == failIndex else standInEvaluator(designVec, k+1) for k,designVec in enumerate(designList)]
+
+    scratchRoot = tempfile.mkdtemp()
+    try:
+        outputList = runBatch(designList, standInEvaluator, numWorkers, os.path.join(scratchRoot, "Batch"))
+        assert [results for results,isGood in outputList] == expectedList, "runBatch results out of input order"
+        assert [isGood for results,isGood in outputList] == [k != failIndex for k in range(numDesigns)], "raising evaluator not mapped to FAILED_RESULT"
+        assert sorted(os.listdir(os.path.join(scratchRoot, "Batch"))) == sorted(["Job-"+str(k+1) for k in range(numDesigns)]), "not one Job-k directory per job"
+
+        streamed = {}
+        def onResult(index, designVec, results, isGood):
+            streamed[index] = (designVec, results, isGood)
+        numDrawn = runStream([designList[:4], designList[4:]], standInEvaluator, numWorkers, os.path.join(scratchRoot, "Stream"), onResult, maxPending=2)
+        assert numDrawn == numDesigns and sorted(streamed) == list(range(numDesigns)), "runStream lost designs"
+        assert [streamed[k][1] for k in range(numDesigns)] == expectedList, "runStream results not matched to their designs"
+        assert sorted(os.listdir(os.path.join(scratchRoot, "Stream"))) == sorted(["Job-"+str(k+1) for k in range(numDesigns)]), "not one Job-k directory per streamed job"
+    finally:
+        shutil.rmtree(scratchRoot)
+
+    print("batchEvaluator self-test passed ("+str(numDesigns)+" designs, "+str(numWorkers)+" workers)")
+
+
+if __name__ == "__main__":
+    #python batchEvaluator.py: pooled batches against the stand-in evaluator, no Abaqus needed
+    selfTest()
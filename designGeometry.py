@@ -0,0 +1,293 @@
+#Pure-Python design geometry for LunaCat
+#The fixed dimensions and the quantities buildInput derives from a design vector, without the CAE kernel,
+#so decks, estimates and checks can be made on a machine without Abaqus. Keep in step with buildInput.
+
+import os
+import json
+import math
+from math import sqrt
+
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+FINAL_RESULTS_FILE_NAME = os.path.join(REPO_DIR, "DOE_Output", "FINAL_RESULTS")
+
+#material_type -> name, density (kg/m^3), Young's modulus (Pa), Poisson's ratio
+MATERIAL_PROPERTIES = {
+    1:('Aluminum-2024', 2780.0, 73100000000.0, 0.33),
+    2:('Aluminum-6061', 2700.0, 68900000000.0, 0.33),
+    3:('Ti-6Al-4V', 4429.0, 116000000000.0, 0.31),
+}
+
+#Fixed dimensions (m, kg)
+BASE_LENGTH = 0.2
+SPOON_LENGTH = 0.2
+SPOON_FLANGE_THICKNESS = 0.002
+SPOON_FLANGE_HEIGHT = 0.01
+PAY_MASS = 20.0
+WALL_THICKNESS = 0.1
+WALL_HEIGHT = 0.6
+DRAW_WIRE_RADIUS = 0.01
+WIRE_DRAW_DISTANCE = 0.4
+WIRE_DENSITY = 9000.0
+XBEAM_HEIGHT = 0.3
+XBEAM_FLAT_LENGTH = 0.02
+XBEAM_THICKNESS = 0.1
+XBEAM_AXLE_DIA = 0.2
+
+#The arm leans back over the clevis along the diamond axle's faces (deg from +x about the axle).
+#Only the wire length depends on it.
+ARM_ANGLE = 135.0
+
+DESIGN_NAMES = ["BASE_WIDTH", "BASE_HEIGHT", "THICKNESS", "ARM_LENGTH", "TAPER_RATIO", "WALL_LENGTH", "AXLE_LENGTH",
+    "MATERIAL_TYPE", "ToptThickness", "L1_percent", "CLEVIS_EDGE_THICK"]
+
+
+def deriveDimensions(designVec):
+    """
+    Full-scale design vector -> dict of the design variables (buildInput's argument names) and the
+    derived dimensions of the arm, spoon, payload, axle, walls and crossmember (wall frame: x along the wall,
+    y up, origin at the wall centre)
+    """
+    dims = dict(zip(DESIGN_NAMES, designVec))
+    dims["MATERIAL_TYPE"] = int(dims["MATERIAL_TYPE"])
+
+    dims["TIP_HEIGHT"] = dims["TAPER_RATIO"]*dims["BASE_HEIGHT"]
+    dims["PAY_LENGTH"] = SPOON_LENGTH - 5.0*SPOON_FLANGE_THICKNESS
+    dims["PAY_HEIGHT"] = dims["PAY_LENGTH"]/2
+    dims["PAY_WIDTH"] = dims["BASE_WIDTH"]
+    dims["PAY_DENSITY"] = PAY_MASS/(dims["PAY_LENGTH"]*dims["PAY_HEIGHT"]*dims["PAY_WIDTH"])
+
+    dims["AXLE_DIAMETER"] = 2*(dims["BASE_HEIGHT"]+0.05)/sqrt(2) #diagonal of the square axle section
+    dims["AXLE_SIDE"] = dims["AXLE_DIAMETER"]/sqrt(2)
+    dims["WALL_SEP_LENGTH"] = dims["AXLE_LENGTH"]-2*WALL_THICKNESS
+
+    dims["CLEVIS_RAD"] = XBEAM_AXLE_DIA/2
+    dims["CLEVIS_DIST"] = (-dims["WALL_LENGTH"]/2)+dims["CLEVIS_RAD"]+dims["CLEVIS_EDGE_THICK"] #middle of the circular notch
+    dims["WALL_SIDE_X"] = (dims["WALL_LENGTH"]/2)-dims["CLEVIS_EDGE_THICK"]-(dims["AXLE_DIAMETER"]/2) #middle of the square notch
+
+    #top opt cut X1,Y1 .. X6,Y6
+    L1 = dims["L1_percent"]/100.0*dims["WALL_LENGTH"]
+    X1 = dims["WALL_LENGTH"]/2-dims["AXLE_DIAMETER"]-2*dims["CLEVIS_EDGE_THICK"]
+    Y1 = -WALL_HEIGHT/2+dims["ToptThickness"]
+    Y4 = WALL_HEIGHT/2-dims["ToptThickness"]
+    dims["TOPT_POINTS"] = [(X1, Y1), (X1-L1, Y1), (X1-L1, 0.0), (X1-2*L1, Y4), (X1, Y4), (X1, 0.0)]
+
+    return dims
+
+def rotateZ(xyz, angle):
+    c, s = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+    return (c*xyz[0]-s*xyz[1], s*xyz[0]+c*xyz[1], xyz[2])
+
+def wireAnchor(dims, spoonPoint):
+    #crossmember pull point: XBEAM_HEIGHT from the clevis axis, turned towards the spoon as buildInput turns
+    #the crossmember (axle-centred frame)
+    clevisPoint = (dims["CLEVIS_DIST"]-dims["WALL_SIDE_X"], 0.0)
+    toSpoon = (spoonPoint[0]-clevisPoint[0], spoonPoint[1]-clevisPoint[1])
+    toSpoonLength = sqrt(toSpoon[0]**2 + toSpoon[1]**2)
+    return (clevisPoint[0]+XBEAM_HEIGHT*toSpoon[0]/toSpoonLength, clevisPoint[1]+XBEAM_HEIGHT*toSpoon[1]/toSpoonLength, 0.0)
+
+def wireLength(dims):
+    #spoon underside centre to the crossmember pull point
+    spoonPoint = rotateZ((BASE_LENGTH+dims["ARM_LENGTH"]+SPOON_LENGTH/2, -dims["TIP_HEIGHT"]/2, 0.0), ARM_ANGLE)
+    anchor = wireAnchor(dims, spoonPoint)
+    return sqrt(sum([(a-b)**2 for a,b in zip(anchor, spoonPoint)]))
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Mass properties
+# Volumes of the extruded sketches of buildInput (polygon area x depth, less the cuts), so the assembly mass
+# is known before any CAE call. It matches rootAssembly.getMassProperties() to about 0.02% (massValidation);
+# the remainder is the crossmember fillet and the wire, whose true path depends on the assembled clevis angle.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def polygonArea(points):
+    #shoelace formula; points in order around the polygon
+    area = 0.0
+    for (x1,y1),(x2,y2) in zip(points, points[1:]+points[:1]):
+        area += x1*y2-x2*y1
+    return abs(area)/2
+
+def circleStripArea(center, radius, yRange, zRange, numSteps=100):
+    #area of the circle inside the rectangle yRange x zRange (the section is y-z), by the midpoint rule in y
+    yLow, yHigh = max(yRange[0], center[0]-radius), min(yRange[1], center[0]+radius)
+    if yHigh <= yLow:
+        return 0.0
+    step = (yHigh-yLow)/numSteps
+    area = 0.0
+    for i in range(numSteps):
+        y = yLow+(i+0.5)*step
+        halfChord = sqrt(max(radius**2-(y-center[0])**2, 0.0))
+        area += max(0.0, min(zRange[1], center[1]+halfChord)-max(zRange[0], center[1]-halfChord))*step
+    return area
+
+def armVolume(dims):
+    #outer tapered box less the inner void (open at both ends), plus the solid spoon
+    width, thick = dims["BASE_WIDTH"], dims["THICKNESS"]
+    baseHeight, tipHeight, armLength = dims["BASE_HEIGHT"], dims["TIP_HEIGHT"], dims["ARM_LENGTH"]
+    outerArea = BASE_LENGTH*baseHeight + armLength*(baseHeight+tipHeight)/2
+    innerArea = BASE_LENGTH*(baseHeight-2*thick) + armLength*(baseHeight+tipHeight-4*thick)/2
+    spoonVolume = width*tipHeight*SPOON_LENGTH
+    return width*outerArea - (width-2*thick)*innerArea + spoonVolume
+
+def axleVolume(dims):
+    #square section less the arm slot cut through it
+    side = dims["AXLE_SIDE"]
+    return side*(side*dims["AXLE_LENGTH"] - dims["BASE_WIDTH"]*dims["BASE_HEIGHT"])
+
+def wallVolume(dims):
+    #one side wall: outline (a half disc round the clevis end) less the square notch, the clevis hole and the top opt cut
+    wallLength, clevisDist, wallSideX = dims["WALL_LENGTH"], dims["CLEVIS_DIST"], dims["WALL_SIDE_X"]
+    endRadius = dims["CLEVIS_RAD"]+dims["CLEVIS_EDGE_THICK"]
+    outline = polygonArea([(-wallLength/5, WALL_HEIGHT/2), (clevisDist, endRadius), (clevisDist, -endRadius),
+        (-wallLength/5, -WALL_HEIGHT/2), (wallSideX, -WALL_HEIGHT/2), (wallLength/2, 0.0), (wallSideX, WALL_HEIGHT/2)])
+    outline += math.pi*endRadius**2/2
+    cuts = dims["AXLE_DIAMETER"]**2/2 + math.pi*dims["CLEVIS_RAD"]**2 + polygonArea(dims["TOPT_POINTS"])
+    return WALL_THICKNESS*(outline-cuts)
+
+def crossmemberVolume(dims, numSteps=100):
+    """
+    Clevis plate (trapezoid less its triangular cut-out, XBEAM_THICKNESS deep) united with the round axle
+    through it; the overlap of the two is integrated along the axle. The fillet at the cut-out apex is left out.
+    """
+    sepLength, axleLength = dims["WALL_SEP_LENGTH"], dims["AXLE_LENGTH"]
+    vertOffset = XBEAM_AXLE_DIA*0.75
+    slope = (XBEAM_HEIGHT-vertOffset)/(sepLength/2-XBEAM_FLAT_LENGTH/2)
+    insetDist = sepLength/2 - (XBEAM_HEIGHT-1.75*vertOffset)/slope
+    apexHeight = XBEAM_HEIGHT-0.75*vertOffset
+
+    plateArea = polygonArea([(0.0, 0.0), (sepLength, 0.0), (sepLength, vertOffset), (sepLength/2+XBEAM_FLAT_LENGTH/2, XBEAM_HEIGHT),
+        (sepLength/2-XBEAM_FLAT_LENGTH/2, XBEAM_HEIGHT), (0.0, vertOffset)])
+    plateArea -= polygonArea([(sepLength/2, apexHeight), (insetDist, vertOffset), (sepLength-insetDist, vertOffset)])
+    cylinderVolume = math.pi*(XBEAM_AXLE_DIA/2)**2*axleLength
+
+    #axle section: centre (y, z) = (vertOffset/2, XBEAM_THICKNESS/2); plate section at x: 0 <= y <= top(x), 0 <= z <= thickness
+    center, radius, zRange = (vertOffset/2, XBEAM_THICKNESS/2), XBEAM_AXLE_DIA/2, (0.0, XBEAM_THICKNESS)
+    step = sepLength/numSteps
+    overlap = 0.0
+    for i in range(numSteps):
+        fromMiddle = abs((i+0.5)*step - sepLength/2)
+        top = XBEAM_HEIGHT if fromMiddle <= XBEAM_FLAT_LENGTH/2 else vertOffset + slope*(sepLength/2-fromMiddle)
+        area = circleStripArea(center, radius, (0.0, top), zRange)
+        if fromMiddle < sepLength/2-insetDist: #through the cut-out
+            cutTop = vertOffset + (apexHeight-vertOffset)*(1.0-fromMiddle/(sepLength/2-insetDist))
+            area -= circleStripArea(center, radius, (vertOffset, cutTop), zRange)
+        overlap += area*step
+
+    return XBEAM_THICKNESS*plateArea + cylinderVolume - overlap
+
+def partMasses(designVec):
+    #part name -> mass (kg) for every instance of the assembly
+    dims = deriveDimensions(designVec)
+    density = MATERIAL_PROPERTIES[dims["MATERIAL_TYPE"]][1]
+    wallMass = density*wallVolume(dims)
+    return {"ARM":density*armVolume(dims), "Connector_beam":density*axleVolume(dims), "Side_wall_1":wallMass,
+        "Side_wall_2":wallMass, "CROSSMEMBER":density*crossmemberVolume(dims), "Payload":PAY_MASS,
+        "WIRE_BOI":WIRE_DENSITY*math.pi*DRAW_WIRE_RADIUS**2*wireLength(dims)}
+
+def analyticMass(designVec):
+    #assembly mass without a CAE build (what buildInput reads from getMassProperties)
+    return sum(partMasses(designVec).values())
+
+def massValidation(fileName=FINAL_RESULTS_FILE_NAME):
+    #[(designVec, getMassProperties mass, analytic mass, relative error), ...] for the solved DOE rows
+    with open(fileName, "r") as inFile:
+        dataDict = json.load(inFile)
+
+    tableRows = []
+    for keyVal in dataDict:
+        for row in dataDict[keyVal]:
+            if row is None or not 0.0 < row[len(DESIGN_NAMES)+4] < 1e19:
+                continue
+            designVec, refMass = row[:len(DESIGN_NAMES)], row[len(DESIGN_NAMES)+4]
+            mass = analyticMass(designVec)
+            tableRows.append((designVec, refMass, mass, (mass-refMass)/refMass))
+
+    return tableRows
+
+def printValidation(tableRows):
+    print("run,material_type,axle_length,caeMass_kg,analyticMass_kg,relErr_pct")
+    for index,(designVec, refMass, mass, relError) in enumerate(tableRows, 1):
+        print(",".join([str(index), str(int(designVec[7])), str(designVec[6]), "%.1f"%refMass, "%.1f"%mass, "%+.3f"%(100*relError)]))
+    relErrors = [abs(row[3]) for row in tableRows]
+    print("max |relErr| %.3f%%, mean |relErr| %.3f%% over %d runs"%(100*max(relErrors), 100*sum(relErrors)/len(relErrors), len(relErrors)))
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Feasibility
+# The geometric conditions buildInput needs to produce a valid part, checked before a job is dispatched.
+# evalModel only raises the first of them itself; the others fail inside the sketcher, a partition or a
+# findAt pick, after a full CAE attempt.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+MIN_LIGAMENT = 0.01 #m, thinnest wall material left between two cuts or a cut and an edge
+FACE_PICK_OFFSET = 0.01 #m, buildInput picks the wall's bottom face this far left of X4
+FEASIBILITY_TOL = 1e-9
+
+def geometryLimits(dims):
+    #largest admissible value of each design variable a check can be repaired with, given the others
+    wallLength = dims["WALL_LENGTH"]
+    leftmostX4 = max(-wallLength/5+FACE_PICK_OFFSET, dims["CLEVIS_DIST"]+dims["CLEVIS_RAD"]+dims["CLEVIS_EDGE_THICK"])
+    X1 = dims["TOPT_POINTS"][0][0]
+    return {"BASE_HEIGHT":(WALL_HEIGHT-2*MIN_LIGAMENT)/sqrt(2)-0.05, #AXLE_DIAMETER <= WALL_HEIGHT-2*MIN_LIGAMENT
+        "THICKNESS":min(dims["BASE_HEIGHT"], dims["BASE_WIDTH"], dims["TIP_HEIGHT"])/2-MIN_LIGAMENT/10,
+        "ToptThickness":WALL_HEIGHT/2-MIN_LIGAMENT, #the cut has to reach past the wall's mid-line
+        "L1_percent":100.0*(X1-leftmostX4)/2/wallLength} #X4 = X1-2*L1 >= leftmostX4
+
+def geometryViolations(designVec):
+    """
+    Reasons the design cannot be built, in buildInput order ([] = buildable).
+    -arm wall: 2*THICKNESS must stay below BASE_WIDTH, BASE_HEIGHT and TIP_HEIGHT (evalModel's "Thickness is too big")
+    -axle notch: the diamond notch (AXLE_DIAMETER tall) has to fit in the wall height
+    -top opt cut: Y1 < 0 < Y4, and X4 has to stay right of both the clevis ring and the wall taper
+    """
+    dims = deriveDimensions(designVec)
+    limits = geometryLimits(dims)
+    violations = []
+    if dims["BASE_HEIGHT"] > limits["BASE_HEIGHT"]+FEASIBILITY_TOL:
+        violations.append("axle notch: AXLE_DIAMETER %.4f leaves less than %.3f m of wall"%(dims["AXLE_DIAMETER"], MIN_LIGAMENT))
+    if dims["THICKNESS"] > limits["THICKNESS"]+FEASIBILITY_TOL:
+        violations.append("arm wall: THICKNESS %.4f too big for the arm section"%dims["THICKNESS"])
+    if dims["ToptThickness"] > limits["ToptThickness"]+FEASIBILITY_TOL:
+        violations.append("top opt cut: ToptThickness %.4f leaves no cut"%dims["ToptThickness"])
+    if dims["L1_percent"] > limits["L1_percent"]+FEASIBILITY_TOL:
+        violations.append("top opt cut: X4 %.4f crosses the clevis or the wall taper"%dims["TOPT_POINTS"][3][0])
+
+    return violations
+
+def isBuildable(designVec):
+    return not geometryViolations(designVec)
+
+def repairDesign(designVec, boundsList=None):
+    """
+    Nearest buildable design: each violated variable is lowered to its limit, in buildInput order
+    (BASE_HEIGHT moves the others' limits). Returns None if a limit falls below the variable's lower bound
+    in boundsList (full-scale [min, max] pairs in DESIGN_NAMES order).
+    """
+    repairedVec = list(designVec)
+    for name in ["BASE_HEIGHT", "THICKNESS", "ToptThickness", "L1_percent"]:
+        index = DESIGN_NAMES.index(name)
+        limit = geometryLimits(deriveDimensions(repairedVec))[name]
+        if repairedVec[index] > limit:
+            if boundsList is not None and limit < boundsList[index][0]:
+                return None
+            repairedVec[index] = limit
+
+    return repairedVec if isBuildable(repairedVec) else None
+
+def screenDesigns(designList, boundsList=None, repair=True):
+    #(buildable designs, [(original design, violations, repaired design or None), ...] for the rejected ones)
+    keptList, rejectedList = [], []
+    for designVec in designList:
+        violations = geometryViolations(designVec)
+        if not violations:
+            keptList.append(designVec)
+            continue
+        repairedVec = repairDesign(designVec, boundsList) if repair else None
+        rejectedList.append((designVec, violations, repairedVec))
+        if repairedVec is not None:
+            keptList.append(repairedVec)
+
+    return keptList, rejectedList
+
+
+if __name__ == "__main__":
+    #python designGeometry.py: analytic mass against the CAE masses of the DOE runs
+    printValidation(massValidation())
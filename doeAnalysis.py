@@ -1,21 +1,62 @@
 #Main analysis integration code for DOE
 
+import os
 import json
-from LunaCatAbqMainCode import evalModel
+import batchEvaluator
+import resultCache
+import designGeometry
 
 
 inputFileName = None
 outputFileName = None
+numWorkers = 1
+maxRunningJobs = 1
+cacheFileName = resultCache.CACHE_FILE_NAME
+journalFileName = "RESULT_JOURNAL.jsonl"
 with open("CONFIG.txt", "r") as configFile:
     for line in configFile:
         if "INPUT FILENAME" in line:
             inputFileName = line.split(":")[-1].strip()
         elif "ANALYSIS OUTPUT FILENAME" in line:
             outputFileName = line.split(":")[-1].strip()
+        elif "NUM WORKERS" in line:
+            numWorkers = int(line.split(":")[-1].strip())
+        elif "MAX RUNNING JOBS" in line:
+            #"auto": jobScheduler picks CPUs per job and how many run at once from the node and past timings
+            maxRunningJobs = line.split(":")[-1].strip()
+            maxRunningJobs = maxRunningJobs if maxRunningJobs.lower() == "auto" else int(maxRunningJobs)
+        elif "RESULT CACHE FILENAME" in line:
+            cacheFileName = line.split(":")[-1].strip()
+        elif "RESULT JOURNAL FILENAME" in line:
+            journalFileName = line.split(":")[-1].strip()
             
 if inputFileName is None or outputFileName is None:
     raise IOError("Could not locate filenames from config.")
     
+#Result journal: one JSON line per finished row, appended (and flushed to disk) as soon as the row completes,
+#so a crashed run can be restarted and only the missing rows are evaluated. Delete the journal to start over.
+def loadJournal(fileName):
+    #{(keyVal, index): entry} for every complete line; a line torn by a crash is ignored
+    journal = {}
+    if not os.path.exists(fileName):
+        return journal
+    
+    with open(fileName, "r") as inFile:
+        for line in inFile:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            journal[(entry["key"], entry["index"])] = entry
+            
+    return journal
+
+def appendJournal(fileName, entry):
+    with open(fileName, "a") as outFile:
+        outFile.write(json.dumps(entry)+"\n")
+        outFile.flush()
+        os.fsync(outFile.fileno())
+
 #Load data from JSON
 dataDict = None
 with open(inputFileName, "r") as inFile:
@@ -23,52 +64,104 @@ with open(inputFileName, "r") as inFile:
     
 print("Data successfully loaded from "+str(inputFileName))
 
+#Serial runs evaluate in this CAE kernel (pipelined when MAX RUNNING JOBS > 1);
+#parallel runs launch one abaqus kernel per job in its own scratch directory
+if numWorkers > 1:
+    evaluator = batchEvaluator.abaqusEvaluator
+    scratchRoot = batchEvaluator.SCRATCH_ROOT
+else:
+    evaluator = batchEvaluator.inProcessEvaluator
+    scratchRoot = None
+
+#previously solved designs are served from the result cache instead of being re-run
+cache = resultCache.ResultCache(cacheFileName)
+
+journal = loadJournal(journalFileName)
+
 #loop thru data and perform functional evaluations
-outputDict = {}
-with open("goodBad.txt", "w") as outFile:
-    outFile.write("LOG\n________________________\n")
-    
-with open("safetyNet.txt", "w") as outFile:
-    outFile.write("arm_base_width,arm_base_height,arm_wall_thickness,arm_length,arm_taper_ratio,wall_length,axle_length,material_type,top_opt_thickness,L1,clevis_edge_thickness,veloMagMax,veloAngle,eigenVal1,maxMises,mass\n")
+if journal:
+    print("Resuming: "+str(len(journal))+" finished rows found in "+str(journalFileName))
+else:
+    with open("goodBad.txt", "w") as outFile:
+        outFile.write("LOG\n________________________\n")
+        
+    with open("safetyNet.txt", "w") as outFile:
+        outFile.write("arm_base_width,arm_base_height,arm_wall_thickness,arm_length,arm_taper_ratio,wall_length,axle_length,material_type,top_opt_thickness,L1,clevis_edge_thickness,veloMagMax,veloAngle,eigenVal1,maxMises,mass\n")
 
-for keyVal in ['tag']: #Use taguchi only
-    keyOutputDataList = []
+#design sets doeInputGen can write: Taguchi, full factorial, and sampled (LHS/Sobol/Halton) points
+DOE_KEYS = ['tag', 'ff', 'lhs', 'sobol', 'halton']
+for keyVal in [key for key in DOE_KEYS if key in dataDict]:
     keyList = dataDict[keyVal]
-    jobNumber = 1
+    
+    designList = []
     for entry in keyList[:]:
         arm_base_width,arm_base_height,arm_wall_thickness,arm_length,arm_taper_ratio,wall_length,axle_length,material_type,top_opt_thickness,L1,clevis_edge_thickness = entry
         
         material_type = int(round(material_type)) #Bucket material value index into discrete values
-        
-        isGood = False
-        try:
-            veloMagMax,veloAngle,eigenVal1,maxMises,mass = evalModel(arm_base_width,arm_base_height,arm_wall_thickness,arm_length,arm_taper_ratio,wall_length,axle_length,material_type,top_opt_thickness,L1,clevis_edge_thickness,jobNumber)
-            print("Entry List '"+str(entry)+"' SUCCEEDED.")
-            isGood = True
-        except Exception as e:
-            print("EXCEPTION: "+str(e))
-            veloMagMax=-1e20
-            veloAngle=0.0
-            eigenVal1=-1e20
-            maxMises=1e20
-            mass=1e20
-            print("Entry List '"+str(entry)+"' FAILED.")
-        indivList = [arm_base_width,arm_base_height,arm_wall_thickness,arm_length,arm_taper_ratio,wall_length,axle_length,material_type,top_opt_thickness,L1,clevis_edge_thickness,veloMagMax,veloAngle,eigenVal1,maxMises,mass]
-        keyOutputDataList.append(indivList)
+        designList.append([arm_base_width,arm_base_height,arm_wall_thickness,arm_length,arm_taper_ratio,wall_length,axle_length,material_type,top_opt_thickness,L1,clevis_edge_thickness])
+    
+    def logEntry(index, results, isGood):
+        print("Entry List '"+str(keyList[index])+("' SUCCEEDED." if isGood else "' FAILED."))
+        indivList = designList[index] + list(results)
+        appendJournal(journalFileName, {"key":keyVal, "index":index, "design":designList[index], "results":list(results), "isGood":isGood})
     
         with open("goodBad.txt", "a") as outFile:
             outFile.write(("GOOD" if isGood else "BAD" )+"\n")
             
         with open("safetyNet.txt", "a") as outFile:
             outFile.write(",".join([str(x) for x in indivList])+"\n")
-            
-        jobNumber += 1
-    outputDict[keyVal] = keyOutputDataList
     
-#output data to JSON
+    #rows already in the journal are done; of the rest only the cache misses get dispatched
+    #(rows buildInput cannot build are logged BAD without a run); job numbers stay tied to the row index
+    pendingIndices = []
+    for index,designVec in enumerate(designList):
+        journalEntry = journal.get((keyVal, index))
+        if journalEntry is not None and journalEntry["design"] == designVec:
+            continue
+        
+        violations = designGeometry.geometryViolations(designVec)
+        if violations:
+            print("Not run, "+"; ".join(violations))
+            logEntry(index, batchEvaluator.FAILED_RESULT, False)
+            continue
+        
+        cachedResults = cache.get(designVec)
+        if cachedResults is None:
+            pendingIndices.append(index)
+        else:
+            logEntry(index, cachedResults, True)
+    
+    pendingDesigns = [designList[index] for index in pendingIndices]
+    pendingJobNumbers = [index+1 for index in pendingIndices]
+    
+    def logPendingEntry(pendingIndex, results, isGood):
+        index = pendingIndices[pendingIndex]
+        if isGood:
+            cache.put(designList[index], results)
+        logEntry(index, results, isGood)
+    
+    if numWorkers <= 1 and maxRunningJobs == "auto":
+        import jobScheduler
+        from LunaCatAbqMainCode import evalModelQueue
+        scheduler = jobScheduler.JobScheduler()
+        print(scheduler.summary())
+        evalModelQueue(pendingDesigns, jobNumbers=pendingJobNumbers, callback=logPendingEntry, scheduler=scheduler)
+    elif numWorkers <= 1 and maxRunningJobs > 1:
+        from LunaCatAbqMainCode import evalModelQueue
+        evalModelQueue(pendingDesigns, jobNumbers=pendingJobNumbers, maxRunning=maxRunningJobs, callback=logPendingEntry)
+    else:
+        batchEvaluator.runBatch(pendingDesigns, evaluator=evaluator, numWorkers=numWorkers, scratchRoot=scratchRoot, jobNumbers=pendingJobNumbers, callback=logPendingEntry)
+    
+#output data to JSON, assembled from the journal so rows from earlier (interrupted) runs are included
+journal = loadJournal(journalFileName)
+outputDict = {}
+for keyVal in [key for key in DOE_KEYS if key in dataDict]:
+    outputDict[keyVal] = [journal[(keyVal, index)]["design"] + journal[(keyVal, index)]["results"] for index in range(len(dataDict[keyVal]))]
+
 with open(outputFileName, "w") as outFile:
     json.dump(outputDict,outFile)
     
 print("Successfully wrote output to "+str(outputFileName))
+print(cache.statsString())
+cache.close()
     
-
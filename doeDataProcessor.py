@@ -25,7 +25,7 @@ print("Data successfully loaded from "+str(outputFileName))
     
 #first create data tables
 for keyName in dataDict.keys():
-    descriptor = "Full_Factorial" if keyName == "ff" else "Taguchi" if keyName == "tag" else "LHS" if keyName == "lhs" else "ERROR"
+    descriptor = "Full_Factorial" if keyName == "ff" else "Taguchi" if keyName == "tag" else "LHS" if keyName == "lhs" else "Sobol" if keyName == "sobol" else "Halton" if keyName == "halton" else "ERROR"
     caseList = dataDict[keyName]
     
     #h_L,fd1,fd2,oopThickness,massVal,maxMises
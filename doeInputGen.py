@@ -1,5 +1,8 @@
+import sys
 import json
+import numpy
 import DOEmethods as doe
+import designGeometry
 
 arm_base_width_min = 0.1 #m #
 arm_base_width_max = 0.4 #m
@@ -49,20 +52,57 @@ boundsList = [[arm_base_width_min, arm_base_width_max], [arm_base_height_min, ar
 
 
 def createTaguchiInputFile():
-    unMappedParamList = doe.Taguchi(11,"L12_Taguchi.txt")
+    unMappedParamList = doe.Taguchi(11, levels=2) #built-in L12
     
     testParamList = []
     for normedList in unMappedParamList:
         listToAdd = []
         for i,boundTuple in enumerate(boundsList):
-            percentVal = normedList[i]
+            percentVal = float(normedList[i])
             mappedVal = (boundTuple[1]-boundTuple[0])*percentVal + boundTuple[0]
             listToAdd.append(mappedVal)
         testParamList.append(listToAdd)
     
+    #points buildInput cannot build are moved to the nearest buildable design (or dropped) before any job runs
+    testParamList, rejectedList = designGeometry.screenDesigns(testParamList, boundsList)
+    for designVec, violations, repairedVec in rejectedList:
+        print(("Repaired " if repairedVec is not None else "Dropped ")+str(designVec)+": "+"; ".join(violations))
+    
     return testParamList
 
-tagTestData = createTaguchiInputFile()
+def screenedChunks(chunkIter):
+    #full-scale blocks with the unbuildable points repaired or dropped
+    for designArray in chunkIter:
+        designList, rejectedList = designGeometry.screenDesigns(designArray.tolist(), boundsList)
+        if designList:
+            yield numpy.array(designList)
+
+def createFullFactorialFile(numLevels, fileName, chunkSize=doe.DEFAULT_CHUNK_SIZE):
+    #stream the numLevels**11 full factorial to a CSV (one full-scale design per row) without holding the grid
+    chunkIter = screenedChunks(doe.FullFactorialChunks(len(boundsList), numLevels, chunkSize, boundsList))
+    header = "arm_base_width,arm_base_height,arm_wall_thickness,arm_length,arm_taper_ratio,wall_length,axle_length,material_type,top_opt_thickness,L1,clevis_edge_thickness"
+    return doe.writeChunks(chunkIter, fileName, header)
+
+if "--full-factorial" in sys.argv:
+    #python doeInputGen.py --full-factorial <numLevels>: FULL_FACTORIAL_<numLevels>L.csv; feed it back in blocks
+    #with DOEmethods.readChunks (or the chunk stream itself) to batchEvaluator.runStream
+    numLevels = int(sys.argv[sys.argv.index("--full-factorial")+1])
+    factorialFileName = "FULL_FACTORIAL_"+str(numLevels)+"L.csv"
+    print("Wrote "+str(createFullFactorialFile(numLevels, factorialFileName))+" designs to "+factorialFileName)
+    sys.exit(0)
+
+def createSampledInputFile(method, numSamples, seed=None, start=0):
+    #numSamples space-filling points (DOEmethods.SpaceFilling), full scale and screened like the Taguchi rows;
+    #a Sobol/Halton batch with the same seed and start = rows already run extends the earlier batch
+    normedArray = doe.SpaceFilling(method, len(boundsList), numSamples, seed=seed, start=start)
+    testParamList, rejectedList = designGeometry.screenDesigns(doe.scaleToBounds(normedArray, boundsList).tolist(), boundsList)
+    for designVec, violations, repairedVec in rejectedList:
+        print(("Repaired " if repairedVec is not None else "Dropped ")+str(designVec)+": "+"; ".join(violations))
+    
+    return testParamList
+
+def argValue(flag, default=None):
+    return sys.argv[sys.argv.index(flag)+1] if flag in sys.argv else default
 
 fileName = "input.json"
 with open("CONFIG.txt", "r") as configFile:
@@ -70,8 +110,17 @@ with open("CONFIG.txt", "r") as configFile:
         if "INPUT FILENAME" in line:
             fileName = line.split(":")[-1].strip()
 
+#python doeInputGen.py [--sampler lhs|sobol|halton <numSamples> [--seed <seed>] [--start <index>]]
+#(the Taguchi L12 by default)
+if "--sampler" in sys.argv:
+    method = argValue("--sampler")
+    seed = argValue("--seed")
+    dataToOutput = {method:createSampledInputFile(method, int(sys.argv[sys.argv.index("--sampler")+2]),
+        seed=None if seed is None else int(seed), start=int(argValue("--start", 0)))}
+else:
+    dataToOutput = {"tag":createTaguchiInputFile()}
+
 with open(fileName, "w") as outFile:
-    dataToOutput = {"tag":tagTestData}
     json.dump(dataToOutput, outFile)
 
 print("Done.")
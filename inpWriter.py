@@ -0,0 +1,415 @@
+#Direct input-deck writer for LunaCat
+#Writes Job-<n>.inp for a design straight from Python, with no CAE kernel: the arm (tapered hollow box, S4R shells)
+#with its solid spoon, the square axle and the payload (structured C3D8R blocks) and the draw wire (B31 line),
+#with the same materials, sections, ties, contact, steps and outputs as buildInput.
+#The side walls and the crossmember (the topology-optimized parts) are not meshed: the axle is clamped where it
+#sits in the walls and the wire is anchored at the crossmember pull point, so the deck is a reduced-order model
+#for fast screening, not a replacement for the full CAE build.
+#Output is deterministic (fixed ordering and number formatting), so two decks can be diffed line by line.
+
+import sys
+import math
+import time
+
+import designGeometry as geom
+import modelFidelity
+
+
+RELEASE_HISTORY_INTERVAL = 0.0005 #s, as LunaCatAbqMainCode
+ENTRIES_PER_LINE = 16 #Abaqus limit for set data lines
+
+WIRE_MODULUS = 10000000000000000.0
+PAYLOAD_MODULUS = 10000000000.0
+
+#C3D8 face ids by side of a structured block (node order i,j,k as in PartMesh.block)
+BLOCK_FACES = {"x-":"S6", "x+":"S4", "y-":"S3", "y+":"S5", "z-":"S1", "z+":"S2"}
+
+
+def fmt(value):
+    return "%.9g"%value
+
+def divisions(start, end, seedSize):
+    #evenly spaced stations from start to end, no wider apart than seedSize
+    numDiv = max(1, int(math.ceil(abs(end-start)/seedSize - 1e-9)))
+    return [start + (end-start)*i/float(numDiv) for i in range(numDiv+1)]
+
+def stations(breakPoints, seedSize):
+    #stations through every break point (so e.g. the end of the arm base is a node row)
+    pointList = [breakPoints[0]]
+    for start,end in zip(breakPoints[:-1], breakPoints[1:]):
+        pointList += divisions(start, end, seedSize)[1:]
+    return pointList
+
+
+class PartMesh(object):
+    """
+    Nodes, elements, sets and surfaces of one part, kept in the order they are added.
+    -block(xs, ys, zs, elsetName) meshes a box on a rectilinear grid with C3D8R bricks
+    -mass accumulates element volume x density as sections are assigned
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.nodes = []
+        self.elementGroups = [] #(elemType, elsetName, [(label, nodeLabels), ...])
+        self.nsets = []
+        self.surfaces = []
+        self.sectionLines = []
+        self.mass = 0.0
+
+    def addNode(self, xyz):
+        self.nodes.append(tuple(xyz))
+        return len(self.nodes)
+
+    def numElements(self):
+        return sum([len(group[2]) for group in self.elementGroups])
+
+    def addElements(self, elemType, elsetName, connectivity):
+        label = self.numElements()
+        elemList = []
+        for nodeLabels in connectivity:
+            label += 1
+            elemList.append((label, nodeLabels))
+        self.elementGroups.append((elemType, elsetName, elemList))
+        return [elem[0] for elem in elemList]
+
+    def block(self, xs, ys, zs, elsetName):
+        nodeGrid = [[[self.addNode((x, y, z)) for z in zs] for y in ys] for x in xs]
+        connectivity = []
+        for i in range(len(xs)-1):
+            for j in range(len(ys)-1):
+                for k in range(len(zs)-1):
+                    connectivity.append((nodeGrid[i][j][k], nodeGrid[i+1][j][k], nodeGrid[i+1][j+1][k], nodeGrid[i][j+1][k],
+                        nodeGrid[i][j][k+1], nodeGrid[i+1][j][k+1], nodeGrid[i+1][j+1][k+1], nodeGrid[i][j+1][k+1]))
+        labels = iter(self.addElements("C3D8R", elsetName, connectivity))
+        elemGrid = [[[next(labels) for k in range(len(zs)-1)] for j in range(len(ys)-1)] for i in range(len(xs)-1)]
+        return nodeGrid, elemGrid
+
+    def faceSurface(self, name, elemGrid, side):
+        #element surface on one side of a block
+        ni, nj, nk = len(elemGrid), len(elemGrid[0]), len(elemGrid[0][0])
+        iRange = [ni-1] if side == "x+" else [0] if side == "x-" else range(ni)
+        jRange = [nj-1] if side == "y+" else [0] if side == "y-" else range(nj)
+        kRange = [nk-1] if side == "z+" else [0] if side == "z-" else range(nk)
+        labels = [elemGrid[i][j][k] for i in iRange for j in jRange for k in kRange]
+        self.surfaces.append((name, "ELEMENT", [str(label)+", "+BLOCK_FACES[side] for label in labels]))
+
+    def nodeSurface(self, name, nodeLabels):
+        self.nsets.append((name, nodeLabels))
+        self.surfaces.append((name, "NODE", [name+", 1."]))
+
+    def addMass(self, volume, density):
+        self.mass += volume*density
+
+    def lines(self):
+        lineList = ["*Part, name="+self.name, "*Node"]
+        lineList += ["%d, %s"%(label, ", ".join([fmt(c) for c in xyz])) for label,xyz in enumerate(self.nodes, 1)]
+        for elemType,elsetName,elemList in self.elementGroups:
+            lineList.append("*Element, type="+elemType+", elset="+elsetName)
+            lineList += [", ".join([str(label)]+[str(n) for n in nodeLabels]) for label,nodeLabels in elemList]
+        for name,nodeLabels in self.nsets:
+            lineList.append("*Nset, nset="+name)
+            lineList += setLines(nodeLabels)
+        for name,surfType,dataLines in self.surfaces:
+            lineList.append("*Surface, type="+surfType+", name="+name)
+            lineList += dataLines
+        lineList += self.sectionLines
+        lineList.append("*End Part")
+        return lineList
+
+
+def setLines(labels):
+    return [", ".join([str(label) for label in labels[i:i+ENTRIES_PER_LINE]]) for i in range(0, len(labels), ENTRIES_PER_LINE)]
+
+def blockVolume(xs, ys, zs):
+    return abs((xs[-1]-xs[0])*(ys[-1]-ys[0])*(zs[-1]-zs[0]))
+
+def quadArea(p1, p2, p3, p4):
+    #half the cross product of the diagonals (exact for a planar quad)
+    d1 = [b-a for a,b in zip(p1, p3)]
+    d2 = [b-a for a,b in zip(p2, p4)]
+    cross = (d1[1]*d2[2]-d1[2]*d2[1], d1[2]*d2[0]-d1[0]*d2[2], d1[0]*d2[1]-d1[1]*d2[0])
+    return 0.5*math.sqrt(sum([c**2 for c in cross]))
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Parts
+# ARM, Connector_beam and Payload are meshed in the arm frame (axle axis = z through the origin, arm along +x)
+# and placed by a rotation of designGeometry.ARM_ANGLE about z; the wire is meshed in the global frame
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def armPart(dims, seedSize, material):
+    """
+    Hollow tapered box as S4R shells on the wall mid-surfaces (constant BASE_HEIGHT over BASE_LENGTH, then a
+    linear taper to TIP_HEIGHT) and the solid spoon beyond the tip.
+    Sets: ARM_ROOT (shell nodes on the axle face), SPOON_PULL_POINT; surfaces: ARM_ROOT, ARM_TIP,
+    SPOON_BACK_SURF, SPOON_TOP_SURF, SPOON_BOTTOM_SURF
+    """
+    part = PartMesh("ARM")
+    width, thick = dims["BASE_WIDTH"], dims["THICKNESS"]
+    rootX = dims["AXLE_SIDE"]/2
+    tipX = geom.BASE_LENGTH + dims["ARM_LENGTH"]
+    xs = stations([rootX, geom.BASE_LENGTH, tipX] if geom.BASE_LENGTH > rootX else [rootX, tipX], seedSize)
+
+    def height(x):
+        if x <= geom.BASE_LENGTH:
+            return dims["BASE_HEIGHT"]
+        return dims["BASE_HEIGHT"] + (dims["TIP_HEIGHT"]-dims["BASE_HEIGHT"])*(x-geom.BASE_LENGTH)/dims["ARM_LENGTH"]
+
+    #ring around the mid-surface: bottom, +z side, top, -z side (fractions of the mid-surface height/width)
+    numW = len(divisions(0.0, width, seedSize))-1
+    numH = len(divisions(0.0, max(dims["BASE_HEIGHT"], dims["TIP_HEIGHT"]), seedSize))-1
+    ring = [(-0.5, -0.5+float(k)/numW) for k in range(numW)] + [(-0.5+float(k)/numH, 0.5) for k in range(numH)] \
+        + [(0.5, 0.5-float(k)/numW) for k in range(numW)] + [(0.5-float(k)/numH, -0.5) for k in range(numH)]
+
+    nodeRings = []
+    for x in xs:
+        midHeight, midWidth = height(x)-thick, width-thick
+        nodeRings.append([part.addNode((x, fy*midHeight, fz*midWidth)) for fy,fz in ring])
+    connectivity = []
+    for i in range(len(xs)-1):
+        for k in range(len(ring)):
+            kNext = (k+1)%len(ring)
+            connectivity.append((nodeRings[i][k], nodeRings[i+1][k], nodeRings[i+1][kNext], nodeRings[i][kNext]))
+            part.addMass(thick*quadArea(*[part.nodes[n-1] for n in connectivity[-1]]), material[1])
+    part.addElements("S4R", "ARM_WALLS", connectivity)
+    part.nodeSurface("ARM_ROOT", nodeRings[0])
+    part.nodeSurface("ARM_TIP", nodeRings[-1])
+
+    sx = divisions(tipX, tipX+geom.SPOON_LENGTH, seedSize)
+    sy = divisions(-dims["TIP_HEIGHT"]/2, dims["TIP_HEIGHT"]/2, seedSize)
+    sz = divisions(-width/2, width/2, seedSize)
+    nodeGrid, elemGrid = part.block(sx, sy, sz, "SPOON")
+    part.addMass(blockVolume(sx, sy, sz), material[1])
+    part.faceSurface("SPOON_BACK_SURF", elemGrid, "x-")
+    part.faceSurface("SPOON_TOP_SURF", elemGrid, "y+")
+    part.faceSurface("SPOON_BOTTOM_SURF", elemGrid, "y-")
+    pullNode = nodeGrid[len(sx)//2][0][len(sz)//2]
+    part.nsets.append(("SPOON_PULL_POINT", [pullNode]))
+
+    part.sectionLines = ["*Shell Section, elset=ARM_WALLS, material="+material[0], fmt(thick)+", 5",
+        "*Solid Section, elset=SPOON, material="+material[0], ","]
+    return part, part.nodes[pullNode-1]
+
+def axlePart(dims, seedSize, material):
+    """
+    Square axle section (the diamond of buildInput, seen in the arm frame) along z.
+    Sets: WALL_CLAMP (the nodes inside the side walls); surfaces: ARM_FACE (the face the arm root is tied to)
+    """
+    part = PartMesh("Connector_beam")
+    half = dims["AXLE_SIDE"]/2
+    xs = divisions(-half, half, seedSize)
+    zs = stations([-dims["AXLE_LENGTH"]/2, -dims["WALL_SEP_LENGTH"]/2, dims["WALL_SEP_LENGTH"]/2, dims["AXLE_LENGTH"]/2], seedSize)
+    nodeGrid, elemGrid = part.block(xs, xs, zs, "AXLE")
+    part.addMass(blockVolume(xs, xs, zs), material[1])
+    part.faceSurface("ARM_FACE", elemGrid, "x+")
+
+    clampNodes = [nodeGrid[i][j][k] for i in range(len(xs)) for j in range(len(xs)) for k in range(len(zs))
+        if abs(zs[k]) >= dims["WALL_SEP_LENGTH"]/2 - 1e-9]
+    part.nsets.append(("WALL_CLAMP", sorted(clampNodes)))
+
+    part.sectionLines = ["*Solid Section, elset=AXLE, material="+material[0], ","]
+    return part
+
+def payloadPart(dims, seedSize):
+    """
+    Payload box seated on the spoon top, centred on the spoon.
+    Sets: PAY_PULL_POINT (bottom node nearest the centre), BOTTOM_PAYLOAD; surfaces: PAY_BOTTOM_SURF
+    """
+    part = PartMesh("Payload")
+    startX = geom.BASE_LENGTH + dims["ARM_LENGTH"] + (geom.SPOON_LENGTH-dims["PAY_LENGTH"])/2
+    xs = divisions(startX, startX+dims["PAY_LENGTH"], seedSize)
+    ys = divisions(dims["TIP_HEIGHT"]/2, dims["TIP_HEIGHT"]/2+dims["PAY_HEIGHT"], seedSize)
+    zs = divisions(-dims["PAY_WIDTH"]/2, dims["PAY_WIDTH"]/2, seedSize)
+    nodeGrid, elemGrid = part.block(xs, ys, zs, "PAYLOAD")
+    part.addMass(blockVolume(xs, ys, zs), dims["PAY_DENSITY"])
+    part.faceSurface("PAY_BOTTOM_SURF", elemGrid, "y-")
+    part.nsets.append(("PAY_PULL_POINT", [nodeGrid[len(xs)//2][0][len(zs)//2]]))
+    part.nsets.append(("BOTTOM_PAYLOAD", [nodeGrid[i][0][k] for i in range(len(xs)) for k in range(len(zs))]))
+
+    part.sectionLines = ["*Solid Section, elset=PAYLOAD, material=MoonRock", ","]
+    return part
+
+def wirePart(dims, seedSize, spoonPoint):
+    """
+    B31 line from the spoon pull point to the crossmember pull point (XBEAM_HEIGHT from the clevis axis,
+    turned towards the spoon as buildInput turns the crossmember), in the global frame.
+    Returns the part, the rope length and the labels of the two end nodes (spoon end, clevis end).
+    """
+    part = PartMesh("WIRE_BOI")
+    anchor = geom.wireAnchor(dims, spoonPoint)
+    ropeDistance = math.sqrt(sum([(a-b)**2 for a,b in zip(anchor, spoonPoint)]))
+
+    fractions = divisions(0.0, 1.0, seedSize/ropeDistance)
+    nodeLabels = [part.addNode([s+f*(a-s) for s,a in zip(spoonPoint, anchor)]) for f in fractions]
+    part.addElements("B31", "All_Wire_Edges", list(zip(nodeLabels[:-1], nodeLabels[1:])))
+    part.addMass(math.pi*geom.DRAW_WIRE_RADIUS**2*ropeDistance, geom.WIRE_DENSITY)
+    part.nsets.append(("All_Wire_Edges", nodeLabels))
+
+    part.sectionLines = ["*Beam Section, elset=All_Wire_Edges, material=WireMatl, temperature=GRADIENTS, section=CIRC, poisson=0.",
+        fmt(geom.DRAW_WIRE_RADIUS), "0., 0., -1."]
+    return part, ropeDistance, (nodeLabels[0], nodeLabels[-1])
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Deck
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def materialLines(name, density, youngs, poisson, expansion=None):
+    lineList = ["*Material, name="+name, "*Density", fmt(density)+",", "*Elastic", fmt(youngs)+", "+fmt(poisson)]
+    if expansion is not None:
+        lineList += ["*Expansion", fmt(expansion)+","]
+    return lineList
+
+def instanceLines(name, partName, angle=0.0):
+    lineList = ["*Instance, name="+name+", part="+partName]
+    if angle:
+        lineList += ["0., 0., 0.", "0., 0., 0., 0., 0., 1., "+fmt(angle)]
+    return lineList + ["*End Instance"]
+
+def stepLines(stepName, stepSettings):
+    step = stepSettings[stepName]
+    fieldLines = ["*Output, field, variable=PRESELECT, time interval="+fmt(step["timeInterval"])+", time marks=NO",
+        "*Output, history, variable=PRESELECT"]
+
+    if stepName == "Loading":
+        return (["** STEP: Loading", "*Step, name=Loading, nlgeom=YES, inc="+str(step["maxNumInc"]), "*Static",
+            fmt(step["initialInc"])+", 1., 5e-05, 1.",
+            "*Dload", ", GRAV, 1.62, 0., -1., 0.",
+            "*Temperature, amplitude=Amp-1", "WIRE_BOI-1.All_Wire_Edges, 1."] + fieldLines + ["*End Step"])
+
+    period, minInc = {"Launch":(0.01, 2e-07), "FollowThru":(0.15, 2e-05)}[stepName]
+    lineList = ["** STEP: "+stepName, "*Step, name="+stepName+", nlgeom=YES, inc="+str(step["maxNumInc"]),
+        "*Dynamic, application=TRANSIENT FIDELITY, initial=YES",
+        fmt(step["initialInc"])+", "+fmt(period)+", "+fmt(minInc)+", "+fmt(period)]
+    if stepName == "Launch":
+        lineList += ["*Model Change, type=ELEMENT, remove", "WIRE_BOI-1.All_Wire_Edges,"]
+    lineList += fieldLines
+    if stepName == "Launch":
+        #release history, as buildInput's H-Output-Release / H-Output-Contact
+        lineList += ["** HISTORY OUTPUT: H-Output-Release", "*Output, history, time interval="+fmt(RELEASE_HISTORY_INTERVAL),
+            "*Node Output, nset=Payload-1.PAY_PULL_POINT", "V1, V2",
+            "** HISTORY OUTPUT: H-Output-Contact", "*Output, history, time interval="+fmt(RELEASE_HISTORY_INTERVAL),
+            "*Contact Output, master=ARM-1.SPOON_TOP_SURF, slave=Payload-1.PAY_BOTTOM_SURF", "CFNM"]
+    return lineList + ["*End Step"]
+
+def buckleStepLines():
+    return ["** STEP: BuckleCheck", "*Step, name=BuckleCheck, nlgeom=YES, perturbation", "*Buckle, eigensolver=lanczos",
+        "1, , , , ,",
+        "*Cload", "Payload-1.PAY_PULL_POINT, 1, 1.", "Payload-1.PAY_PULL_POINT, 2, -1.",
+        "*Output, field, variable=PRESELECT", "*End Step"]
+
+def deckLines(designVec, jobName="Job-1", fidelity=None):
+    """
+    Lines of the input deck for one design, and its parts (PartMesh: node/element counts and mass).
+    -fidelity scales the seed sizes and step increments as for buildInput (modelFidelity)
+    """
+    dims = geom.deriveDimensions(designVec)
+    if dims["THICKNESS"]*2 > min(dims["BASE_HEIGHT"], dims["BASE_WIDTH"], dims["TIP_HEIGHT"]):
+        raise ValueError("Thickness is too big")
+    fidelitySettings = modelFidelity.settings(fidelity)
+    seedSizes = fidelitySettings["seedSizes"]
+    material = geom.MATERIAL_PROPERTIES[dims["MATERIAL_TYPE"]]
+
+    arm, spoonPoint = armPart(dims, seedSizes["ARM"], material)
+    axle = axlePart(dims, seedSizes["Connector_beam"], material)
+    payload = payloadPart(dims, seedSizes["Payload"])
+    wire, ropeDistance, (wireArmEnd, wireClevisEnd) = wirePart(dims, seedSizes["WIRE_BOI"], geom.rotateZ(spoonPoint, geom.ARM_ANGLE))
+    parts = [arm, axle, payload, wire]
+
+    lineList = ["*Heading", "** Job name: "+jobName+" Model name: Model-1",
+        "** Direct deck (inpWriter), fidelity "+fidelitySettings["level"]+", design "+", ".join([fmt(x) for x in designVec]),
+        "*Preprint, echo=NO, model=NO, history=NO, contact=NO", "**", "** PARTS", "**"]
+    for part in parts:
+        lineList += part.lines()
+
+    lineList += ["**", "** ASSEMBLY", "**", "*Assembly, name=Assembly"]
+    lineList += instanceLines("ARM-1", "ARM", geom.ARM_ANGLE) + instanceLines("Connector_beam-1", "Connector_beam", geom.ARM_ANGLE)
+    lineList += instanceLines("Payload-1", "Payload", geom.ARM_ANGLE) + instanceLines("WIRE_BOI-1", "WIRE_BOI")
+    for instanceName,part in [("ARM-1", arm), ("Connector_beam-1", axle)]: #post-processing scans ALL_PART for max Mises
+        lineList += ["*Elset, elset=ALL_PART, instance="+instanceName+", generate", "1, "+str(part.numElements())+", 1"]
+    lineList += ["*Nset, nset=WireEnd_Arm, instance=WIRE_BOI-1", str(wireArmEnd),
+        "*Nset, nset=WireEnd_Clevis, instance=WIRE_BOI-1", str(wireClevisEnd),
+        "*Surface, type=NODE, name=WireEnd_Arm_CNS_, internal", "WireEnd_Arm, 1."]
+    for tieName,slave,master in [("Arm__Beam", "ARM-1.ARM_ROOT", "Connector_beam-1.ARM_FACE"),
+            ("Arm__Spoon", "ARM-1.ARM_TIP", "ARM-1.SPOON_BACK_SURF"),
+            ("Upper_Wire_Tie", "WireEnd_Arm_CNS_", "ARM-1.SPOON_BOTTOM_SURF")]:
+        lineList += ["** Constraint: "+tieName, "*Tie, name="+tieName+", adjust=yes", slave+", "+master]
+    lineList += ["*End Assembly",
+        "*Amplitude, name=Amp-1, time=STEP TIME, definition=SMOOTH STEP", "0., 0., 1., 1."]
+
+    lineList += ["**", "** MATERIALS", "**"]
+    lineList += materialLines(*material)
+    lineList += materialLines("MoonRock", dims["PAY_DENSITY"], PAYLOAD_MODULUS, 0.3)
+    lineList += materialLines("WireMatl", geom.WIRE_DENSITY, WIRE_MODULUS, 0.3, expansion=-geom.WIRE_DRAW_DISTANCE/ropeDistance)
+
+    lineList += ["**", "** INTERACTION PROPERTIES", "**",
+        "*Surface Interaction, name=PayloadRoughContactProp", "1.,", "*Friction, rough",
+        "*Surface Behavior, pressure-overclosure=LINEAR", "1e+10,",
+        "**", "** BOUNDARY CONDITIONS", "**",
+        "*Boundary", "Connector_beam-1.WALL_CLAMP, ENCASTRE", "WireEnd_Clevis, ENCASTRE", "WIRE_BOI-1.All_Wire_Edges, 4, 5",
+        "**", "** PREDEFINED FIELDS", "**",
+        "*Initial Conditions, type=TEMPERATURE", "WIRE_BOI-1.All_Wire_Edges, 0.",
+        "**", "** INTERACTIONS", "**", "** Interaction: ROUGH_CONTACT",
+        "*Contact Pair, interaction=PayloadRoughContactProp, small sliding, type=SURFACE TO SURFACE, adjust=Payload-1.BOTTOM_PAYLOAD",
+        "Payload-1.PAY_BOTTOM_SURF, ARM-1.SPOON_TOP_SURF"]
+
+    stepSettings = fidelitySettings["steps"]
+    lineList += stepLines("Loading", stepSettings) + buckleStepLines()
+    lineList += stepLines("Launch", stepSettings) + stepLines("FollowThru", stepSettings)
+
+    return lineList, parts
+
+def writeDeck(designVec, jobNumber, fidelity=None):
+    """
+    Build phase without CAE: writes Job-<jobNumber>.inp in the current directory.
+    Returns the job name and buildData as buildInput does (the analytic mass of the full assembly, walls and
+    crossmember included, so the cost sees the same mass as with buildInput; no restart chain),
+    so it can stand in for buildInput in jobRunner.pipelineDesigns.
+    """
+    JobName = "Job-"+str(jobNumber)
+    lineList, parts = deckLines(designVec, JobName, fidelity)
+    with open(JobName+".inp", "w") as outFile:
+        outFile.write("\n".join(lineList)+"\n")
+
+    return JobName, {"mass":geom.analyticMass(designVec), "preJobName":None}
+
+
+if __name__ == "__main__":
+    #python inpWriter.py: deck size and generation time of the mid-bounds design at every fidelity level
+    from ParticleSwarmOpt_LunaCat import NUM_VARS, fullScaleDesign
+
+    designVec = fullScaleDesign([0.5]*NUM_VARS)
+    print("level,lines,nodes,elements,meshedMass_kg,ms_per_deck")
+    for level in modelFidelity.LEVEL_ORDER:
+        startTime = time.time()
+        for i in range(20):
+            lineList, parts = deckLines(designVec, fidelity=level)
+        msPerDeck = 1000.0*(time.time()-startTime)/20
+        print(",".join([level, str(len(lineList)), str(sum([len(part.nodes) for part in parts])),
+            str(sum([part.numElements() for part in parts])), "%.1f"%sum([part.mass for part in parts]), "%.1f"%msPerDeck]))
+
+    #what Post_P_Script reads from the ODB must be defined in the deck (Abaqus names are case-insensitive)
+    deckText = "\n".join(deckLines(designVec)[0]).lower()
+    for required in ["*instance, name=payload-1,", "*nset, nset=pay_pull_point\n", "*elset, elset=all_part,",
+            "** history output: h-output-release\n", "** history output: h-output-contact\n"]:
+        assert required in deckText, "deck is missing '"+required.strip()+"'"
+
+    #two writes of the same design (separate directories, as two scratch jobs) give the same bytes
+    import os
+    import shutil
+    import tempfile
+    prevDir = os.getcwd()
+    deckBytes = []
+    for i in range(2):
+        deckDir = tempfile.mkdtemp()
+        try:
+            os.chdir(deckDir)
+            with open(writeDeck(designVec, 1)[0]+".inp", "rb") as inFile:
+                deckBytes.append(inFile.read())
+        finally:
+            os.chdir(prevDir)
+            shutil.rmtree(deckDir)
+    assert deckBytes[0] == deckBytes[1], "two writes of the same design differ"
+    print("Deck checks passed")
+
+    if len(sys.argv) > 1:
+        print("Wrote "+writeDeck(designVec, int(sys.argv[1]))[0]+".inp")
@@ -0,0 +1,212 @@
+#Abaqus job runner
+#Submits written input decks to the solver as background processes so CAE can keep working,
+#and pipelines build/solve/harvest phases across a queue of designs
+
+import os
+import time
+import subprocess
+
+from batchEvaluator import FAILED_RESULT
+
+
+ABAQUS_CMD = "abaqus"
+POLL_SECONDS = 5.0
+
+#Default run settings (previously hard-coded on mdb.Job in evalModel)
+NUM_CPUS = 4
+NUM_DOMAINS = 4
+MEMORY_PERCENT = 90
+
+
+#Files a restart job reads from the job it continues
+RESTART_FILE_EXTENSIONS = [".res", ".mdl", ".stt", ".prt", ".odb"]
+#Of those, the ones only a restart needs; deleted once the chain has succeeded (the .odb is still post-processed)
+RESTART_ONLY_EXTENSIONS = [".res", ".mdl", ".stt", ".prt"]
+
+#Outputs of a previous run of the same job name, removed before it is submitted again
+STALE_FILE_EXTENSIONS = [".sta", ".odb"]
+
+
+def submitInput(jobName, numCpus=NUM_CPUS, numDomains=NUM_DOMAINS, memoryPercent=MEMORY_PERCENT, oldJobName=None):
+    #Start the solver on <jobName>.inp and return immediately with the process handle
+    #(oldJobName: the job whose restart files a restart deck continues from)
+
+    #delete lock file, which for some reason tends to hang around, if it exists
+    if os.access('%s.lck'%jobName,os.F_OK):
+        os.remove('%s.lck'%jobName)
+
+    #results of an earlier run of this job name must not pass jobSucceeded/harvestResults if this one fails early
+    for ext in STALE_FILE_EXTENSIONS:
+        if os.path.exists(jobName+ext):
+            os.remove(jobName+ext)
+
+    #ask_delete=OFF and no stdin: old job files are overwritten instead of prompting
+    cmd = [ABAQUS_CMD, "job="+jobName, "input="+jobName+".inp", "cpus="+str(numCpus), "domains="+str(numDomains),
+        "memory="+str(memoryPercent)+"%", "ask_delete=OFF", "interactive"]
+    if oldJobName:
+        cmd.insert(3, "oldjob="+oldJobName)
+    logFile = open(jobName+"_solver.log", "w")
+    nullInput = open(os.devnull, "r")
+    process = subprocess.Popen(cmd, stdin=nullInput, stdout=logFile, stderr=subprocess.STDOUT, shell=(os.name == "nt"))
+    logFile.close()
+    nullInput.close()
+
+    return process
+
+def jobSucceeded(jobName):
+    #The status file is the only reliable record of how the analysis ended
+    staName = jobName+".sta"
+    if not os.path.exists(staName):
+        return False
+    with open(staName, "r") as staFile:
+        return "COMPLETED SUCCESSFULLY" in staFile.read()
+
+def hasRestartData(jobName):
+    #A finished job can be continued only if it completed and its restart files are still on disk
+    if not jobSucceeded(jobName):
+        return False
+    for ext in RESTART_FILE_EXTENSIONS:
+        if not os.path.exists(jobName+ext):
+            return False
+    return True
+
+class RestartChain(object):
+    """
+    Pre job (Loading, writing restart data) followed by the restart job that continues it
+    (BuckleCheck/Launch/FollowThru). Polled like a subprocess handle, so waitForJob and
+    pipelineDesigns drive it the same way as a single job.
+    -if the pre job already finished with its restart files in place (a repeated design) it is not run again
+    -a failed restart job is resubmitted once from the same restart data, without redoing the preload
+    -once the restart job succeeds, the pre job's restart-only files are deleted
+    """
+
+    def __init__(self, preJobName, jobName, **submitArgs):
+        self.preJobName = preJobName
+        self.jobName = jobName
+        self.submitArgs = submitArgs
+        self.returncode = None
+        self.process = None
+        self.preProcess = None
+        self.numRestarts = 0
+
+        if hasRestartData(preJobName):
+            print("Reusing restart data of "+preJobName)
+            self.startRestart()
+        else:
+            self.preProcess = submitInput(preJobName, **submitArgs)
+
+    def startRestart(self):
+        self.numRestarts += 1
+        self.process = submitInput(self.jobName, oldJobName=self.preJobName, **self.submitArgs)
+
+    def removeRestartData(self):
+        for ext in RESTART_ONLY_EXTENSIONS:
+            if os.path.exists(self.preJobName+ext):
+                os.remove(self.preJobName+ext)
+
+    def poll(self):
+        if self.returncode is not None:
+            return self.returncode
+
+        if self.process is None:
+            if self.preProcess.poll() is None:
+                return None
+            if not hasRestartData(self.preJobName):
+                #preload failed: the chain ends here and the restart job never starts
+                self.returncode = self.preProcess.returncode or 1
+                return self.returncode
+            self.startRestart()
+
+        if self.process.poll() is None:
+            return None
+        if jobSucceeded(self.jobName):
+            self.removeRestartData()
+        elif self.numRestarts < 2 and hasRestartData(self.preJobName):
+            print(self.jobName+" failed; restarting it once more from "+self.preJobName)
+            self.startRestart()
+            return None
+
+        self.returncode = self.process.returncode
+        return self.returncode
+
+    def wait(self):
+        while self.poll() is None:
+            time.sleep(POLL_SECONDS)
+        return self.returncode
+
+def submitJob(jobName, buildData=None, **submitArgs):
+    #Single job, or a restart chain when the build phase split the analysis (buildData["preJobName"])
+    #submitArgs (numCpus, numDomains, memoryPercent) go to every solver run
+    preJobName = buildData.get("preJobName") if isinstance(buildData, dict) else None
+    if preJobName:
+        return RestartChain(preJobName, jobName, **submitArgs)
+    return submitInput(jobName, **submitArgs)
+
+def waitForJob(process, jobName):
+    #Block until the solver exits; raise if the analysis did not complete
+    process.wait()
+    if not jobSucceeded(jobName):
+        raise RuntimeError(jobName+" did not complete successfully (solver exit code "+str(process.returncode)+")")
+
+def pipelineDesigns(designList, buildFunc, harvestFunc, jobNumbers=None, maxRunning=2, pollSeconds=POLL_SECONDS, callback=None, scheduler=None):
+    """
+    Overlap model generation with solving across a queue of designs.
+    -buildFunc(designVec, jobNumber) writes the input deck and returns (jobName, buildData)
+    -harvestFunc(jobName, buildData) post-processes a finished job into the output tuple
+    -at most maxRunning solver jobs are in flight; while they run the next design is built
+    -scheduler (a jobScheduler.JobScheduler) replaces maxRunning and the fixed NUM_CPUS: each job is sized
+     from the scheduler's plan for the jobs still to run, only starts when its cores are free, and is timed
+     back into the scheduler's model
+    -callback(index, results, isGood) is called as each design finishes (completion order)
+    Returns [(results, isGood), ...] in designList order.
+    """
+    if jobNumbers is None:
+        jobNumbers = range(1, len(designList)+1)
+
+    outputList = [None]*len(designList)
+    queue = list(zip(range(len(designList)), designList, jobNumbers))
+    running = [] #(index, jobName, buildData, process, numCpus, numRunning, startTime)
+    numCpus = NUM_CPUS
+
+    def finish(index, results, isGood):
+        outputList[index] = (results, isGood)
+        if callback is not None:
+            callback(index, results, isGood)
+
+    while queue or running:
+        #retire any finished jobs first so their slots free up
+        for runEntry in running[:]:
+            index, jobName, buildData, process, jobCpus, numRunning, startTime = runEntry
+            if process.poll() is None:
+                continue
+            running.remove(runEntry)
+            if scheduler is not None:
+                scheduler.recordRun(jobName, jobCpus, numRunning, time.time()-startTime, jobSucceeded(jobName))
+            try:
+                if not jobSucceeded(jobName):
+                    raise RuntimeError(jobName+" did not complete successfully")
+                finish(index, tuple(harvestFunc(jobName, buildData)), True)
+            except Exception as e:
+                print("EXCEPTION: "+str(e))
+                finish(index, FAILED_RESULT, False)
+
+        submitArgs = {}
+        if scheduler is not None:
+            numCpus, maxRunning = scheduler.plan(len(queue)+len(running))
+            submitArgs = {"numCpus":numCpus, "numDomains":numCpus, "memoryPercent":scheduler.memoryPercent(maxRunning)}
+        coresFree = scheduler is None or sum([runEntry[4] for runEntry in running])+numCpus <= scheduler.numCores
+
+        if queue and len(running) < maxRunning and coresFree:
+            #build the next design while the others solve
+            index, designVec, jobNumber = queue.pop(0)
+            try:
+                jobName, buildData = buildFunc(designVec, jobNumber)
+                process = submitJob(jobName, buildData, **submitArgs)
+                running.append((index, jobName, buildData, process, numCpus, len(running)+1, time.time()))
+            except Exception as e:
+                print("EXCEPTION: "+str(e))
+                finish(index, FAILED_RESULT, False)
+        elif running:
+            time.sleep(pollSeconds)
+
+    return outputList
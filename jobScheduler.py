@@ -0,0 +1,157 @@
+#Node-aware CPU/job scheduler for the Abaqus job runner
+#Decides, for the jobs still queued, how many CPUs each solver job gets and how many run side by side,
+#from the node's core/memory budget and a jobs/hour model fitted to past run timings
+
+import os
+import csv
+import math
+import multiprocessing
+import numpy as np
+
+
+TIMINGS_FILE_NAME = "JOB_TIMINGS.csv"
+TIMING_FIELDS = ["jobName", "numCpus", "numRunning", "nodeLoad", "wallSeconds", "succeeded"]
+
+CPU_CHOICES = [1, 2, 4, 8, 16, 32, 64] #candidate CPUs per job (domains follow the CPUs)
+MEMORY_PER_JOB_GB = 8.0 #solver memory one LunaCat job needs; bounds the number of simultaneous jobs
+MEMORY_RESERVE_GB = 4.0 #left to the OS and the CAE kernel
+DEFAULT_MEMORY_GB = 32.0 #used when the node's memory cannot be read
+
+#Prior model until enough runs are timed: a 4-CPU job takes about PRIOR_WALL_SECONDS and
+#PRIOR_SERIAL_FRACTION of it does not parallelize (Amdahl)
+PRIOR_WALL_SECONDS = 1800.0
+PRIOR_SERIAL_FRACTION = 0.3
+MIN_TIMINGS = 4 #successful runs needed before the fitted model replaces the prior
+
+
+def nodeCores():
+    return multiprocessing.cpu_count()
+
+def nodeMemoryGB():
+    try:
+        return os.sysconf("SC_PAGE_SIZE")*os.sysconf("SC_PHYS_PAGES")/1024.0**3
+    except (AttributeError, ValueError, OSError): #Windows has no sysconf
+        return DEFAULT_MEMORY_GB
+
+
+class ThroughputModel(object):
+    """
+    Wall time of one job as a function of its CPUs and how busy the node is:
+        wallSeconds = a + b/numCpus + c*nodeLoad
+    (a: serial part, b: parallel part, c: slowdown from sharing memory bandwidth; nodeLoad = busy cores/node cores).
+    Fitted by least squares to the timings file; the Amdahl prior is used until MIN_TIMINGS runs exist.
+    """
+
+    def __init__(self, coeffs=None):
+        if coeffs is None:
+            serial = PRIOR_SERIAL_FRACTION*PRIOR_WALL_SECONDS
+            coeffs = [serial, 4.0*(PRIOR_WALL_SECONDS-serial), 0.0]
+        self.coeffs = np.array(coeffs, dtype=float)
+        self.numTimings = 0
+
+    def fit(self, timings):
+        #timings: dicts with numCpus, nodeLoad, wallSeconds (failed runs are left out)
+        rows = [t for t in timings if t["succeeded"]]
+        if len(rows) < MIN_TIMINGS or len(set([t["numCpus"] for t in rows])) < 2:
+            return self #one CPU count says nothing about scaling; keep the prior
+
+        features = np.array([[1.0, 1.0/t["numCpus"], t["nodeLoad"]] for t in rows])
+        wallSeconds = np.array([t["wallSeconds"] for t in rows])
+        coeffs = np.linalg.lstsq(features, wallSeconds, rcond=-1)[0]
+        self.coeffs = np.maximum(coeffs, 0.0) #negative terms are noise, not speed-ups
+        self.numTimings = len(rows)
+        return self
+
+    def wallSeconds(self, numCpus, nodeLoad):
+        return self.coeffs[0] + self.coeffs[1]/numCpus + self.coeffs[2]*nodeLoad
+
+    def jobsPerHour(self, numCpus, numRunning, numCores):
+        nodeLoad = min(1.0, float(numCpus*numRunning)/numCores)
+        return numRunning*3600.0/self.wallSeconds(numCpus, nodeLoad)
+
+
+def loadTimings(fileName=TIMINGS_FILE_NAME):
+    timings = []
+    if not os.path.exists(fileName):
+        return timings
+
+    with open(fileName, "r") as inFile:
+        for row in csv.DictReader(inFile):
+            try:
+                timings.append({"jobName":row["jobName"], "numCpus":int(row["numCpus"]), "numRunning":int(row["numRunning"]),
+                    "nodeLoad":float(row["nodeLoad"]), "wallSeconds":float(row["wallSeconds"]), "succeeded":row["succeeded"] == "1"})
+            except (KeyError, ValueError): #a line torn by a crash
+                continue
+
+    return timings
+
+def appendTiming(timing, fileName=TIMINGS_FILE_NAME):
+    isNew = not os.path.exists(fileName)
+    with open(fileName, "a") as outFile:
+        if isNew:
+            outFile.write(",".join(TIMING_FIELDS)+"\n")
+        outFile.write(",".join([str(timing["jobName"]), str(timing["numCpus"]), str(timing["numRunning"]),
+            "%.4f"%timing["nodeLoad"], "%.1f"%timing["wallSeconds"], "1" if timing["succeeded"] else "0"])+"\n")
+
+
+class JobScheduler(object):
+    """
+    Picks (numCpus, maxRunning) for the jobs left in a queue.
+    -each plan is the CPU count from CPU_CHOICES that finishes the queue soonest
+     (ceil(numQueued/maxRunning) waves of model.wallSeconds), with maxRunning bounded by cores, memory and the queue
+    -a lone job on a big node gets many CPUs; a long queue gets many narrow jobs
+    -every finished job is timed into timingsFile and refits the model
+    """
+
+    def __init__(self, numCores=None, memoryGB=None, memoryPerJobGB=MEMORY_PER_JOB_GB, timingsFile=TIMINGS_FILE_NAME):
+        self.numCores = nodeCores() if numCores is None else numCores
+        self.memoryGB = nodeMemoryGB() if memoryGB is None else memoryGB
+        self.memoryPerJobGB = memoryPerJobGB
+        self.timingsFile = timingsFile
+        self.timings = loadTimings(timingsFile)
+        self.model = ThroughputModel().fit(self.timings)
+
+    def maxJobsByMemory(self):
+        return max(1, int((self.memoryGB-MEMORY_RESERVE_GB)//self.memoryPerJobGB))
+
+    def plan(self, numQueued):
+        #(numCpus, maxRunning) for the remaining queue
+        numQueued = max(numQueued, 1)
+        bestPlan, bestMakespan = None, None
+        for numCpus in CPU_CHOICES:
+            if numCpus > self.numCores:
+                break
+            maxRunning = min(self.numCores//numCpus, self.maxJobsByMemory(), numQueued)
+            nodeLoad = float(numCpus*maxRunning)/self.numCores
+            makespan = math.ceil(float(numQueued)/maxRunning)*self.model.wallSeconds(numCpus, nodeLoad)
+            if bestMakespan is None or makespan < bestMakespan:
+                bestPlan, bestMakespan = (numCpus, maxRunning), makespan
+
+        return bestPlan
+
+    def memoryPercent(self, maxRunning):
+        #solver memory share of one job, as the percentage Abaqus expects
+        return max(1, int(100.0*(self.memoryGB-MEMORY_RESERVE_GB)/self.memoryGB/maxRunning))
+
+    def recordRun(self, jobName, numCpus, numRunning, wallSeconds, succeeded):
+        timing = {"jobName":jobName, "numCpus":numCpus, "numRunning":numRunning,
+            "nodeLoad":min(1.0, float(numCpus*numRunning)/self.numCores), "wallSeconds":wallSeconds, "succeeded":succeeded}
+        appendTiming(timing, self.timingsFile)
+        self.timings.append(timing)
+        self.model.fit(self.timings)
+
+    def summary(self):
+        numCpus, maxRunning = self.plan(self.numCores)
+        return ("Node: "+str(self.numCores)+" cores, "+("%.0f"%self.memoryGB)+" GB; model from "+str(self.model.numTimings)
+            +" timed runs; full-queue plan "+str(maxRunning)+" x "+str(numCpus)+" CPUs ("
+            +("%.1f"%self.model.jobsPerHour(numCpus, maxRunning, self.numCores))+" jobs/hour)")
+
+
+if __name__ == "__main__":
+    #python jobScheduler.py: the plan this node would use for 1..N queued jobs under the current timings
+    scheduler = JobScheduler()
+    print(scheduler.summary())
+    print("numQueued,numCpus,maxRunning,jobsPerHour")
+    for numQueued in [1, 2, 4, 8, 16, 64]:
+        numCpus, maxRunning = scheduler.plan(numQueued)
+        print(",".join([str(numQueued), str(numCpus), str(maxRunning), "%.2f"%scheduler.model.jobsPerHour(numCpus, maxRunning, scheduler.numCores)]))
@@ -0,0 +1,288 @@
+"""
+Minimal stand-in for the Abaqus odb object model, built from numpy arrays.
+
+Only the pieces the odbTools reductions touch are modelled:
+odb.steps[name].frames[i].fieldOutputs[key].getSubset(region=...).bulkDataBlocks / .values
+Run this file to check odbTools.maxMisesScan against the original per-value loop
+on large synthetic stress fields, and odbTools.extractResults against the original
+three separate passes of Post_P_Script.getResults, and time them; also compares
+frame-scan and history-interpolated release detection against a known release instant.
+"""
+
+import re
+import math
+import time
+import numpy as np
+
+import odbTools
+
+
+class MockValue(object):
+    def __init__(self, mises, elementLabel, data):
+        self.mises = mises
+        self.elementLabel = elementLabel
+        self.data = data
+
+class MockBulkDataBlock(object):
+    #labels stand in for elementLabels or nodeLabels; mises is None for non-stress fields
+    def __init__(self, mises, elementLabels, data):
+        self.mises = mises
+        self.elementLabels = elementLabels
+        self.nodeLabels = elementLabels
+        self.data = data
+
+class MockFieldOutput(object):
+    """
+    One field in one frame: a list of bulk blocks (one per instance, as in a real odb).
+    .values builds the per-value objects lazily, which is where the real odb spends its time too.
+    """
+
+    numSubsetCalls = 0 #across all fields, to show how often an extraction re-subsets
+
+    def __init__(self, blocks):
+        self.bulkDataBlocks = blocks
+
+    def getSubset(self, region=None):
+        #region is an element/node label array; None (or a name) keeps everything
+        MockFieldOutput.numSubsetCalls += 1
+        if region is None or not hasattr(region, "__len__") or isinstance(region, str):
+            return self
+        subsetBlocks = []
+        for block in self.bulkDataBlocks:
+            mask = np.isin(block.elementLabels, region)
+            blockMises = block.mises[mask] if block.mises is not None else None
+            subsetBlocks.append(MockBulkDataBlock(blockMises, block.elementLabels[mask], block.data[mask]))
+        return MockFieldOutput(subsetBlocks)
+
+    @property
+    def values(self):
+        valueList = []
+        for block in self.bulkDataBlocks:
+            misesList = block.mises.tolist() if block.mises is not None else [0.0]*len(block.elementLabels)
+            for mises, elementLabel, data in zip(misesList, block.elementLabels.tolist(), block.data):
+                valueList.append(MockValue(mises, elementLabel, data))
+        return valueList
+
+class MockFrame(object):
+    def __init__(self, incrementNumber, fieldOutputs, frameValue=0.0, description="", mode=None):
+        self.incrementNumber = incrementNumber
+        self.fieldOutputs = fieldOutputs
+        self.frameValue = frameValue
+        self.description = description
+        self.mode = mode
+
+class MockHistoryOutput(object):
+    def __init__(self, data):
+        self.data = data
+
+class MockHistoryRegion(object):
+    def __init__(self, historyOutputs):
+        self.historyOutputs = historyOutputs
+
+class MockStep(object):
+    def __init__(self, name, frames, historyRegions=None):
+        self.name = name
+        self.frames = frames
+        self.historyRegions = historyRegions or {}
+
+class MockOdb(object):
+    def __init__(self, steps):
+        self.steps = dict([(step.name, step) for step in steps])
+        self.name = "mock.odb"
+
+    def close(self):
+        pass
+
+
+def makeStressOdb(stepSizes, numElements, numBlocks=2, seed=0):
+    """
+    Synthetic odb with a float32 S field (6 components + mises) on numElements elements
+    split over numBlocks instances, for the given {stepName: numFrames}.
+    """
+    rng = np.random.RandomState(seed)
+    blockLabels = np.array_split(np.arange(1, numElements+1, dtype=np.int32), numBlocks)
+    steps = []
+    for stepName in sorted(stepSizes):
+        frames = []
+        for frameIndex in range(stepSizes[stepName]):
+            frames.append(MockFrame(frameIndex, {'S':MockFieldOutput(makeStressBlocks(rng, blockLabels))}))
+        steps.append(MockStep(stepName, frames))
+
+    return MockOdb(steps)
+
+def makeStressBlocks(rng, blockLabels):
+    blocks = []
+    for labels in blockLabels:
+        data = rng.standard_normal((len(labels), 6)).astype(np.float32)*1e8
+        mises = np.abs(rng.standard_normal(len(labels))).astype(np.float32)*1e8
+        blocks.append(MockBulkDataBlock(mises, labels, data))
+    return blocks
+
+def makeLaunchOdb(numElements, numFrames=40, releaseFrame=25, payNode=7, eigenVal1=1234.5, seed=0):
+    """
+    Synthetic LunaCat odb: Loading, BuckleCheck, Launch and FollowThru steps with S everywhere,
+    CPRESS and V on the payload nodes in FollowThru, and contact lost from releaseFrame on.
+    Returns (odb, payPoint, elemset) with payPoint/elemset as label arrays usable as regions.
+    """
+    rng = np.random.RandomState(seed)
+    blockLabels = np.array_split(np.arange(1, numElements+1, dtype=np.int32), 2)
+    nodeLabels = np.arange(1, 21, dtype=np.int32)
+
+    steps = [MockStep('Loading', [MockFrame(i, {'S':MockFieldOutput(makeStressBlocks(rng, blockLabels))}, i*0.5) for i in range(3)]),
+        MockStep('BuckleCheck', [MockFrame(0, {}, 0.0, "Base state", 0),
+            MockFrame(1, {}, 1.0, "Mode         1: EigenValue =   "+str(eigenVal1), 1)]),
+        MockStep('Launch', [MockFrame(i, {'S':MockFieldOutput(makeStressBlocks(rng, blockLabels))}, i*0.005) for i in range(numFrames)])]
+
+    followFrames = []
+    for i in range(numFrames):
+        cpress = np.full((len(nodeLabels), 1), 0.0 if i >= releaseFrame else 5e4, dtype=np.float32)
+        velo = np.zeros((len(nodeLabels), 3), dtype=np.float32)
+        velo[:,0] = -10.0 - i
+        velo[:,1] = 12.0 + 0.5*i
+        fields = {'S':MockFieldOutput(makeStressBlocks(rng, blockLabels)),
+            'CPRESS':MockFieldOutput([MockBulkDataBlock(None, nodeLabels, cpress)]),
+            'V':MockFieldOutput([MockBulkDataBlock(None, nodeLabels, velo)])}
+        followFrames.append(MockFrame(i, fields, i*0.025))
+    steps.append(MockStep('FollowThru', followFrames))
+
+    return MockOdb(steps), np.array([payNode], dtype=np.int32), np.arange(1, numElements+1, 2, dtype=np.int32)
+
+def multiPassExtract(odb, payPoint, elemset):
+    #The original Post_P_Script.getResults passes: FollowThru for CPRESS/V, BuckleCheck regex, full S loop
+    veloMagMax = 0
+    veloAngle = 0
+    for frame in odb.steps['FollowThru'].frames:
+        framecontact = frame.fieldOutputs['CPRESS'].getSubset(region=payPoint).values[0].data
+        if framecontact < 0.0001:
+            frameVelo = frame.fieldOutputs['V'].getSubset(region=payPoint).values[0].data
+            veloMagMax = math.sqrt(frameVelo[0]**2 + frameVelo[1]**2)
+            veloAngle = math.atan2(-frameVelo[0],frameVelo[1])*180/math.pi
+            break
+
+    eigenVal1 = float(re.compile(r'\s*=\s*').split(odb.steps['BuckleCheck'].frames[-1].description)[1])
+    misesResult = odbTools.maxMisesScanLoop(odb, elemset)
+
+    return {"release":(veloMagMax, veloAngle), "eigenVal1":eigenVal1, "maxMises":misesResult}
+
+def benchmarkExtraction(elementCounts=(10000, 100000)):
+    print("numElements,multiPassSeconds,multiPassSubsets,singlePassSeconds,singlePassSubsets,speedup")
+    for numElements in elementCounts:
+        odb, payPoint, elemset = makeLaunchOdb(numElements)
+
+        MockFieldOutput.numSubsetCalls = 0
+        startTime = time.time()
+        multiResult = multiPassExtract(odb, payPoint, elemset)
+        multiTime = time.time() - startTime
+        multiSubsets = MockFieldOutput.numSubsetCalls
+
+        MockFieldOutput.numSubsetCalls = 0
+        startTime = time.time()
+        singleResult = odbTools.extractResults(odb, [odbTools.ReleaseVelocityHandler(payPoint), odbTools.EigenvalueHandler(),
+            odbTools.MaxMisesHandler(elemset)])
+        singleTime = time.time() - startTime
+        singleSubsets = MockFieldOutput.numSubsetCalls
+
+        for name in multiResult:
+            if not np.allclose(np.array(multiResult[name][:2] if name == "maxMises" else multiResult[name], dtype=float),
+                    np.array(singleResult[name][:2] if name == "maxMises" else singleResult[name], dtype=float), rtol=1e-6):
+                raise AssertionError(name+": single pass "+str(singleResult[name])+" != multi pass "+str(multiResult[name]))
+
+        print(",".join([str(numElements), "%.3f"%multiTime, str(multiSubsets), "%.3f"%singleTime, str(singleSubsets),
+            "%.1f"%(multiTime/max(singleTime, 1e-9))]))
+
+def makeReleaseOdb(releaseTime, fieldInterval, historyInterval, stepTime=0.15, payNode=7, profile="smoothstep", noiseLevel=0.0, seed=0):
+    """
+    FollowThru-only odb with a payload whose velocity varies nonlinearly in time and whose contact
+    unloads to zero at releaseTime; field frames every fieldInterval, history samples every historyInterval.
+    -profile: contact force shape, "smoothstep" (4000*(1-3u^2+2u^3), u = t/releaseTime, zero slope at release),
+     "quadratic" (4000*(1-u)^2) or "linear" (4000*(1-u), which the history trend extension reproduces exactly)
+    -noiseLevel: relative Gaussian noise on the in-contact force and on the velocity history samples
+    """
+    rng = np.random.RandomState(seed)
+
+    def velocity(t):
+        return -20.0 - 150.0*t - 900.0*t**2, 25.0 - 90.0*t + 300.0*t**2
+
+    def contactForce(t):
+        u = min(max(t/releaseTime, 0.0), 1.0)
+        if profile == "smoothstep":
+            return 4000.0*(1.0 - 3.0*u**2 + 2.0*u**3)
+        elif profile == "quadratic":
+            return 4000.0*(1.0-u)**2
+        return 4000.0*(1.0-u)
+
+    def noisy(val):
+        return val*(1.0 + noiseLevel*rng.standard_normal())
+
+    nodeLabels = np.arange(1, 11, dtype=np.int32)
+    frames = []
+    for i,t in enumerate(np.arange(0.0, stepTime+1e-12, fieldInterval)):
+        cpress = np.full((len(nodeLabels), 1), contactForce(t)*10.0, dtype=np.float32)
+        velo = np.zeros((len(nodeLabels), 3), dtype=np.float32)
+        velo[:,0], velo[:,1] = velocity(t)
+        frames.append(MockFrame(i, {'CPRESS':MockFieldOutput([MockBulkDataBlock(None, nodeLabels, cpress)]),
+            'V':MockFieldOutput([MockBulkDataBlock(None, nodeLabels, velo)])}, float(t)))
+
+    historyRegions = {}
+    if historyInterval is not None:
+        times = np.arange(0.0, stepTime+1e-12, historyInterval)
+        historyRegions['Node PAYLOAD-1.'+str(payNode)] = MockHistoryRegion({
+            'V1':MockHistoryOutput(tuple([(t, noisy(velocity(t)[0])) for t in times])),
+            'V2':MockHistoryOutput(tuple([(t, noisy(velocity(t)[1])) for t in times]))})
+        historyRegions['Assembly ASSEMBLY'] = MockHistoryRegion({
+            'CFNM     ASSEMBLY_PAYLOAD-1_PAY_BOTTOM_SURF/ASSEMBLY_ARM-1_SPOON_TOP_SURF':
+                MockHistoryOutput(tuple([(t, noisy(contactForce(t))) for t in times]))})
+
+    trueVelo = velocity(releaseTime)
+    return MockOdb([MockStep('FollowThru', frames, historyRegions)]), np.array([payNode], dtype=np.int32), math.sqrt(trueVelo[0]**2 + trueVelo[1]**2)
+
+def benchmarkRelease(releaseTime=0.0613, historyInterval=0.0005):
+    #veloMagMax error of each method against the exact value at releaseTime, for nonlinear unloading
+    #with and without noise on the history samples
+    print("profile,noiseLevel,fieldInterval,numFieldFrames,frameScanVeloError,historyVeloError,historyReleaseTimeError")
+    for profile in ["smoothstep", "quadratic"]:
+        for noiseLevel in [0.0, 0.01]:
+            for fieldInterval in [0.005, 0.025, 0.05]:
+                frameOdb, payPoint, trueVeloMag = makeReleaseOdb(releaseTime, fieldInterval, None, profile=profile)
+                frameVeloMag = odbTools.extractResults(frameOdb, [odbTools.ReleaseVelocityHandler(payPoint)])["release"][0]
+
+                historyHandler = odbTools.ReleaseVelocityHandler(payPoint)
+                historyOdb = makeReleaseOdb(releaseTime, fieldInterval, historyInterval, profile=profile, noiseLevel=noiseLevel)[0]
+                historyVeloMag = odbTools.extractResults(historyOdb, [historyHandler])["release"][0]
+                if historyHandler.method != "history":
+                    raise AssertionError("history output was not used")
+
+                print(",".join([profile, str(noiseLevel), str(fieldInterval), str(len(frameOdb.steps['FollowThru'].frames)),
+                    "%.4f"%abs(frameVeloMag-trueVeloMag), "%.2e"%abs(historyVeloMag-trueVeloMag),
+                    "%.2e"%abs(historyHandler.releaseTime-releaseTime)]))
+
+def benchmarkMisesScan(elementCounts=(10000, 100000, 400000), numFrames=5):
+    #Same answer from both scans, and how long each takes
+    print("numElements,loopSeconds,bulkSeconds,speedup,subsetBulkSeconds")
+    for numElements in elementCounts:
+        odb = makeStressOdb({'Launch':numFrames, 'FollowThru':numFrames}, numElements)
+        elemset = np.arange(1, numElements+1, 2, dtype=np.int32) #every other element, as a region
+
+        startTime = time.time()
+        loopResult = odbTools.maxMisesScanLoop(odb, elemset)
+        loopTime = time.time() - startTime
+
+        startTime = time.time()
+        bulkResult = odbTools.maxMisesScan(odb, elemset)
+        bulkTime = time.time() - startTime
+
+        if loopResult[1:] != bulkResult[1:] or abs(loopResult[0]-bulkResult[0]) > 1e-6*abs(loopResult[0]):
+            raise AssertionError("bulk scan "+str(bulkResult)+" != loop scan "+str(loopResult))
+
+        #last frame of each step only
+        startTime = time.time()
+        odbTools.maxMisesScan(odb, elemset, frameSubset={'Launch':[-1], 'FollowThru':[-1]})
+        subsetTime = time.time() - startTime
+
+        print(",".join([str(numElements), "%.3f"%loopTime, "%.3f"%bulkTime, "%.1f"%(loopTime/max(bulkTime, 1e-9)), "%.3f"%subsetTime]))
+
+
+if __name__ == "__main__":
+    benchmarkMisesScan()
+    benchmarkExtraction()
+    benchmarkRelease()
@@ -0,0 +1,143 @@
+#Mesh-density / time-increment fidelity levels for evalModel
+#Every seed size, step increment setting and field output interval is scaled from the
+#"medium" baseline (the values evalModel has always used), so a coarse mesh can screen
+#designs cheaply and a fine mesh can check how converged the baseline is
+
+import os
+import sys
+import math
+import time
+
+import resultCache
+
+
+#meshScale multiplies every seedPart size, incScale the initial increment (maxNumInc shrinks by the same factor)
+#and outputScale the field output interval
+FIDELITY_LEVELS = {
+    "coarse":{"meshScale":2.0, "incScale":1.5, "outputScale":2.0},
+    "medium":{"meshScale":1.0, "incScale":1.0, "outputScale":1.0},
+    "fine":{"meshScale":0.5, "incScale":0.5, "outputScale":0.5},
+}
+LEVEL_ORDER = ["coarse", "medium", "fine"]
+DEFAULT_FIDELITY = "medium"
+
+#Baseline settings, by part and by step
+SEED_SIZES = {"ARM":0.1, "CROSSMEMBER":0.05, "Connector_beam":0.05, "Payload":0.05,
+    "Side_wall_1":0.1, "Side_wall_2":0.1, "WIRE_BOI":1.0} #m
+STEP_SETTINGS = {
+    "Loading":{"timePeriod":1.0, "initialInc":0.1, "maxNumInc":500, "timeInterval":0.1},
+    "Launch":{"timePeriod":0.01, "initialInc":0.01, "maxNumInc":500, "timeInterval":0.005},
+    "FollowThru":{"timePeriod":0.15, "initialInc":0.015, "maxNumInc":300, "timeInterval":0.025},
+}
+
+
+def settings(level=None):
+    """
+    Concrete model settings for a fidelity level (None = DEFAULT_FIDELITY).
+    -seedSizes: part name -> seedPart size
+    -steps: step name -> initialInc, maxNumInc, timeInterval (increments and intervals never exceed the step)
+    """
+    level = DEFAULT_FIDELITY if level is None else level
+    if level not in FIDELITY_LEVELS:
+        raise ValueError("Unknown fidelity level "+str(level)+"; expected one of "+", ".join(LEVEL_ORDER))
+    preset = FIDELITY_LEVELS[level]
+
+    seedSizes = dict([(partName, size*preset["meshScale"]) for partName,size in SEED_SIZES.items()])
+    steps = {}
+    for stepName,base in STEP_SETTINGS.items():
+        steps[stepName] = {"initialInc":min(base["initialInc"]*preset["incScale"], base["timePeriod"]),
+            "maxNumInc":int(math.ceil(base["maxNumInc"]/preset["incScale"])),
+            "timeInterval":min(base["timeInterval"]*preset["outputScale"], base["timePeriod"])}
+
+    return {"level":level, "seedSizes":seedSizes, "steps":steps}
+
+def modelVersion(level=None, baseVersion=resultCache.MODEL_VERSION):
+    #Results at different fidelities must never share a cache entry; the default level keeps the plain tag
+    #so existing caches stay valid
+    level = DEFAULT_FIDELITY if level is None else level
+    if level == DEFAULT_FIDELITY:
+        return baseVersion
+    return baseVersion+"-"+level
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Multi-fidelity screening
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def screenAndPromote(designList, costFunc, evaluateBatch, numPromote, screenLevel="coarse", fineLevel=DEFAULT_FIDELITY):
+    """
+    Two-level evaluation of a batch of designs.
+    -evaluateBatch(indices, level) runs designList[i] for i in indices and returns [(results, isGood), ...]
+    -costFunc(designVec, results) scores a successful result
+    Every design is screened at screenLevel and the numPromote lowest screening costs are re-run at fineLevel.
+    Designs that were not promoted keep their screening results, with the cost rescaled by the median
+    fine/screen cost ratio of the promoted designs, so they stay comparable with fine-mesh costs.
+    Returns [(results, isGood, costVal, promoted), ...] in designList order.
+    """
+    allIndices = list(range(len(designList)))
+    screenCosts = []
+    outputList = []
+    for index,(results,isGood) in zip(allIndices, evaluateBatch(allIndices, screenLevel)):
+        costVal = costFunc(designList[index], results) if isGood else 1e20
+        screenCosts.append(costVal)
+        outputList.append((results, isGood, costVal, False))
+
+    promotedIndices = sorted(allIndices, key=lambda index: screenCosts[index])[:numPromote]
+    costRatios = []
+    for index,(results,isGood) in zip(promotedIndices, evaluateBatch(promotedIndices, fineLevel)):
+        costVal = costFunc(designList[index], results) if isGood else 1e20
+        outputList[index] = (results, isGood, costVal, True)
+        if isGood and 0.0 < screenCosts[index] < 1e15 and costVal < 1e15: #penalized costs say nothing about the mesh
+            costRatios.append(costVal/screenCosts[index])
+
+    costRatio = sorted(costRatios)[len(costRatios)//2] if costRatios else 1.0
+    for index in allIndices:
+        results, isGood, costVal, promoted = outputList[index]
+        if not promoted and isGood and costVal < 1e15:
+            outputList[index] = (results, isGood, costVal*costRatio, False)
+
+    return outputList
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Convergence study: runtime against error for each level
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def convergenceStudy(designVec, evaluator, levels=LEVEL_ORDER, scratchRoot="Convergence"):
+    """
+    Run one design at every fidelity level (each in scratchRoot/<level>/Job-1) and compare the
+    outputs with the finest level.
+    Returns [(level, runtime, isGood, results, relErrors), ...] in levels order; relErrors is None
+    for a failed run or when the reference failed.
+    """
+    import batchEvaluator
+
+    runList = []
+    for level in levels:
+        startTime = time.time()
+        (results, isGood), = batchEvaluator.runBatch([designVec], evaluator=batchEvaluator.FidelityEvaluator(evaluator, level),
+            numWorkers=1, scratchRoot=os.path.join(scratchRoot, level), jobNumbers=[1])
+        runList.append((level, time.time()-startTime, isGood, results))
+
+    refLevel, refTime, refGood, refResults = runList[-1]
+    studyList = []
+    for level, runtime, isGood, results in runList:
+        relErrors = None
+        if isGood and refGood:
+            relErrors = [abs(val-refVal)/max(abs(refVal), 1e-12) for val,refVal in zip(results, refResults)]
+        studyList.append((level, runtime, isGood, results, relErrors))
+
+    return studyList
+
+def printStudy(studyList):
+    print("level,runtime_s,"+",".join([name+"_relErr" for name in resultCache.OUTPUT_NAMES]))
+    for level, runtime, isGood, results, relErrors in studyList:
+        errorStrings = ["%.3e"%err for err in relErrors] if relErrors is not None else ["failed"]*len(resultCache.OUTPUT_NAMES)
+        print(",".join([level, "%.1f"%runtime] + errorStrings))
+
+
+if __name__ == "__main__":
+    #python modelFidelity.py [--stand-in]: convergence study of the mid-bounds design
+    import batchEvaluator
+    from ParticleSwarmOpt_LunaCat import NUM_VARS, fullScaleDesign
+
+    evaluator = batchEvaluator.standInEvaluator if "--stand-in" in sys.argv else batchEvaluator.abaqusEvaluator
+    printStudy(convergenceStudy(fullScaleDesign([0.5]*NUM_VARS), evaluator))
@@ -0,0 +1,406 @@
+"""
+ODB reduction helpers for Post_P_Script.
+
+Nothing in here imports abaqus: the functions only touch the odb object model
+(steps, frames, fieldOutputs, bulkDataBlocks), so they run the same on a real
+odb inside Abaqus Python and on the mock in mockOdb.py under plain CPython.
+"""
+
+import os
+import re
+import json
+import math
+import numpy as np
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def selectFrames(odb, frameSubset=None):
+    """
+    Yield (step, frame) pairs to scan.
+    -frameSubset=None scans every frame of every step
+    -otherwise a dict {stepName: frame indices}; negative indices count from the end,
+     None as the value means every frame of that step, steps left out are skipped
+    """
+    for step in odb.steps.values():
+        if frameSubset is None:
+            frameIndices = None
+        elif step.name in frameSubset:
+            frameIndices = frameSubset[step.name]
+        else:
+            continue
+
+        frames = step.frames
+        if frameIndices is None:
+            for frame in frames:
+                yield step, frame
+        else:
+            for frameIndex in frameIndices:
+                yield step, frames[frameIndex]
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Single-pass extraction
+# extractResults walks the odb once. Each handler says which frames of which steps it needs
+# and reads what it wants from a FrameData, which fetches every fieldOutput/getSubset
+# only once per frame no matter how many handlers ask for it.
+# A new metric is a new OdbHandler subclass added to the list - no extra pass.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class FrameData(object):
+    #Per-frame memo of fields and region subsets
+    def __init__(self, frame):
+        self.frame = frame
+        self.subsets = {}
+
+    def hasField(self, key):
+        return key in self.frame.fieldOutputs.keys()
+
+    def field(self, key, region=None):
+        memoKey = (key, id(region))
+        if memoKey not in self.subsets:
+            field = self.frame.fieldOutputs[key]
+            self.subsets[memoKey] = field.getSubset(region=region) if region is not None else field
+        return self.subsets[memoKey]
+
+    def firstValue(self, key, region=None):
+        return self.field(key, region).values[0].data
+
+
+class OdbHandler(object):
+    """
+    Base class for one extracted quantity.
+    -name: key of its result in the extractResults dict
+    -stepNames: steps it reads (None = all); frameSubset: {stepName: frame indices} to narrow further
+    -set self.done = True once nothing more is needed, and later frames are not handed to it
+    """
+    name = None
+
+    def __init__(self, stepNames=None, frameSubset=None):
+        self.stepNames = stepNames
+        self.frameSubset = frameSubset
+        self.done = False
+
+    def framesFor(self, step):
+        #frame indices of this step to visit (None = every frame)
+        if self.stepNames is not None and step.name not in self.stepNames:
+            return []
+        if self.frameSubset is None:
+            return None
+        if step.name not in self.frameSubset:
+            return []
+        return self.frameSubset[step.name]
+
+    def processStep(self, step):
+        #called once per step it reads, before any of that step's frames (history output lives here)
+        pass
+
+    def processFrame(self, step, frame, frameData):
+        pass
+
+    def result(self):
+        return None
+
+def findHistoryOutput(step, outputName):
+    #data ((time, value), ...) of the first history output named outputName (ignoring the region suffix)
+    for historyRegion in step.historyRegions.values():
+        for key in historyRegion.historyOutputs.keys():
+            if key.split()[0] == outputName:
+                return historyRegion.historyOutputs[key].data
+    return None
+
+def interpolateRelease(contactData, v1Data, v2Data, contactThreshold):
+    """
+    Contact-loss instant from sampled histories: the first downward crossing of contactThreshold.
+    The force is clamped at zero once contact opens, so the crossing is placed by extending the trend of the
+    last two in-contact samples (kept between the samples around the crossing); with only one in-contact
+    sample it falls back to plain linear interpolation. The velocity is interpolated to that time.
+    Returns (releaseTime, veloX, veloY), or None if contact never drops out.
+    """
+    contactArray = np.array(contactData, dtype=float)
+    times, forces = contactArray[:,0], contactArray[:,1]
+    lostIndices = np.nonzero(forces < contactThreshold)[0]
+    if len(lostIndices) == 0:
+        return None
+
+    k = lostIndices[0]
+    if k == 0:
+        releaseTime = times[0]
+    else:
+        slope = (forces[k]-forces[k-1])/(times[k]-times[k-1])
+        if k >= 2 and forces[k-1] < forces[k-2]:
+            slope = (forces[k-1]-forces[k-2])/(times[k-1]-times[k-2])
+        releaseTime = times[k-1] + (contactThreshold-forces[k-1])/slope
+        releaseTime = min(max(releaseTime, times[k-1]), times[k])
+
+    v1Array = np.array(v1Data, dtype=float)
+    v2Array = np.array(v2Data, dtype=float)
+    veloX = float(np.interp(releaseTime, v1Array[:,0], v1Array[:,1]))
+    veloY = float(np.interp(releaseTime, v2Array[:,0], v2Array[:,1]))
+
+    return float(releaseTime), veloX, veloY
+
+class ReleaseVelocityHandler(OdbHandler):
+    """
+    Payload velocity magnitude and angle at release.
+    -preferred: interpolated from the CFNM (payload/arm contact force) and V1/V2 history outputs
+    -fallback (no history in the odb): the first frame where CPRESS at the pull point drops out
+    """
+    name = "release"
+
+    def __init__(self, region, stepName='FollowThru', contactThreshold=0.0001, forceThreshold=0.0001):
+        OdbHandler.__init__(self, stepNames=[stepName])
+        self.region = region
+        self.contactThreshold = contactThreshold
+        self.forceThreshold = forceThreshold
+        self.veloMagMax = 0
+        self.veloAngle = 0
+        self.releaseTime = None
+        self.method = None
+
+    def processStep(self, step):
+        if not hasattr(step, "historyRegions"):
+            return
+        contactData = findHistoryOutput(step, 'CFNM')
+        v1Data = findHistoryOutput(step, 'V1')
+        v2Data = findHistoryOutput(step, 'V2')
+        if not (contactData and v1Data and v2Data):
+            return
+
+        release = interpolateRelease(contactData, v1Data, v2Data, self.forceThreshold)
+        if release is not None:
+            self.releaseTime, veloX, veloY = release
+            self.veloMagMax = math.sqrt(veloX**2 + veloY**2)
+            self.veloAngle = math.atan2(-veloX,veloY)*180/math.pi
+            self.method = "history"
+            self.done = True
+
+    def processFrame(self, step, frame, frameData):
+        if frameData.firstValue('CPRESS', self.region) < self.contactThreshold:
+            veloX, veloY = frameData.firstValue('V', self.region)[:2]
+            self.veloMagMax = math.sqrt(veloX**2 + veloY**2)
+            self.veloAngle = math.atan2(-veloX,veloY)*180/math.pi
+            self.releaseTime = frame.frameValue
+            self.method = "frames"
+            self.done = True
+
+    def result(self):
+        return self.veloMagMax, self.veloAngle
+
+class EigenvalueHandler(OdbHandler):
+    #Buckling eigenvalues from the "... EigenValue = x" frame descriptions; eigenVal1 is the last frame's, as before
+    name = "eigenVal1"
+
+    def __init__(self, stepName='BuckleCheck'):
+        OdbHandler.__init__(self, stepNames=[stepName])
+        self.eigenVal1 = 0.0
+        self.eigenValues = []
+
+    def processFrame(self, step, frame, frameData):
+        descParts = re.split(r'\s*=\s*', frame.description)
+        if len(descParts) > 1: #the base state frame carries no eigenvalue
+            self.eigenVal1 = float(descParts[1])
+            self.eigenValues.append(self.eigenVal1)
+
+    def result(self):
+        return self.eigenVal1
+
+class PayloadHistoryHandler(OdbHandler):
+    #Time history of velocity and contact pressure at the payload pull point
+    name = "payloadHistory"
+
+    def __init__(self, region, stepNames=('Launch', 'FollowThru')):
+        OdbHandler.__init__(self, stepNames=list(stepNames))
+        self.region = region
+        self.time = []
+        self.velocity = []
+        self.cpress = []
+
+    def processFrame(self, step, frame, frameData):
+        if not (frameData.hasField('V') and frameData.hasField('CPRESS')):
+            return
+        self.time.append(getattr(step, "totalTime", 0.0) + frame.frameValue)
+        self.velocity.append(list(frameData.firstValue('V', self.region))[:3])
+        self.cpress.append(float(np.asarray(frameData.firstValue('CPRESS', self.region)).ravel()[0]))
+
+    def result(self):
+        return np.array(self.time), np.array(self.velocity).reshape(-1, 3), np.array(self.cpress)
+
+class MaxMisesHandler(OdbHandler):
+    #Maximum von Mises stress, reduced block-wise with numpy over the S bulkDataBlocks
+    name = "maxMises"
+
+    def __init__(self, elemset=None, frameSubset=None, stressKey='S'):
+        OdbHandler.__init__(self, frameSubset=frameSubset)
+        self.elemset = elemset
+        self.stressKey = stressKey
+        self.maxMises = -0.1
+        self.maxVMElem = 0
+        self.maxStep = "_None_"
+        self.maxFrame = -1
+        self.isStressPresent = 0
+
+        #per-frame maximum, for the columnar export
+        self.frameTime = []
+        self.frameStepNames = []
+        self.frameMaxMises = []
+
+    def processFrame(self, step, frame, frameData):
+        if not frameData.hasField(self.stressKey):
+            return
+        self.isStressPresent = 1
+
+        frameMax = -0.1
+        for block in frameData.field(self.stressKey, self.elemset).bulkDataBlocks:
+            misesArray = np.asarray(block.mises).ravel()
+            if misesArray.size == 0:
+                continue
+            blockIndex = int(np.argmax(misesArray)) #first occurrence, like the strict '>' of the loop
+            frameMax = max(frameMax, float(misesArray[blockIndex]))
+            if misesArray[blockIndex] > self.maxMises:
+                self.maxMises = float(misesArray[blockIndex])
+                self.maxVMElem = int(np.asarray(block.elementLabels).ravel()[blockIndex])
+                self.maxStep = step.name
+                self.maxFrame = frame.incrementNumber
+
+        self.frameTime.append(getattr(step, "totalTime", 0.0) + frame.frameValue)
+        self.frameStepNames.append(step.name)
+        self.frameMaxMises.append(frameMax)
+
+    def result(self):
+        return self.maxMises, self.maxVMElem, self.maxStep, self.maxFrame, self.isStressPresent
+
+
+def extractResults(odb, handlers):
+    """
+    Visit every frame any handler asks for, exactly once, in step/frame order.
+    Returns {handler.name: handler.result()}.
+    """
+    for step in odb.steps.values():
+        frames = step.frames
+        numFrames = len(frames)
+
+        handlersByFrame = {}
+        for handler in handlers:
+            frameIndices = handler.framesFor(step)
+            if frameIndices is None:
+                frameIndices = range(numFrames)
+            for frameIndex in frameIndices:
+                handlersByFrame.setdefault(frameIndex % numFrames, []).append(handler)
+
+        for handler in handlers:
+            if not handler.done and (handler.stepNames is None or step.name in handler.stepNames):
+                handler.processStep(step)
+
+        for frameIndex in sorted(handlersByFrame):
+            activeHandlers = [handler for handler in handlersByFrame[frameIndex] if not handler.done]
+            if not activeHandlers:
+                continue
+            frame = frames[frameIndex]
+            frameData = FrameData(frame)
+            for handler in activeHandlers:
+                handler.processFrame(step, frame, frameData)
+
+    return dict([(handler.name, handler.result()) for handler in handlers])
+
+def maxMisesScan(odb, elemset=None, frameSubset=None, stressKey='S'):
+    """
+    Maximum von Mises stress over the selected frames, reduced block-wise with numpy
+    instead of looping over every stressValue in Python.
+    -elemset restricts the field to a region (e.g. assembly.elementSets['ALL_PART'])
+    Returns (maxMises, maxVMElem, maxStep, maxFrame, isStressPresent), with the same
+    sentinels as the original loop when nothing is found (-0.1, 0, "_None_", -1).
+    """
+    return extractResults(odb, [MaxMisesHandler(elemset, frameSubset, stressKey)])["maxMises"]
+
+def maxMisesScanLoop(odb, elemset=None, frameSubset=None, stressKey='S'):
+    #Reference: the per-value loop that Post_P_Script used before maxMisesScan (kept for checking/benchmarks)
+    maxMises = -0.1
+    maxVMElem = 0
+    maxStep = "_None_"
+    maxFrame = -1
+    isStressPresent = 0
+
+    for step, frame in selectFrames(odb, frameSubset):
+        allFields = frame.fieldOutputs
+        if stressKey not in allFields.keys():
+            continue
+        isStressPresent = 1
+
+        stressSet = allFields[stressKey]
+        if elemset is not None:
+            stressSet = stressSet.getSubset(region=elemset)
+        for stressValue in stressSet.values:
+            if (stressValue.mises > maxMises):
+                maxMises = stressValue.mises
+                maxVMElem = stressValue.elementLabel
+                maxStep = step.name
+                maxFrame = frame.incrementNumber
+
+    return maxMises, maxVMElem, maxStep, maxFrame, isStressPresent
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Columnar export
+# One float32 .npy file per column plus index.json in <jobName>_columns/, so new metrics can be
+# computed later with plain CPython + numpy (np.load(..., mmap_mode='r')) instead of reopening the odb
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+COLUMN_DIR_SUFFIX = "_columns"
+INDEX_FILE_NAME = "index.json"
+
+def columnsFromHandlers(handlers):
+    #{columnName: (array, description)} from the handlers that keep histories
+    columns = {}
+    for handler in handlers:
+        if isinstance(handler, PayloadHistoryHandler):
+            time, velocity, cpress = handler.result()
+            columns["payload_time"] = (time, "total time of each Launch/FollowThru frame [s]")
+            columns["payload_V"] = (velocity, "V1,V2,V3 at PAY_PULL_POINT [m/s]")
+            columns["payload_CPRESS"] = (cpress, "CPRESS at PAY_PULL_POINT [Pa]")
+        elif isinstance(handler, MaxMisesHandler):
+            stepNames = []
+            for stepName in handler.frameStepNames:
+                if stepName not in stepNames:
+                    stepNames.append(stepName)
+            columns["mises_time"] = (np.array(handler.frameTime), "total time of each frame with S output [s]")
+            columns["mises_step"] = (np.array([stepNames.index(stepName) for stepName in handler.frameStepNames]),
+                "step of each frame, as an index into: "+",".join(stepNames))
+            columns["mises_max"] = (np.array(handler.frameMaxMises), "max von Mises stress per frame [Pa]")
+        elif isinstance(handler, EigenvalueHandler):
+            columns["eigenvalues"] = (np.array(handler.eigenValues), "buckling eigenvalues, in mode order")
+
+    return columns
+
+def writeColumns(dirName, columns, scalars=None):
+    """
+    Write every column as a float32 .npy file and describe them in index.json.
+    The index goes last (via a temporary file), so a directory with an index.json is always complete.
+    """
+    if not os.path.isdir(dirName):
+        os.makedirs(dirName)
+
+    index = {"columns":{}, "scalars":scalars or {}}
+    for name in sorted(columns):
+        array, description = columns[name]
+        array = np.asarray(array, dtype=np.float32)
+        np.save(os.path.join(dirName, name+".npy"), array)
+        index["columns"][name] = {"file":name+".npy", "shape":list(array.shape), "dtype":"float32", "description":description}
+
+    tmpName = os.path.join(dirName, INDEX_FILE_NAME+".tmp")
+    with open(tmpName, "w") as outFile:
+        json.dump(index, outFile, indent=1)
+    if os.path.exists(os.path.join(dirName, INDEX_FILE_NAME)):
+        os.remove(os.path.join(dirName, INDEX_FILE_NAME))
+    os.rename(tmpName, os.path.join(dirName, INDEX_FILE_NAME))
+
+def loadColumns(dirName, mmap=True):
+    """
+    Read an export back: returns (columns, index) where columns maps name -> array
+    (memory-mapped, read-only, unless mmap=False) and index is the parsed index.json.
+    """
+    with open(os.path.join(dirName, INDEX_FILE_NAME), "r") as inFile:
+        index = json.load(inFile)
+
+    columns = {}
+    for name,info in index["columns"].items():
+        columns[name] = np.load(os.path.join(dirName, info["file"]), mmap_mode='r' if mmap else None)
+
+    return columns, index
@@ -0,0 +1,242 @@
+#Particle swarm core
+#Swarm state held as (popSize x numVars) NumPy arrays and advanced with a single vectorized update,
+#so the same optimizer scales from the 6-particle Abaqus runs to thousands of particles on cheap surrogates
+
+import os
+import time
+import pickle
+import random
+import numpy as np
+
+
+#Defaults match the tuned values in ParticleSwarmOpt_LunaCat
+V_MAX = 0.5
+ALPHA = 0.25 #inertia
+P_BEST_COEFF = 0.85
+G_BEST_COEFF = 0.025
+
+NO_BEST_COST = 1e15 #cost assigned to "no best yet" (same as the constraint penalty)
+
+
+class Swarm(object):
+    """
+    Normalized particle swarm (every variable lives on [lowBound, upBound]).
+    -positions, velocities, pBestX: (popSize x numVars) float arrays
+    -pBestCost: (popSize,) array; gBestX/gBestCost hold the swarm best
+    -every method takes an optional rows index so an asynchronous driver can update single particles
+    The update reproduces the original list loop term by term:
+        v = ALPHA*v + P_BEST_COEFF*r1*(pBest-x) + G_BEST_COEFF**r2*(gBest-x), v = min(v, V_MAX), x = clip(x+v)
+    """
+
+    def __init__(self, positions, vMax=V_MAX, alpha=ALPHA, pBestCoeff=P_BEST_COEFF, gBestCoeff=G_BEST_COEFF,
+            lowBound=0.0, upBound=1.0, seed=None):
+        self.positions = np.array(positions, dtype=float)
+        self.popSize, self.numVars = self.positions.shape
+
+        self.vMax = vMax
+        self.alpha = alpha
+        self.pBestCoeff = pBestCoeff
+        self.gBestCoeff = gBestCoeff
+        self.lowBound = lowBound
+        self.upBound = upBound
+        self.rng = np.random.RandomState(seed)
+
+        self.velocities = np.zeros_like(self.positions)
+        self.pBestX = self.positions.copy()
+        self.pBestCost = np.full(self.popSize, NO_BEST_COST)
+        self.gBestX = self.positions[0].copy()
+        self.gBestCost = NO_BEST_COST
+        self.hasGlobalBest = False
+
+    def seedBests(self, costs, rows=None):
+        #First evaluation of a particle always becomes its personal best
+        rows = np.arange(self.popSize) if rows is None else np.asarray(rows)
+        self.pBestCost[rows] = costs
+        self.pBestX[rows] = self.positions[rows]
+
+        return self.updateGlobalBest(rows)
+
+    def updatePersonalBests(self, costs, rows=None):
+        #Returns the rows whose personal best improved
+        rows = np.arange(self.popSize) if rows is None else np.asarray(rows)
+        costs = np.asarray(costs, dtype=float)
+        improved = costs < self.pBestCost[rows]
+
+        improvedRows = rows[improved]
+        self.pBestCost[improvedRows] = costs[improved]
+        self.pBestX[improvedRows] = self.positions[improvedRows]
+
+        return improvedRows
+
+    def updateGlobalBest(self, rows=None):
+        #Promote the best personal best among rows; returns its row, or None if the global best held
+        rows = np.arange(self.popSize) if rows is None else np.asarray(rows)
+        bestRow = rows[np.argmin(self.pBestCost[rows])]
+        if self.pBestCost[bestRow] < self.gBestCost or not self.hasGlobalBest:
+            self.gBestCost = self.pBestCost[bestRow]
+            self.gBestX = self.pBestX[bestRow].copy()
+            self.hasGlobalBest = True
+            return bestRow
+
+        return None
+
+    def step(self, rows=None, gBestX=None):
+        #Move the given particles (all by default) toward their own and the global best
+        rows = np.arange(self.popSize) if rows is None else np.asarray(rows)
+        gBestX = self.gBestX if gBestX is None else gBestX
+
+        positions, velocities = self.candidateSteps(1, rows, gBestX)
+        self.velocities[rows] = velocities[0]
+        self.positions[rows] = positions[0]
+
+    def candidateSteps(self, numCandidates, rows=None, gBestX=None):
+        #numCandidates independent draws of step() for the given particles, without moving them:
+        #(positions, velocities), each (numCandidates x len(rows) x numVars)
+        rows = np.arange(self.popSize) if rows is None else np.asarray(rows)
+        gBestX = self.gBestX if gBestX is None else gBestX
+
+        x = self.positions[rows]
+        r1 = self.rng.random_sample((numCandidates,)+x.shape)
+        r2 = self.rng.random_sample((numCandidates,)+x.shape)
+
+        velo = self.alpha*self.velocities[rows] + self.pBestCoeff*r1*(self.pBestX[rows]-x) + self.gBestCoeff**r2*(gBestX-x)
+        np.minimum(velo, self.vMax, out=velo) # restrict velocity component to maximum if it exceeds
+
+        return np.clip(x+velo, self.lowBound, self.upBound), velo #restrict to bound
+
+    def getState(self):
+        #Everything needed to continue this swarm bit-for-bit, including the RNG stream
+        return {"positions":self.positions.copy(), "velocities":self.velocities.copy(), "pBestX":self.pBestX.copy(),
+            "pBestCost":self.pBestCost.copy(), "gBestX":self.gBestX.copy(), "gBestCost":self.gBestCost,
+            "hasGlobalBest":self.hasGlobalBest, "rngState":self.rng.get_state()}
+
+    def setState(self, state):
+        self.positions = np.array(state["positions"], dtype=float)
+        self.popSize, self.numVars = self.positions.shape
+        self.velocities = np.array(state["velocities"], dtype=float)
+        self.pBestX = np.array(state["pBestX"], dtype=float)
+        self.pBestCost = np.array(state["pBestCost"], dtype=float)
+        self.gBestX = np.array(state["gBestX"], dtype=float)
+        self.gBestCost = state["gBestCost"]
+        self.hasGlobalBest = state["hasGlobalBest"]
+        self.rng.set_state(state["rngState"])
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Checkpoints
+# Written to a temporary file and renamed over the old one, so a crash mid-write never
+# leaves a truncated checkpoint; the previous checkpoint is kept as <fileName>.bak
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def saveCheckpoint(fileName, state):
+    tmpName = fileName+".tmp"
+    bakName = fileName+".bak"
+    with open(tmpName, "wb") as outFile:
+        pickle.dump(state, outFile, 2) #protocol 2 so Abaqus Python 2 can read it
+        outFile.flush()
+        os.fsync(outFile.fileno())
+
+    #os.rename will not overwrite on Windows, so move the old checkpoint aside first
+    if os.path.exists(fileName):
+        if os.path.exists(bakName):
+            os.remove(bakName)
+        os.rename(fileName, bakName)
+    os.rename(tmpName, fileName)
+
+def loadCheckpoint(fileName):
+    #Latest complete checkpoint, falling back to the backup; None if there is nothing to resume
+    for name in [fileName, fileName+".bak"]:
+        if os.path.exists(name):
+            try:
+                with open(name, "rb") as inFile:
+                    return pickle.load(inFile)
+            except Exception as e:
+                print("EXCEPTION: could not read checkpoint "+name+": "+str(e))
+
+    return None
+
+
+def minimize(costFunc, numVars, popSize, maxIters, seed=None, initPositions=None, **swarmArgs):
+    """
+    Generation-synchronous PSO on a vectorized cost function.
+    -costFunc(positions) takes a (n x numVars) normalized array and returns n costs
+    Returns the finished Swarm.
+    """
+    if initPositions is None:
+        initPositions = np.random.RandomState(seed).random_sample((popSize, numVars))
+    swarm = Swarm(initPositions, seed=seed, **swarmArgs)
+
+    swarm.seedBests(costFunc(swarm.positions))
+    for iterCnt in range(maxIters):
+        swarm.step()
+        swarm.updatePersonalBests(costFunc(swarm.positions))
+        swarm.updateGlobalBest()
+
+    return swarm
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Benchmark: vectorized Swarm vs. the original nested-list loop
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def sphereCost(positions):
+    #cheap surrogate stand-in with its minimum in the middle of the unit box
+    return np.sum((np.asarray(positions)-0.5)**2, axis=1)
+
+def listSphereCost(varVec):
+    return sum([(x-0.5)**2 for x in varVec])
+
+def listMinimize(numVars, popSize, maxIters):
+    #The list-based loop as written in ParticleSwarmOpt_LunaCat, on the same cost
+    populationList = [[random.random() for i in range(numVars)] for indiv in range(popSize)]
+    indivVelos = [[0 for i in range(numVars)] for indiv in range(popSize)]
+    indivFuncBest = [listSphereCost(indivXVector) for indivXVector in populationList]
+    indivXBest = [indivXVector[:] for indivXVector in populationList]
+    gFuncBest = min(indivFuncBest)
+    gXBest = indivXBest[indivFuncBest.index(gFuncBest)][:]
+
+    for iterCnt in range(maxIters):
+        nextGFuncBest = gFuncBest
+        nextGXBest = gXBest[:]
+        for indivIndex in range(popSize):
+            indivXVector = populationList[indivIndex][:]
+            indivFuncVal = listSphereCost(indivXVector)
+
+            if indivFuncVal < indivFuncBest[indivIndex]:
+                indivFuncBest[indivIndex] = indivFuncVal
+                indivXBest[indivIndex] = indivXVector
+                if indivFuncVal < nextGFuncBest:
+                    nextGFuncBest = indivFuncVal
+                    nextGXBest = indivXVector[:]
+
+            for dimIndex in range(numVars):
+                newComponentVelo = ALPHA*indivVelos[indivIndex][dimIndex] + P_BEST_COEFF*random.random()*(indivXBest[indivIndex][dimIndex]-indivXVector[dimIndex]) + G_BEST_COEFF**random.random()*(gXBest[dimIndex]-indivXVector[dimIndex])
+                newComponentVelo = min(newComponentVelo,V_MAX)
+                populationList[indivIndex][dimIndex] = min(max(indivXVector[dimIndex] + newComponentVelo,0),1)
+                indivVelos[indivIndex][dimIndex] = newComponentVelo
+
+        gFuncBest = nextGFuncBest
+        gXBest = nextGXBest[:]
+
+    return gFuncBest
+
+def benchmarkSwarm(popSizes=(6, 100, 1000, 5000), numVars=11, maxIters=20):
+    #Particle-evaluations per second for both implementations
+    print("popSize,listEvalsPerSec,arrayEvalsPerSec,speedup,listBest,arrayBest")
+    for popSize in popSizes:
+        numEvals = popSize*(maxIters+1)
+
+        startTime = time.time()
+        listBest = listMinimize(numVars, popSize, maxIters)
+        listTime = time.time() - startTime
+
+        startTime = time.time()
+        swarm = minimize(sphereCost, numVars, popSize, maxIters, seed=popSize)
+        arrayTime = time.time() - startTime
+
+        listRate = numEvals/max(listTime, 1e-9)
+        arrayRate = numEvals/max(arrayTime, 1e-9)
+        print(",".join([str(popSize), "%.0f"%listRate, "%.0f"%arrayRate, "%.1f"%(arrayRate/listRate),
+            "%.3e"%listBest, "%.3e"%swarm.gBestCost]))
+
+
+if __name__ == "__main__":
+    benchmarkSwarm()
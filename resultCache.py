@@ -0,0 +1,98 @@
+#Persistent result cache for evalModel
+#Keyed on a canonical hash of the 11 full-scale design variables plus a model-version tag,
+#so re-visited designs (e.g. after clamping to bounds or rounding material_type) cost nothing
+
+import time
+import sqlite3
+import hashlib
+
+
+#Bump this whenever a change to evalModel/Post_P_Script would change the outputs of a design
+MODEL_VERSION = "lunacat-2" #2: release velocity interpolated from history output (was the first field frame after release)
+
+CACHE_FILE_NAME = "RESULT_CACHE.sqlite"
+MAX_ENTRIES = 20000
+
+MATERIAL_INDEX = 7 #material_type position in the design vector
+SIG_DIGITS = 10 #float noise below this is treated as the same design
+
+OUTPUT_NAMES = ["veloMagMax", "veloAngle", "eigenVal1", "maxMises", "mass"]
+
+
+def designKey(designVec, modelVersion=MODEL_VERSION):
+    #Canonical text form of the design vector: material bucketed to an int, everything else to SIG_DIGITS
+    canonList = []
+    for i,val in enumerate(designVec):
+        if i == MATERIAL_INDEX:
+            canonList.append(str(int(round(val))))
+        else:
+            canonList.append("%.*g"%(SIG_DIGITS, float(val)))
+
+    keyString = modelVersion+"|"+",".join(canonList)
+    return hashlib.sha1(keyString.encode("utf-8")).hexdigest()
+
+
+class ResultCache(object):
+    """
+    SQLite-backed store of veloMagMax,veloAngle,eigenVal1,maxMises,mass per design.
+    Least-recently-used entries are evicted once the table grows past maxEntries.
+    Only successful evaluations should be stored.
+    """
+
+    def __init__(self, fileName=CACHE_FILE_NAME, maxEntries=MAX_ENTRIES, modelVersion=MODEL_VERSION):
+        self.fileName = fileName
+        self.maxEntries = maxEntries
+        self.modelVersion = modelVersion
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = sqlite3.connect(fileName, timeout=30.0)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, modelVersion TEXT, design TEXT, "
+            + ", ".join([name+" REAL" for name in OUTPUT_NAMES]) + ", lastUsed REAL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS resultsLastUsed ON results (lastUsed)")
+        self.conn.commit()
+
+    def get(self, designVec):
+        #Return the cached output tuple, or None on a miss
+        key = designKey(designVec, self.modelVersion)
+        row = self.conn.execute("SELECT "+", ".join(OUTPUT_NAMES)+" FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.conn.execute("UPDATE results SET lastUsed = ? WHERE key = ?", (time.time(), key))
+        self.conn.commit()
+        return tuple(row)
+
+    def put(self, designVec, results):
+        key = designKey(designVec, self.modelVersion)
+        designText = ",".join([str(x) for x in designVec])
+        self.conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, "+", ".join(["?"]*len(OUTPUT_NAMES))+", ?)",
+            tuple([key, self.modelVersion, designText] + [float(x) for x in results] + [time.time()]))
+        self.evict()
+        self.conn.commit()
+
+    def evict(self):
+        #Drop the least-recently-used rows beyond the size bound
+        numEntries = self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        if numEntries > self.maxEntries:
+            self.conn.execute("DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY lastUsed ASC LIMIT ?)",
+                (numEntries-self.maxEntries,))
+
+    def evaluate(self, evaluator, designVec, jobNumber):
+        #Cached wrapper around an evaluator(designVec, jobNumber); failures propagate and are not stored
+        results = self.get(designVec)
+        if results is None:
+            results = tuple(evaluator(designVec, jobNumber))
+            self.put(designVec, results)
+
+        return results
+
+    def statsString(self):
+        numLookups = self.hits + self.misses
+        hitRate = 100.0*self.hits/numLookups if numLookups > 0 else 0.0
+        return "Result cache: "+str(self.hits)+" hits, "+str(self.misses)+" misses ("+("%.1f"%hitRate)+"% hit rate)"
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,29 @@
+"""
+Single-design driver used by batchEvaluator.abaqusEvaluator:
+    abaqus cae noGUI=runDesign.py -- design.json
+Reads the design vector, job number and fidelity level from the JSON request,
+runs evalModel in the current directory (headless) and writes the results back out.
+With "direct" in the request the input deck is written by inpWriter instead of being built in CAE.
+With "imageOnly" in the request it only rebuilds the model and writes Model_Images/Job-<n>.png.
+"""
+
+import sys
+import json
+
+designFileName = sys.argv[-1]
+with open(designFileName, "r") as inFile:
+    request = json.load(inFile)
+
+sys.path.insert(0, request["repoDir"])
+import LunaCatAbqMainCode
+LunaCatAbqMainCode.HEADLESS = True #batch kernel: no viewport work, images only when asked for
+LunaCatAbqMainCode.DIRECT_INPUT = bool(request.get("direct"))
+
+if request.get("imageOnly"):
+    reply = {"image":LunaCatAbqMainCode.imageDesign(request["design"], request["jobNumber"], fidelity=request.get("fidelity"))}
+else:
+    args = request["design"] + [request["jobNumber"]]
+    reply = {"results":list(LunaCatAbqMainCode.evalModel(*args, fidelity=request.get("fidelity")))}
+
+with open(request["resultFile"], "w") as outFile:
+    json.dump(reply, outFile)
@@ -0,0 +1,336 @@
+#Surrogate model for evalModel
+#Gaussian-process regression of veloMagMax, veloAngle, eigenVal1, maxMises and mass on the 11 design variables,
+#trained on results we already paid for (the version-tagged result cache; doeAnalysis runs go through it too)
+
+import os
+import sys
+import json
+import pickle
+import sqlite3
+import numpy as np
+
+import resultCache
+from ParticleSwarmOpt_LunaCat import boundsList
+
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_FILE_NAME = os.path.join(REPO_DIR, "SURROGATE_MODEL.pkl")
+#Only the result cache is a default source, since it is the only one tagged by model version:
+#-RUNNING_LOG.csv rows do not record the evaluator (surrogate, reduced-order deck, coarse screening mesh)
+# that produced them, so the model could learn from its own predictions
+#-DOE_Output/FINAL_RESULTS does not record the post-processor version, so old files hold superseded outputs
+#Either can still be passed explicitly (python surrogateModel.py <file> ...) when known to be current
+DATA_FILE_NAMES = [os.path.join(REPO_DIR, resultCache.CACHE_FILE_NAME)]
+
+#cache tag for surrogate predictions, so they never get mixed up with solver results
+MODEL_VERSION = resultCache.MODEL_VERSION+"-surrogate"
+
+NUM_VARS = 11
+OUTPUT_NAMES = resultCache.OUTPUT_NAMES
+LOG_OUTPUTS = ["maxMises", "mass"] #strictly positive and spread over decades; fitted in log space
+FAILED_LIMIT = 1e19 #any output this large in magnitude marks a failed evaluation
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Training data
+# Every loader returns (designList, resultList) with failed evaluations dropped
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def isGoodResult(results):
+    return all([abs(float(x)) < FAILED_LIMIT for x in results])
+
+def loadFinalResults(fileName):
+    #doeAnalysis output JSON: rows of 11 design variables followed by the 5 outputs;
+    #only pass a file here when it was written by the current post-processor (see resultCache.MODEL_VERSION)
+    with open(fileName, "r") as inFile:
+        dataDict = json.load(inFile)
+
+    designList, resultList = [], []
+    for keyVal in dataDict:
+        for row in dataDict[keyVal]:
+            if row is not None and isGoodResult(row[NUM_VARS:NUM_VARS+5]):
+                designList.append(row[:NUM_VARS])
+                resultList.append(row[NUM_VARS:NUM_VARS+5])
+
+    return designList, resultList
+
+def loadRunningLog(fileName):
+    #ParticleSwarmOpt_LunaCat RUNNING_LOG.csv (two header lines; design, outputs, costVal per row);
+    #only pass a log here when every row of it came from the full solver
+    designList, resultList = [], []
+    with open(fileName, "r") as inFile:
+        for line in inFile.readlines()[2:]:
+            try:
+                row = [float(x) for x in line.strip().split(",")]
+            except ValueError:
+                continue
+            if len(row) >= NUM_VARS+5 and isGoodResult(row[NUM_VARS:NUM_VARS+5]):
+                designList.append(row[:NUM_VARS])
+                resultList.append(row[NUM_VARS:NUM_VARS+5])
+
+    return designList, resultList
+
+def loadResultCache(fileName, modelVersion=resultCache.MODEL_VERSION):
+    conn = sqlite3.connect(fileName)
+    try:
+        rows = conn.execute("SELECT design, "+", ".join(OUTPUT_NAMES)+" FROM results WHERE modelVersion = ?", (modelVersion,)).fetchall()
+    finally:
+        conn.close()
+
+    designList, resultList = [], []
+    for row in rows:
+        if isGoodResult(row[1:]):
+            designList.append([float(x) for x in row[0].split(",")])
+            resultList.append(list(row[1:]))
+
+    return designList, resultList
+
+def loadTrainingData(fileNames=DATA_FILE_NAMES):
+    #Pool every available source; repeated designs (same cache key) are kept once
+    designList, resultList = [], []
+    seenKeys = set()
+    for fileName in fileNames:
+        if not os.path.exists(fileName):
+            continue
+        if fileName.endswith(".sqlite"):
+            sourceData = loadResultCache(fileName)
+        elif fileName.endswith(".csv"):
+            sourceData = loadRunningLog(fileName)
+        else:
+            sourceData = loadFinalResults(fileName)
+
+        for designVec,results in zip(*sourceData):
+            key = resultCache.designKey(designVec)
+            if key not in seenKeys:
+                seenKeys.add(key)
+                designList.append(designVec)
+                resultList.append(results)
+
+    return designList, resultList
+
+def normalizeDesigns(designList):
+    #full-scale design vectors -> unit box used by the optimizer
+    designArray = np.array(designList, dtype=float).reshape(-1, NUM_VARS)
+    lowArray = np.array([boundTuple[0] for boundTuple in boundsList], dtype=float)
+    highArray = np.array([boundTuple[1] for boundTuple in boundsList], dtype=float)
+
+    return (designArray-lowArray)/(highArray-lowArray)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Gaussian process
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class GaussianProcess(object):
+    """
+    Zero-mean GP on a standardized scalar output with a squared-exponential kernel,
+    one length scale per design variable (ARD) plus a noise nugget.
+    Hyperparameters maximize the log marginal likelihood by a pattern search in log space,
+    which needs nothing beyond numpy (the Abaqus Python has no scipy).
+    """
+
+    def __init__(self, lengthScales=None, noise=1e-4):
+        self.lengthScales = lengthScales
+        self.noise = noise
+
+    def kernel(self, xA, xB):
+        scaledA = xA/self.lengthScales
+        scaledB = xB/self.lengthScales
+        sqDist = np.sum(scaledA**2, axis=1)[:,None] + np.sum(scaledB**2, axis=1)[None,:] - 2*np.dot(scaledA, scaledB.T)
+        return np.exp(-0.5*np.maximum(sqDist, 0.0))
+
+    def logLikelihood(self, x, y):
+        kMat = self.kernel(x, x) + (self.noise+1e-10)*np.eye(len(x))
+        try:
+            chol = np.linalg.cholesky(kMat)
+        except np.linalg.LinAlgError:
+            return -np.inf
+        alpha = np.linalg.solve(chol.T, np.linalg.solve(chol, y))
+        return -0.5*np.dot(y, alpha) - np.sum(np.log(np.diag(chol)))
+
+    def fit(self, x, y, maxPasses=30, optimize=True):
+        #optimize=False keeps the current hyperparameters and only conditions on the new data
+        self.x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+
+        #standardize so a unit signal variance is a sensible prior
+        self.yMean = np.mean(y)
+        self.yStd = np.std(y) if np.std(y) > 0 else 1.0
+        yScaled = (y-self.yMean)/self.yStd
+
+        #pattern search on log(lengthScales) and log(noise)
+        logParams = np.append(np.log(np.full(self.x.shape[1], 0.5)), np.log(self.noise))
+        def score(params):
+            self.lengthScales = np.exp(params[:-1])
+            self.noise = np.exp(params[-1])
+            return self.logLikelihood(self.x, yScaled)
+
+        if not optimize:
+            logParams = np.append(np.log(self.lengthScales), np.log(self.noise))
+        bestScore = score(logParams)
+        stepSize = 1.0
+        for passNum in range(maxPasses if optimize else 0):
+            improved = False
+            for paramIndex in range(len(logParams)):
+                for direction in [1.0, -1.0]:
+                    trialParams = logParams.copy()
+                    trialParams[paramIndex] += direction*stepSize
+                    trialParams[-1] = min(max(trialParams[-1], np.log(1e-8)), np.log(1.0))
+                    trialScore = score(trialParams)
+                    if trialScore > bestScore:
+                        logParams, bestScore, improved = trialParams, trialScore, True
+                        break
+            if not improved:
+                stepSize *= 0.5
+                if stepSize < 0.05:
+                    break
+
+        score(logParams)
+        kMat = self.kernel(self.x, self.x) + (self.noise+1e-10)*np.eye(len(self.x))
+        self.chol = np.linalg.cholesky(kMat)
+        self.alpha = np.linalg.solve(self.chol.T, np.linalg.solve(self.chol, yScaled))
+        self.logLik = bestScore
+
+        return self
+
+    def predict(self, xNew):
+        #mean and standard deviation (latent, without the noise nugget) in the units of y
+        kStar = self.kernel(np.asarray(xNew, dtype=float), self.x)
+        mean = np.dot(kStar, self.alpha)
+        v = np.linalg.solve(self.chol, kStar.T)
+        var = np.maximum(1.0 - np.sum(v**2, axis=0), 1e-12)
+
+        return self.yMean + self.yStd*mean, self.yStd*np.sqrt(var)
+
+
+class SurrogateModel(object):
+    """
+    One GaussianProcess per evalModel output, on normalized design variables.
+    -predict(designList) gives (means, stds), each (n x 5) in OUTPUT_NAMES order
+    -maxMises and mass are modelled in log space; their std is the first-order (delta method) estimate
+    """
+
+    def __init__(self):
+        self.models = {}
+        self.numSamples = 0
+
+    def fit(self, designList, resultList):
+        x = normalizeDesigns(designList)
+        resultArray = np.array(resultList, dtype=float)
+        self.numSamples = len(x)
+        if self.numSamples < 2:
+            raise ValueError("Need at least 2 successful evaluations to fit a surrogate, got "+str(self.numSamples)+".")
+
+        for outputIndex,name in enumerate(OUTPUT_NAMES):
+            y = resultArray[:,outputIndex]
+            if name in LOG_OUTPUTS:
+                y = np.log(y)
+            self.models[name] = GaussianProcess().fit(x, y)
+
+        return self
+
+    def predict(self, designList):
+        x = normalizeDesigns(designList)
+        means = np.zeros((len(x), len(OUTPUT_NAMES)))
+        stds = np.zeros((len(x), len(OUTPUT_NAMES)))
+        for outputIndex,name in enumerate(OUTPUT_NAMES):
+            mean, std = self.models[name].predict(x)
+            if name in LOG_OUTPUTS:
+                mean = np.exp(mean)
+                std = mean*std
+            means[:,outputIndex] = mean
+            stds[:,outputIndex] = std
+
+        return means, stds
+
+    def crossValidate(self, designList, resultList, numFolds=5, seed=0):
+        #k-fold RMSE per output (refits with the hyperparameters re-optimized on each fold)
+        resultArray = np.array(resultList, dtype=float)
+        folds = np.array_split(np.random.RandomState(seed).permutation(len(designList)), numFolds)
+        errors = np.zeros_like(resultArray)
+        for foldIndices in folds:
+            trainIndices = np.setdiff1d(np.arange(len(designList)), foldIndices)
+            foldModel = SurrogateModel().fit([designList[i] for i in trainIndices], resultArray[trainIndices])
+            means, stds = foldModel.predict([designList[i] for i in foldIndices])
+            errors[foldIndices] = means - resultArray[foldIndices]
+
+        return dict(zip(OUTPUT_NAMES, np.sqrt(np.mean(errors**2, axis=0))))
+
+    def save(self, fileName=MODEL_FILE_NAME):
+        #plain dicts of arrays, so the file loads the same whether this module ran as a script or was imported
+        state = {"numSamples":self.numSamples, "models":dict([(name, gp.__dict__) for name,gp in self.models.items()])}
+        with open(fileName, "wb") as outFile:
+            pickle.dump(state, outFile, 2)
+
+
+def loadModel(fileName=MODEL_FILE_NAME):
+    with open(fileName, "rb") as inFile:
+        state = pickle.load(inFile)
+
+    model = SurrogateModel()
+    model.numSamples = state["numSamples"]
+    for name,gpState in state["models"].items():
+        model.models[name] = GaussianProcess()
+        model.models[name].__dict__.update(gpState)
+
+    return model
+
+def fitModel(fileNames=DATA_FILE_NAMES):
+    designList, resultList = loadTrainingData(fileNames)
+    return SurrogateModel().fit(designList, resultList)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Optimizer hooks
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+_defaultModel = None
+
+def defaultModel():
+    #Saved model if there is one, otherwise fitted from DATA_FILE_NAMES (once per process)
+    global _defaultModel
+    if _defaultModel is None:
+        _defaultModel = loadModel() if os.path.exists(MODEL_FILE_NAME) else fitModel()
+
+    return _defaultModel
+
+def surrogateEvaluator(designVec, jobNumber):
+    #Drop-in for the batchEvaluator evaluators: predicted veloMagMax,veloAngle,eigenVal1,maxMises,mass
+    means, stds = defaultModel().predict([designVec])
+    return tuple(means[0].tolist())
+
+#results cached from this evaluator are tagged apart from solver results
+surrogateEvaluator.modelVersion = MODEL_VERSION
+
+def prescreen(designList, costFromResults, numKeep, model=None, numSamples=32, quantile=0.25, seed=None):
+    """
+    Rank candidate designs by predicted cost and return the indices of the numKeep most promising.
+    -costFromResults(designVec, results) is the optimizer's own cost (e.g. ParticleSwarmOpt_LunaCat.costFromResults)
+    -cost is evaluated on numSamples draws from the predictive distribution and the score is the given quantile
+     of those costs, so uncertain designs near a constraint are not judged on the mean alone and the 1e15
+     penalty cannot swamp the ranking (quantile < 0.5 favours exploring, 0.5 ranks on the median)
+    Returns (keepIndices, scores).
+    """
+    model = defaultModel() if model is None else model
+    means, stds = model.predict(designList)
+    rng = np.random.RandomState(seed)
+
+    scores = np.zeros(len(designList))
+    for index,designVec in enumerate(designList):
+        sampleResults = means[index] + stds[index]*rng.standard_normal((numSamples, len(OUTPUT_NAMES)))
+        sampleCosts = np.array([costFromResults(designVec, results.tolist()) for results in sampleResults])
+        scores[index] = np.percentile(sampleCosts, 100.0*quantile)
+
+    keepIndices = np.argsort(scores)[:numKeep]
+    return keepIndices.tolist(), scores
+
+
+if __name__ == "__main__":
+    #fit on the given sources (default DATA_FILE_NAMES), report cross-validated accuracy and save for surrogateEvaluator
+    designList, resultList = loadTrainingData(sys.argv[1:] or DATA_FILE_NAMES)
+    print("Training samples: "+str(len(designList)))
+
+    model = SurrogateModel().fit(designList, resultList)
+    for name,rmse in sorted(model.crossValidate(designList, resultList).items()):
+        resultSpread = np.std(np.array(resultList)[:,OUTPUT_NAMES.index(name)])
+        print(name+": CV RMSE "+("%.4g"%rmse)+" (output std "+("%.4g"%resultSpread)+")")
+
+    model.save()
+    print("Saved surrogate to "+MODEL_FILE_NAME)